@@ -0,0 +1,37 @@
+"""MarkdownV2 escaping: the original chained str.replace calls against the translate table"""
+import timeit
+
+from common import main
+
+SPECIAL_CHARS = ['_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.', '!']
+
+def escape_markdown_replace(text: str) -> str:
+    """escape_markdown as it was: one str.replace pass per special character"""
+    for char in SPECIAL_CHARS:
+        text = text.replace(char, '\\' + char)
+    return text
+
+SAMPLES = {
+    'check result': 'Scammer @bad_guy (Binance 123-45) reported 2024-01-01 12:00! amount=100.5$',
+    'plain label': 'Hello world plain label',
+    'Vietnamese': 'Nguyễn Văn A - Tài khoản game',
+    'long text': 'x' * 2000 + '-',
+    'backslashes': 'C:\\Users\\scam\\wallet_1 \\_ (a\\b) end\\',
+    'backslash run': '\\' * 200,
+}
+
+def main_():
+    for name, text in SAMPLES.items():
+        assert main.validate_markdown_v2(main.escape_markdown(text)) is None
+        # The old calls left backslashes unescaped, so they only agree on text without one
+        if '\\' not in text:
+            assert escape_markdown_replace(text) == main.escape_markdown(text)
+        timings = []
+        for escape in (escape_markdown_replace, main.escape_markdown):
+            seconds = min(timeit.repeat(lambda: escape(text), number=20000, repeat=5)) / 20000
+            timings.append(seconds * 1e6)
+        print(f"{name:>13}: replace {timings[0]:.2f} us, translate {timings[1]:.2f} us "
+              f"({timings[0] / timings[1]:.1f}x)")
+
+if __name__ == '__main__':
+    main_()
@@ -0,0 +1,45 @@
+"""Bytes held in memory per scammer and per report, traced with tracemalloc"""
+import argparse
+import gc
+import tracemalloc
+
+from common import copy_dataset, main
+
+def traced() -> int:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('dataset', help='data.json to load, e.g. written by gen_dataset.py')
+    args = parser.parse_args()
+    
+    filename = copy_dataset(args.dataset, 'memory')
+    # Moves any reports into the archive first, so the measured load is the steady state
+    main.JSONDatabase(filename, durability='sync', snapshot_format='json').close()
+    
+    tracemalloc.start()
+    base = traced()
+    db = main.JSONDatabase(filename, durability='sync', snapshot_format='json')
+    db._indexes_ready.wait()
+    total = traced() - base
+    
+    scammer_count = len(db.data['scammers'])
+    report_count = len(db._archive)
+    before = traced()
+    db.data['scammers'].clear()
+    scammers = before - traced()
+    
+    before = traced()
+    archive = db._archive
+    db._archive = None
+    del archive
+    reports = before - traced()
+    
+    print(f"{scammer_count} scammers, {report_count} reports: {total / 1e6:.1f} MB retained including search indexes")
+    print(f"per scammer: {scammers / max(1, scammer_count):.0f} B")
+    print(f"per report: {reports / max(1, report_count):.1f} B (the report itself stays in the archive file)")
+    db._closed = True
+
+if __name__ == '__main__':
+    main_()
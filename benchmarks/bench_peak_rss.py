@@ -0,0 +1,69 @@
+"""Peak resident memory while loading and saving data.json (Linux only)"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from common import copy_dataset, main
+
+def status(field: str) -> float:
+    """A /proc/self/status figure in MB"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+    raise KeyError(field)
+
+def reset_peak():
+    """Restart VmHWM from the current resident size"""
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+
+def skip_indexes(db):
+    """Stand-in for JSONDatabase._build_indexes, leaving the search indexes out of the figures"""
+    db._leaderboards = {}
+    db._unindexed = None
+    db._indexes_ready = threading.Event()
+    db._indexes_ready.set()
+
+def measure(filename: str, label: str):
+    """Peak over a load, then over a full save, each against what is held in between"""
+    base = status('VmRSS')
+    reset_peak()
+    started = time.perf_counter()
+    db = main.JSONDatabase(filename, durability='sync', snapshot_format='json')
+    loaded = time.perf_counter() - started
+    load_peak, held = status('VmHWM'), status('VmRSS')
+    
+    reset_peak()
+    started = time.perf_counter()
+    db.checkpoint(export=True)
+    saved = time.perf_counter() - started
+    save_peak = status('VmHWM')
+    print(f"{label}: load {loaded:.1f}s, peak {load_peak:.0f} MB from {base:.0f} MB, {held:.0f} MB held | "
+          f"save {saved:.1f}s, peak {save_peak:.0f} MB (+{save_peak - held:.0f} MB) | "
+          f"data.json {os.path.getsize(filename) / 1e6:.0f} MB")
+    db.close()
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('dataset', help='data.json to load, e.g. written by gen_dataset.py')
+    parser.add_argument('--measure', metavar='LABEL', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.measure:
+        # Only the loader and serializer are measured
+        main.JSONDatabase._build_indexes = skip_indexes
+        measure(args.dataset, args.measure)
+        return
+    
+    filename = copy_dataset(args.dataset, 'rss')
+    # Each in a fresh process, so one's freed memory can't hide the next one's peak. The first
+    # load also moves reports of the pre-archive layout into the archive
+    for label in ('as given', 'current layout'):
+        subprocess.run([sys.executable, os.path.abspath(__file__), filename, '--measure', label], check=True)
+
+if __name__ == '__main__':
+    main_()
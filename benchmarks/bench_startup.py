@@ -0,0 +1,40 @@
+"""Startup time from data.json and from the binary snapshot, on a dataset from gen_dataset.py"""
+import argparse
+import gc
+import time
+
+from common import copy_dataset, main
+
+def boot(filename: str, snapshot_format: str, label: str, timed_close: bool = False):
+    """Open the database as the bot does at startup, including the banner statistics"""
+    started = time.perf_counter()
+    db = main.JSONDatabase(filename, snapshot_format=snapshot_format)
+    stats = db.get_statistics()
+    booted = time.perf_counter() - started
+    db._indexes_ready.wait()
+    searchable = time.perf_counter() - started
+    print(f"{label}: boot {booted:.2f}s ({len(db._archive)} reports, {stats['active_scammers']} scammers), "
+          f"searchable after {searchable:.2f}s")
+    
+    started = time.perf_counter()
+    db.close()
+    if timed_close:
+        print(f"{label}: close {time.perf_counter() - started:.2f}s")
+    del db
+    gc.collect()
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('dataset', help='data.json to start from, e.g. written by gen_dataset.py')
+    args = parser.parse_args()
+    
+    filename = copy_dataset(args.dataset, 'startup')
+    # Moves any reports into the archive, so later boots see the current layout
+    boot(filename, 'json', 'first boot')
+    boot(filename, 'json', 'data.json')
+    # Writes the snapshot on close
+    boot(filename, 'binary', 'data.json, writing snapshot', timed_close=True)
+    boot(filename, 'binary', 'snapshot', timed_close=True)
+
+if __name__ == '__main__':
+    main_()
@@ -0,0 +1,31 @@
+"""Shared setup for the benchmarks: import main with its own database in a scratch directory"""
+import atexit
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+SCRATCH_DIR = tempfile.mkdtemp(prefix='scam-bot-bench-')
+# Registered before main is imported, so it runs after main closes its database
+atexit.register(shutil.rmtree, SCRATCH_DIR, ignore_errors=True)
+
+# Importing main opens DB_FILE; keep it away from the working directory's data.json
+os.environ['DB_FILE'] = os.path.join(SCRATCH_DIR, 'module.json')
+os.environ['DB_SQLITE_FILE'] = os.path.join(SCRATCH_DIR, 'module.db')
+os.environ['DB_BACKEND'] = 'json'
+
+# Only warnings from the bot itself, starting with its import
+logging.getLogger('main').setLevel(logging.WARNING)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main  # noqa: F401,E402
+
+def copy_dataset(dataset: str, name: str) -> str:
+    """Fresh copy of a data.json in its own scratch directory; returns its path"""
+    directory = os.path.join(SCRATCH_DIR, name)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.mkdir(directory)
+    filename = os.path.join(directory, 'data.json')
+    shutil.copy(dataset, filename)
+    return filename
@@ -0,0 +1,62 @@
+"""Write a synthetic data.json in the pre-archive layout, reports included"""
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+
+PRODUCTS = ['USDT', 'iPhone 15', 'Tài khoản game', 'Netflix account', 'Binance P2P'] + [f'product {i}' for i in range(45)]
+
+def generate(scammer_count: int, report_count: int, seed: int) -> dict:
+    """Reports spread at random over scammer_count scammers, with matching aggregates"""
+    rnd = random.Random(seed)
+    base = datetime(2024, 1, 1)
+    names = [(f'@scam_{i}_{rnd.randint(0, 10 ** 6)}', f'Binance {rnd.randint(10 ** 7, 10 ** 8)}')
+             for i in range(scammer_count)]
+    scammers = {}
+    reports = []
+    for report_id in range(1, report_count + 1):
+        username, wallet_id = names[rnd.randrange(scammer_count)]
+        user_id = rnd.randint(10 ** 8, 7 * 10 ** 9)
+        timestamp = (base + timedelta(seconds=rnd.randint(0, 3 * 10 ** 7),
+                                      microseconds=rnd.randint(0, 999999))).isoformat()
+        product = rnd.choice(PRODUCTS)
+        amount = round(rnd.random() * 500, 2)
+        link = 't.me/' + username[1:]
+        reports.append({
+            'user_id': user_id, 'username': username, 'telegram_link': link, 'wallet_id': wallet_id,
+            'amount': amount, 'product': product, 'id': report_id, 'timestamp': timestamp, 'status': 'active'
+        })
+        scammer = scammers.setdefault(f'{username}_{wallet_id}', {
+            'username': username, 'telegram_link': link, 'wallet_id': wallet_id, 'report_count': 0,
+            'reporter_count': 0, 'reporters': [], 'total_amount': 0, 'products': [],
+            'first_report': timestamp, 'last_report': timestamp
+        })
+        scammer['report_count'] += 1
+        scammer['reporters'].append(str(user_id))
+        scammer['reporter_count'] = len(scammer['reporters'])
+        scammer['total_amount'] += amount
+        if product not in scammer['products']:
+            scammer['products'].append(product)
+        scammer['first_report'] = min(scammer['first_report'], timestamp)
+        scammer['last_report'] = max(scammer['last_report'], timestamp)
+    statistics = {
+        'total_reports': report_count, 'total_users': 0, 'total_checks': 0,
+        'total_scammers': len(scammers), 'total_amount_scammed': sum(r['amount'] for r in reports)
+    }
+    return {'users': {}, 'reports': reports, 'scammers': scammers, 'statistics': statistics, 'daily_statistics': {}}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('output', help='file to write, e.g. bench.json')
+    parser.add_argument('--scammers', type=int, default=200000)
+    parser.add_argument('--reports', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=2)
+    args = parser.parse_args()
+    
+    data = generate(args.scammers, args.reports, args.seed)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    print(f"Wrote {len(data['scammers'])} scammers and {len(data['reports'])} reports to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -11,8 +11,29 @@ import os
 import json
 import logging
 import re
+import sys
+import string
+import bisect
+import functools
+import gc
+import heapq
+import marshal
+import math
+import struct
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from queue import Queue
+import atexit
+import hmac
+import signal
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Optional, Any, Set
+from typing import Dict, List, Tuple, Optional, Any, Set, Iterator, Iterable, Callable
 from dotenv import load_dotenv
 from telegram import (
     Update, InlineKeyboardButton, InlineKeyboardMarkup, 
@@ -20,8 +41,12 @@ from telegram import (
 )
 from telegram.ext import (
     Updater, CommandHandler, MessageHandler, Filters,
-    CallbackContext, CallbackQueryHandler, ConversationHandler
+    CallbackContext, CallbackQueryHandler, ConversationHandler, MessageFilter, Defaults,
+    Dispatcher, ExtBot, JobQueue
 )
+from telegram.error import BadRequest, RetryAfter
+from telegram.utils.helpers import DEFAULT_NONE
+from telegram.utils.request import Request
 
 # ============================================
 # CONFIGURATION AND INITIALIZATION
@@ -36,6 +61,76 @@ logging.basicConfig(
     level=logging.INFO
 )
 logger = logging.getLogger(__name__)
+# DEBUG=true adds this module's debug output
+if os.getenv('DEBUG', '').lower() in ('1', 'true', 'yes'):
+    logger.setLevel(logging.DEBUG)
+# VALIDATE_MARKDOWN=true checks every outgoing MarkdownV2 text before sending it; for development
+VALIDATE_MARKDOWN = os.getenv('VALIDATE_MARKDOWN', '').lower() in ('1', 'true', 'yes')
+
+# Storage configuration
+DB_FILE = os.getenv('DB_FILE', 'data.json')
+# 'wal' appends every mutation to a journal and checkpoints periodically,
+# 'off' writes a full checkpoint, in DB_SNAPSHOT_FORMAT, on every save
+DB_JOURNAL_MODE = os.getenv('DB_JOURNAL_MODE', 'wal').lower()
+DB_CHECKPOINT_OPS = int(os.getenv('DB_CHECKPOINT_OPS', '1000'))
+# 'sync' writes inside the handler, 'batched' hands writes to a background
+# writer thread, 'shutdown' only writes when the bot stops
+DB_DURABILITY = os.getenv('DB_DURABILITY', 'batched').lower()
+DB_FLUSH_INTERVAL_MS = int(os.getenv('DB_FLUSH_INTERVAL_MS', '200'))
+DB_FLUSH_MAX_OPS = int(os.getenv('DB_FLUSH_MAX_OPS', '100'))
+# 'binary' checkpoints to a marshal snapshot next to DB_FILE, which loads far faster, and
+# rewrites DB_FILE itself only at shutdown; 'json' checkpoints straight to DB_FILE
+DB_SNAPSHOT_FORMAT = os.getenv('DB_SNAPSHOT_FORMAT', 'binary').lower()
+# 'json' keeps everything in memory backed by DB_FILE, 'sqlite' uses DB_SQLITE_FILE
+DB_BACKEND = os.getenv('DB_BACKEND', 'json').lower()
+DB_SQLITE_FILE = os.getenv('DB_SQLITE_FILE', 'data.db')
+# Ranking used by the analytics dashboard: 'reports', 'reporters' or 'amount'
+TOP_SCAMMERS_ORDER = os.getenv('TOP_SCAMMERS_ORDER', 'reports').lower()
+# How check results are delivered: 'merged' sends one message with the menu keyboard,
+# 'edit' shows a processing placeholder and edits the results into it, with a button back to the menu
+CHECK_RESPONSE_MODE = os.getenv('CHECK_RESPONSE_MODE', 'merged').lower()
+# Lookalike usernames shown under check results: maximum edit distance (0 disables) and count.
+# Each extra edit multiplies the lookalike index's memory, about 4x from 1 to 2
+LOOKALIKE_MAX_DISTANCE = int(os.getenv('LOOKALIKE_MAX_DISTANCE', '1'))
+LOOKALIKE_LIMIT = int(os.getenv('LOOKALIKE_LIMIT', '5'))
+# Rendered check results kept per (query, language) until a new report arrives; 0 disables
+CHECK_CACHE_SIZE = int(os.getenv('CHECK_CACHE_SIZE', '1024'))
+# Bloom filter answering most clean checks without scanning the SQLite table: false-positive
+# rate (0 disables) and the minimum number of identifiers/trigrams it is sized for
+BLOOM_ERROR_RATE = float(os.getenv('BLOOM_ERROR_RATE', '0.01'))
+BLOOM_MIN_CAPACITY = int(os.getenv('BLOOM_MIN_CAPACITY', '100000'))
+# Number of user_id -> language entries kept in memory by LanguageManager
+LANGUAGE_CACHE_SIZE = int(os.getenv('LANGUAGE_CACHE_SIZE', '10000'))
+
+# Handler worker pool; 1 runs handlers one at a time in the dispatcher thread
+BOT_WORKERS = max(1, int(os.getenv('BOT_WORKERS', '1')))
+# With several workers: 'user' keeps each user's updates in order while different users
+# run in parallel, 'none' runs every handler asynchronously in arrival order
+BOT_UPDATE_ORDERING = os.getenv('BOT_UPDATE_ORDERING', 'user').lower()
+
+# Outbound queue: threads sending to Telegram, 0 sends directly from handlers. Needs
+# BOT_WORKERS > 1: handlers wait for their sends, and a single worker waiting out one
+# chat's rate limit would hold up every other chat
+OUTBOUND_SENDERS = int(os.getenv('OUTBOUND_SENDERS', '4'))
+# Budgets in messages per second; Telegram allows about 30/s overall and 1/s per chat sustained
+OUTBOUND_GLOBAL_RATE = float(os.getenv('OUTBOUND_GLOBAL_RATE', '30'))
+OUTBOUND_CHAT_RATE = float(os.getenv('OUTBOUND_CHAT_RATE', '1'))
+OUTBOUND_CHAT_BURST = int(os.getenv('OUTBOUND_CHAT_BURST', '5'))
+OUTBOUND_MAX_RETRIES = int(os.getenv('OUTBOUND_MAX_RETRIES', '3'))
+
+# Update delivery: 'polling' or 'webhook'
+BOT_MODE = os.getenv('BOT_MODE', 'polling').lower()
+# Public HTTPS base URL Telegram posts to; WEBHOOK_PATH is appended to it
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8443'))
+WEBHOOK_PATH = '/' + os.getenv('WEBHOOK_PATH', 'telegram').strip('/')
+# Sent back by Telegram in X-Telegram-Bot-Api-Secret-Token; empty disables the check
+WEBHOOK_SECRET_TOKEN = os.getenv('WEBHOOK_SECRET_TOKEN', '')
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', '40'))
+
+# Telegram's limit on the text of one message
+MAX_MESSAGE_LENGTH = 4096
 
 # States for ConversationHandler
 (
@@ -48,12 +143,27 @@ logger = logging.getLogger(__name__)
 # TEXT FORMATTING UTILITIES
 # ============================================
 
+MARKDOWN_SPECIAL_CHARS = '_*[]()~`>#+-=|{}.!'
+
+# Single-pass translation tables for the three MarkdownV2 escaping contexts
+MARKDOWN_ESCAPE_TABLE = str.maketrans({char: f'\\{char}' for char in MARKDOWN_SPECIAL_CHARS + '\\'})
+MARKDOWN_CODE_ESCAPE_TABLE = str.maketrans({'`': '\\`', '\\': '\\\\'})
+MARKDOWN_URL_ESCAPE_TABLE = str.maketrans({')': '\\)', '\\': '\\\\'})
+
+class MarkdownText(str):
+    """Text that is already valid MarkdownV2 and must be inserted into templates unescaped"""
+
 def escape_markdown(text: str) -> str:
     """Escape special characters for MarkdownV2"""
-    escape_chars = r'_*[]()~`>#+-=|{}.!'
-    for char in escape_chars:
-        text = text.replace(char, f'\\{char}')
-    return text
+    return text.translate(MARKDOWN_ESCAPE_TABLE)
+
+def escape_markdown_code(text: str) -> str:
+    """Escape text placed inside a MarkdownV2 code span"""
+    return text.translate(MARKDOWN_CODE_ESCAPE_TABLE)
+
+def escape_markdown_url(text: str) -> str:
+    """Escape text placed inside the (url) part of a MarkdownV2 link"""
+    return text.translate(MARKDOWN_URL_ESCAPE_TABLE)
 
 def format_bold(text: str) -> str:
     """Format bold text for MarkdownV2"""
@@ -61,44 +171,1493 @@ def format_bold(text: str) -> str:
 
 def format_code(text: str) -> str:
     """Format code for MarkdownV2"""
-    return f"`{escape_markdown(text)}`"
+    return f"`{escape_markdown_code(text)}`"
 
 def format_link(text: str, url: str) -> str:
     """Format link for MarkdownV2"""
-    return f"[{escape_markdown(text)}]({url})"
+    return f"[{escape_markdown(text)}]({escape_markdown_url(url)})"
+
+def scan_markdown_v2(text: str, marker: str = '\x00') -> Tuple[Optional[str], List[str]]:
+    """Check text against the MarkdownV2 grammar.
+    
+    Returns an error description (None when well-formed) and, for every
+    occurrence of marker, the context it appears in: 'text', 'code' or 'url'.
+    """
+    contexts = []
+    stack = []
+    i = 0
+    n = len(text)
+    while i < n:
+        char = text[i]
+        if char == marker:
+            contexts.append('text')
+            i += 1
+            continue
+        if char == '\\':
+            if i + 1 >= n:
+                return "trailing backslash", contexts
+            i += 2
+            continue
+        
+        # Inline code and pre blocks: only ` and \ are special inside
+        if char == '`':
+            end = '```' if text.startswith('```', i) else '`'
+            i += len(end)
+            while i < n and not text.startswith(end, i):
+                if text[i] == marker:
+                    contexts.append('code')
+                elif text[i] == '\\':
+                    i += 1
+                elif text[i] == '`':
+                    return f"unescaped ` inside code at position {i}", contexts
+                i += 1
+            if i >= n:
+                return "unterminated code entity", contexts
+            i += len(end)
+            continue
+        
+        # Links: [text](url), only ) and \ are special inside the url
+        if char == '[':
+            stack.append('[')
+            i += 1
+            continue
+        if char == ']':
+            if not stack or stack[-1] != '[':
+                return f"unescaped ] at position {i}", contexts
+            stack.pop()
+            if not text.startswith('(', i + 1):
+                return f"link without url at position {i}", contexts
+            i += 2
+            while i < n and text[i] != ')':
+                if text[i] == marker:
+                    contexts.append('url')
+                elif text[i] == '\\':
+                    i += 1
+                i += 1
+            if i >= n:
+                return "unterminated link url", contexts
+            i += 1
+            continue
+        
+        # Block quotes start at the beginning of a line
+        if char == '>' and (i == 0 or text[i - 1] == '\n'):
+            i += 1
+            continue
+        
+        if char in '*~':
+            token = char
+        elif char == '_':
+            token = '__' if text.startswith('__', i) else '_'
+        elif char == '|' and text.startswith('||', i):
+            token = '||'
+        elif char in MARKDOWN_SPECIAL_CHARS:
+            return f"unescaped {char!r} at position {i}", contexts
+        else:
+            i += 1
+            continue
+        
+        # Style toggles must nest properly
+        i += len(token)
+        if stack and stack[-1] == token:
+            stack.pop()
+        elif token in stack:
+            return f"overlapping {token!r} entity at position {i}", contexts
+        else:
+            stack.append(token)
+    
+    if stack:
+        return f"unclosed {stack[-1]!r} entity", contexts
+    return None, contexts
+
+def validate_markdown_v2(text: str) -> Optional[str]:
+    """Error description if text is not well-formed MarkdownV2, otherwise None"""
+    return scan_markdown_v2(text, marker='')[0]
+
+# Non-Latin letters that render like Latin ones in usernames, after lowercasing
+# (uppercase lookalikes such as Cyrillic В, Н, К, М, Т fold via their lowercase forms)
+CONFUSABLE_LETTERS = str.maketrans({
+    # Cyrillic
+    'а': 'a', 'в': 'b', 'с': 'c', 'ԁ': 'd', 'е': 'e', 'ё': 'e', 'һ': 'h', 'н': 'h', 'і': 'i', 'ї': 'i',
+    'ј': 'j', 'к': 'k', 'ӏ': 'l', 'м': 'm', 'п': 'n', 'о': 'o', 'р': 'p', 'ԛ': 'q', 'г': 'r', 'ѕ': 's',
+    'т': 't', 'ц': 'u', 'ѵ': 'v', 'ԝ': 'w', 'х': 'x', 'у': 'y', 'ү': 'y', 'з': '3', 'б': '6',
+    # Greek
+    'α': 'a', 'β': 'b', 'ε': 'e', 'η': 'n', 'ι': 'i', 'κ': 'k', 'ν': 'v', 'ο': 'o', 'ρ': 'p', 'τ': 't',
+    'υ': 'u', 'χ': 'x', 'γ': 'y', 'ω': 'w',
+    # Latin letters outside ASCII that NFKC keeps
+    'ı': 'i', 'ȷ': 'j', 'ɑ': 'a', 'ɡ': 'g', 'ɩ': 'i', 'ʟ': 'l', 'ᴄ': 'c', 'ᴏ': 'o', 'ᴠ': 'v', 'ᴡ': 'w', 'ᴢ': 'z',
+})
+# Invisible formatting characters (zero-width spaces and joiners, bidi controls, soft hyphens)
+INVISIBLE_CHARS_PATTERN = re.compile('[\u00ad\u061c\u180e\u200b-\u200f\u202a-\u202e\u2060-\u2064\u2066-\u206f\ufeff]')
+
+def confusable_skeleton(text: str) -> str:
+    """Lowercased NFKC form with invisible characters dropped and homoglyphs folded to Latin"""
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize('NFKC', text)
+    text = ''.join(char for char in text if unicodedata.category(char) != 'Cf')
+    return text.lower().translate(CONFUSABLE_LETTERS)
+
+def normalize_search_input(search_input: str) -> str:
+    """Reduce a check query to the form matched against stored identifiers"""
+    search_input = confusable_skeleton(search_input).strip()
+    
+    if search_input.startswith('@'):
+        search_input = search_input[1:]
+    elif 't.me/' in search_input:
+        search_input = search_input.split('t.me/')[-1].split('/')[0]
+    
+    return search_input
+
+def strip_invisible(text: str) -> str:
+    """Drop invisible formatting characters, which can disguise a displayed username or wallet"""
+    return text if text.isascii() else INVISIBLE_CHARS_PATTERN.sub('', text)
 
 def clean_text(text: str) -> str:
     """Clean text to avoid parsing errors"""
-    # Remove invalid characters
+    # Remove invalid and invisible characters
     text = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]', '', text)
+    text = strip_invisible(text)
     # Escape special characters
     text = escape_markdown(text)
     return text
 
+# ============================================
+# SEARCH INDEXES
+# ============================================
+
+TELEGRAM_LINK_PATTERN = re.compile(
+    r'^(?:https?://)?(?:www\.)?(?:t\.me|telegram\.me|telegram\.dog)/(?:s/)?@?([a-z0-9_]+)'
+)
+TELEGRAM_RESOLVE_PATTERN = re.compile(r'^tg://resolve\?(?:.*&)?domain=@?([a-z0-9_]+)')
+WALLET_PREFIX_PATTERN = re.compile(r'^([a-z]+)[\s:_\-/#]+(.+)$')
+WALLET_SEPARATOR_PATTERN = re.compile(r'[\s:_\-/#]+')
+
+def canonical_username(text: Optional[str]) -> str:
+    """Canonical Telegram username: @name, t.me/telegram.me links and tg://resolve all become name"""
+    if not text:
+        return ''
+    text = confusable_skeleton(text).strip()
+    match = TELEGRAM_LINK_PATTERN.match(text) or TELEGRAM_RESOLVE_PATTERN.match(text)
+    if match:
+        return match.group(1)
+    return text.lstrip('@')
+
+def canonical_wallet(text: Optional[str]) -> str:
+    """Canonical wallet ID: 'Binance 72728229' and 'binance:72728229' both become binance:72728229"""
+    if not text:
+        return ''
+    text = confusable_skeleton(text).strip()
+    match = WALLET_PREFIX_PATTERN.match(text)
+    if match:
+        return f"{match.group(1)}:{WALLET_SEPARATOR_PATTERN.sub('', match.group(2))}"
+    return WALLET_SEPARATOR_PATTERN.sub('', text)
+
+def make_scammer_key(username: Optional[str], wallet_id: Optional[str]) -> str:
+    """Unique key for a scammer, built from canonical identifiers so variants share one entry"""
+    return f"{canonical_username(username)}_{canonical_wallet(wallet_id)}"
+
+# Wallet IDs as typed into a check: an account number or address, optionally behind an exchange name
+WALLET_QUERY_PATTERN = re.compile(r'^(?:[a-z]+[\s:_\-/#]+)?(?:\d[\d\s\-]{4,}|0x[0-9a-f]{6,}|[0-9a-z]{25,})$')
+
+def identifier_forms(username: Optional[str], telegram_link: Optional[str],
+                     wallet_id: Optional[str]) -> Set[str]:
+    """Canonical identifiers a stored scammer can be found by exactly, prefixed by the field they came from"""
+    forms = {'u:' + canonical_username(username), 'l:' + canonical_username(telegram_link)}
+    wallet = canonical_wallet(wallet_id)
+    forms.add('w:' + wallet)
+    # The bare account number also identifies the wallet ("72728229" for binance:72728229)
+    forms.add('w:' + wallet.partition(':')[2])
+    forms -= {'u:', 'l:', 'w:'}
+    return forms
+
+def query_identifier_forms(search_input: str) -> List[str]:
+    """Canonical identifiers a check query may exactly refer to"""
+    username = canonical_username(search_input)
+    forms = ['u:' + username, 'l:' + username] if username else []
+    # Only a wallet-shaped query is read as a wallet, so "_an15" can't exactly match wallet "an15"
+    if WALLET_QUERY_PATTERN.match(confusable_skeleton(search_input).strip()):
+        forms.append('w:' + canonical_wallet(search_input))
+    return forms
+
+class IdentifierIndex:
+    """Hash index from canonical identifiers to the keys carrying them"""
+    
+    def __init__(self):
+        self._keys: Dict[str, List[str]] = {}
+    
+    def add(self, key: str, identifiers: Set[str]):
+        """Index key under each of its identifiers"""
+        for identifier in identifiers:
+            keys = self._keys.setdefault(identifier, [])
+            if key not in keys:
+                keys.append(key)
+    
+    def lookup(self, identifiers: List[str]) -> List[str]:
+        """Keys exactly matching any of the identifiers"""
+        results = []
+        for identifier in identifiers:
+            for key in self._keys.get(identifier, ()):
+                if key not in results:
+                    results.append(key)
+        return results
+
+def scammer_search_fields(username: Optional[str], telegram_link: Optional[str],
+                          wallet_id: Optional[str]) -> Tuple[str, str, str]:
+    """Identifier fields in the form find_scammer matches queries against"""
+    return (
+        confusable_skeleton(username).replace('@', '') if username else '',
+        confusable_skeleton(telegram_link) if telegram_link else '',
+        confusable_skeleton(wallet_id) if wallet_id else ''
+    )
+
+class TrigramIndex:
+    """Inverted index from character trigrams to the keys whose identifiers contain them"""
+    
+    def __init__(self):
+        self._postings: Dict[str, Set[str]] = {}
+        # Insertion order of keys, so narrowed results keep the table's ordering
+        self._order: Dict[str, int] = {}
+        # Indexed texts per key, used to verify candidates without re-normalizing
+        self._texts: Dict[str, Tuple[str, ...]] = {}
+    
+    @staticmethod
+    def trigrams(text: str) -> Set[str]:
+        """All three-character substrings of text"""
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+    
+    def add(self, key: str, *texts: str):
+        """Index the given texts under key"""
+        self._order.setdefault(key, len(self._order))
+        self._texts[key] = tuple(text for text in texts if text)
+        for text in texts:
+            for gram in self.trigrams(text):
+                self._postings.setdefault(gram, set()).add(key)
+    
+    def candidates(self, query: str) -> Optional[List[str]]:
+        """Keys that may contain query as a substring, or None if query is too short to narrow"""
+        grams = self.trigrams(query)
+        if not grams:
+            return None
+        
+        # Intersect starting from the rarest trigram
+        postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+        result = set(postings[0])
+        for keys in postings[1:]:
+            if not result:
+                break
+            result &= keys
+        
+        if len(result) > len(self._order) // 8:
+            # Broad queries: a linear pass in key order beats sorting a large result
+            return [key for key in self._order if key in result]
+        return sorted(result, key=self._order.__getitem__)
+    
+    def search(self, query: str) -> List[str]:
+        """Keys with an indexed text containing query, in insertion order"""
+        candidates = self.candidates(query)
+        if candidates is None:
+            candidates = self._order
+        
+        texts = self._texts
+        results = []
+        for key in candidates:
+            for text in texts[key]:
+                if query in text:
+                    results.append(key)
+                    break
+        return results
+
+class BloomFilter:
+    """Bit array that can rule out strings never added, sized for a capacity and false-positive rate"""
+    
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(64, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        # Distinct items added, as far as the filter can tell
+        self.count = 0
+    
+    def _positions(self, item: str) -> List[int]:
+        """Bit positions of item, by double hashing"""
+        # The filter is rebuilt every start, so the per-process hash() seed is fine
+        h = hash(item) & 0xFFFFFFFFFFFFFFFF
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hashes)]
+    
+    def add(self, item: str) -> bool:
+        """Add item; True if it was not already present"""
+        bits = self._bits
+        added = False
+        for position in self._positions(item):
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                bits[position >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+    
+    def update(self, items: Set[str]):
+        """Add distinct items in bulk, without tracking which were already present"""
+        # _positions inlined: this loop dominates the startup build
+        bits = self._bits
+        size = self.size
+        hashes = self.hashes
+        for item in items:
+            h = hash(item) & 0xFFFFFFFFFFFFFFFF
+            position, step = h & 0xFFFFFFFF, (h >> 32) | 1
+            for _ in range(hashes):
+                bit = position % size
+                bits[bit >> 3] |= 1 << (bit & 7)
+                position += step
+        self.count += len(items)
+    
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+    
+    @property
+    def full(self) -> bool:
+        """Whether the filter holds its capacity, beyond which the error rate degrades"""
+        return self.count >= self.capacity
+    
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._bits)
+
+# Substring length the Bloom filter tracks. Trigrams are too few to tell queries apart (a
+# few thousand random usernames already contain nearly all of them); with 5-grams a novel
+# query almost always has one no stored identifier contains, and Telegram usernames are
+# at least 5 characters long
+BLOOM_GRAM_LENGTH = 5
+
+def filter_grams(text: str) -> Set[str]:
+    """All BLOOM_GRAM_LENGTH-character substrings of text"""
+    return {text[i:i + BLOOM_GRAM_LENGTH] for i in range(len(text) - BLOOM_GRAM_LENGTH + 1)}
+
+def scammer_filter_items(username: Optional[str], telegram_link: Optional[str],
+                         wallet_id: Optional[str]) -> Set[str]:
+    """Strings the Bloom filter holds for a scammer: exact identifiers and search-field grams"""
+    items = {'=' + form for form in identifier_forms(username, telegram_link, wallet_id)}
+    for text in scammer_search_fields(username, telegram_link, wallet_id):
+        items |= filter_grams(text)
+    return items
+
+def build_scammer_filter(scammers) -> Optional[BloomFilter]:
+    """Bloom filter over (username, telegram_link, wallet_id) rows, or None if disabled"""
+    if BLOOM_ERROR_RATE <= 0:
+        return None
+    
+    items = set()
+    for fields in scammers:
+        items |= scammer_filter_items(*fields)
+    # Room to double before the next rebuild
+    bloom = BloomFilter(max(BLOOM_MIN_CAPACITY, 2 * len(items)), BLOOM_ERROR_RATE)
+    bloom.update(items)
+    logger.info(
+        f"Bloom filter: {len(items)} items, capacity {bloom.capacity}, {bloom.hashes} hashes, "
+        f"{bloom.memory_bytes / 1024:.0f} KiB at {BLOOM_ERROR_RATE:.2%} false positives"
+    )
+    return bloom
+
+def query_may_match(bloom: Optional[BloomFilter], search_input: str) -> bool:
+    """False only if find_scammer is certain to find nothing for search_input"""
+    if bloom is None:
+        return True
+    if any('=' + form in bloom for form in query_identifier_forms(search_input)):
+        return True
+    # A substring match needs every gram of the query; shorter queries can't be ruled out
+    grams = filter_grams(normalize_search_input(search_input))
+    return not grams or all(gram in bloom for gram in grams)
+
+LOOKALIKE_SUFFIX_PATTERN = re.compile(r'[\d_]+$')
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance, using Myers' bit-parallel algorithm (one pass over b)"""
+    m = len(a)
+    if not m:
+        return len(b)
+    peq: Dict[str, int] = {}
+    for i, char in enumerate(a):
+        peq[char] = peq.get(char, 0) | (1 << i)
+    
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+    vp, vn, score = full, 0, m
+    for char in b:
+        eq = peq.get(char, 0)
+        xv = eq | vn
+        xh = (((eq & vp) + vp) ^ vp) | eq
+        hp = vn | ~(xh | vp)
+        hn = vp & xh
+        if hp & last:
+            score += 1
+        elif hn & last:
+            score -= 1
+        hp = ((hp << 1) | 1) & full
+        hn = (hn << 1) & full
+        vp = hn | (~(xv | hp) & full)
+        vn = hp & xv
+    return score
+
+def lookalike_variants(name: str, deletions: int = 1) -> Set[str]:
+    """The name without its digit/underscore suffix, plus everything up to `deletions` characters shorter"""
+    stem = LOOKALIKE_SUFFIX_PATTERN.sub('', name) or name
+    variants = level = {stem}
+    for _ in range(deletions):
+        level = {text[:i] + text[i + 1:] for text in level for i in range(len(text))}
+        variants = variants | level
+    return variants
+
+class LookalikeIndex:
+    """Near-duplicate username search in time independent of the number of names
+    
+    Names within d edits of each other, or differing by a digit suffix, share an entry
+    of lookalike_variants with d deletions on both sides; candidates found that way are
+    then confirmed with edit_distance.
+    """
+    
+    MIN_LENGTH = 4
+    
+    def __init__(self, max_distance: int = LOOKALIKE_MAX_DISTANCE):
+        self.max_distance = max_distance
+        # variant -> name, or a list of names once several share it (most variants have one)
+        self._variants: Dict[str, Any] = {}
+        self._keys: Dict[str, List[str]] = {}
+    
+    def add(self, key: str, names: Set[str]):
+        """Index key under each of its canonical usernames"""
+        for name in names:
+            if len(name) < self.MIN_LENGTH:
+                continue
+            keys = self._keys.get(name)
+            if keys is not None:
+                if key not in keys:
+                    keys.append(key)
+                continue
+            self._keys[name] = [key]
+            # Enough deletions for any query search() would let reach this name
+            deletions = min(self.max_distance, self._reach(len(name) + self.max_distance))
+            for variant in lookalike_variants(name, deletions):
+                entry = self._variants.get(variant)
+                if entry is None:
+                    self._variants[variant] = name
+                elif isinstance(entry, list):
+                    entry.append(name)
+                else:
+                    self._variants[variant] = [entry, name]
+    
+    def search(self, name: str, max_distance: int, limit: int) -> List[Tuple[int, str, str]]:
+        """(distance, name, key) of the closest names within max_distance, exact matches excluded"""
+        if len(name) < self.MIN_LENGTH:
+            return []
+        max_distance = min(max_distance, self.max_distance, self._reach(len(name)))
+        
+        seen = set()
+        matches = []
+        for variant in lookalike_variants(name, max_distance):
+            entry = self._variants.get(variant)
+            if entry is None:
+                continue
+            for candidate in (entry if isinstance(entry, list) else (entry,)):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                if abs(len(candidate) - len(name)) > max_distance:
+                    continue
+                distance = edit_distance(name, candidate)
+                if 0 < distance <= max_distance:
+                    matches.append((distance, candidate))
+        
+        matches.sort()
+        results = []
+        for distance, candidate in matches:
+            for key in self._keys[candidate]:
+                results.append((distance, candidate, key))
+        return results[:limit]
+    
+    @staticmethod
+    def _reach(length: int) -> int:
+        """Largest distance searched around a name this long; short names are near too many others"""
+        return max(1, length // 4)
+
+def lookalike_names(username: Optional[str], telegram_link: Optional[str]) -> Set[str]:
+    """Canonical usernames of a scammer that lookalike search compares against"""
+    names = {canonical_username(username), canonical_username(telegram_link)}
+    names.discard('')
+    return names
+
+class Leaderboard:
+    """Scammer keys kept sorted by a ranking, in short sorted blocks so an update stays O(log n)"""
+    
+    # Ranking fields per ordering, most significant first
+    ORDERINGS = {
+        'reports': ('report_count', 'reporter_count', 'total_amount'),
+        'reporters': ('reporter_count', 'report_count', 'total_amount'),
+        'amount': ('total_amount', 'report_count', 'reporter_count'),
+    }
+    # Entries per block; a block twice this size is split in two
+    BLOCK_SIZE = 512
+    
+    def __init__(self, order_by: str = 'reports'):
+        self.fields = self.ORDERINGS[order_by]
+        # Ascending (-field1, -field2, -field3, insertion seq, key) tuples, i.e. best first,
+        # split into consecutive blocks; a bisect over the last entry of each finds the block
+        self._blocks: List[List[Tuple]] = []
+        self._maxes: List[Tuple] = []
+        self._current: Dict[str, Tuple] = {}
+    
+    def update(self, key: str, record: 'ScammerRecord'):
+        """Insert key or move it to the position matching its current values"""
+        old = self._current.get(key)
+        if old is not None:
+            self._remove(old)
+            seq = old[-2]
+        else:
+            seq = len(self._current)
+        
+        entry = self._entry(key, record, seq)
+        self._insert(entry)
+        self._current[key] = entry
+    
+    def _insert(self, entry: Tuple):
+        """Add entry to the block it sorts into, splitting the block once it is too long"""
+        if not self._blocks:
+            self._blocks.append([entry])
+            self._maxes.append(entry)
+            return
+        
+        i = bisect.bisect_left(self._maxes, entry)
+        if i == len(self._blocks):
+            i -= 1
+            self._blocks[i].append(entry)
+            self._maxes[i] = entry
+        else:
+            bisect.insort(self._blocks[i], entry)
+        
+        block = self._blocks[i]
+        if len(block) > 2 * self.BLOCK_SIZE:
+            self._blocks[i:i + 1] = [block[:self.BLOCK_SIZE], block[self.BLOCK_SIZE:]]
+            self._maxes[i:i + 1] = [block[self.BLOCK_SIZE - 1], block[-1]]
+    
+    def _remove(self, entry: Tuple):
+        """Drop entry from its block, and the block once empty"""
+        i = bisect.bisect_left(self._maxes, entry)
+        block = self._blocks[i]
+        del block[bisect.bisect_left(block, entry)]
+        if block:
+            self._maxes[i] = block[-1]
+        else:
+            del self._blocks[i]
+            del self._maxes[i]
+    
+    def build(self, records: Iterable[Tuple[str, 'ScammerRecord']]):
+        """Rank every (key, record) pair at once, with one sort instead of an insertion each"""
+        self._current = {key: self._entry(key, record, seq) for seq, (key, record) in enumerate(records)}
+        entries = sorted(self._current.values())
+        self._blocks = [entries[i:i + self.BLOCK_SIZE] for i in range(0, len(entries), self.BLOCK_SIZE)]
+        self._maxes = [block[-1] for block in self._blocks]
+    
+    def _entry(self, key: str, record: 'ScammerRecord', seq: int) -> Tuple:
+        """Sort tuple placing key by its record's ranking fields, then by insertion"""
+        return tuple(-(getattr(record, field) or 0) for field in self.fields) + (seq, key)
+    
+    def top(self, limit: int) -> List[str]:
+        """The best `limit` keys"""
+        keys = []
+        for block in self._blocks:
+            if len(keys) >= limit:
+                break
+            keys.extend(entry[-1] for entry in block[:limit - len(keys)])
+        return keys
+
+if TOP_SCAMMERS_ORDER not in Leaderboard.ORDERINGS:
+    logger.warning(f"Unknown TOP_SCAMMERS_ORDER {TOP_SCAMMERS_ORDER!r}; ranking by 'reports'")
+    TOP_SCAMMERS_ORDER = 'reports'
+
+# ============================================
+# CONCURRENCY
+# ============================================
+
+class _LockGuard:
+    """Context manager for one side of a ReadWriteLock"""
+    
+    __slots__ = ('_acquire', '_release')
+    
+    def __init__(self, acquire, release):
+        self._acquire = acquire
+        self._release = release
+    
+    def __enter__(self):
+        self._acquire()
+    
+    def __exit__(self, *exc_info):
+        self._release()
+
+class ReadWriteLock:
+    """Many concurrent readers or one writer; writers are preferred and both sides are re-entrant"""
+    
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._write_depth = 0
+        self._waiting_writers = 0
+        self._local = threading.local()
+        self.read = _LockGuard(self.acquire_read, self.release_read)
+        self.write = _LockGuard(self.acquire_write, self.release_write)
+    
+    def acquire_read(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                # A writer may read what it is writing
+                self._write_depth += 1
+                return
+            held = getattr(self._local, 'reads', 0)
+            if not held:
+                # Queue behind waiting writers so a stream of checks can't starve reports
+                while self._writer is not None or self._waiting_writers:
+                    self._cond.wait()
+            self._readers += 1
+            self._local.reads = held + 1
+    
+    def release_read(self):
+        with self._cond:
+            if self._writer == threading.get_ident():
+                self._write_depth -= 1
+                return
+            self._readers -= 1
+            self._local.reads -= 1
+            if not self._readers:
+                self._cond.notify_all()
+    
+    def acquire_write(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            if getattr(self._local, 'reads', 0):
+                raise RuntimeError("Cannot upgrade a read lock to a write lock")
+            self._waiting_writers += 1
+            while self._writer is not None or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = me
+            self._write_depth = 1
+    
+    def release_write(self):
+        with self._cond:
+            self._write_depth -= 1
+            if not self._write_depth:
+                self._writer = None
+                self._cond.notify_all()
+
+# ============================================
+# OUTBOUND QUEUE
+# ============================================
+
+# Lower sends first: check results ahead of ordinary replies, ahead of bulk output
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BULK = 2
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: 'interactive', PRIORITY_NORMAL: 'normal', PRIORITY_BULK: 'bulk'}
+
+_outbound_local = threading.local()
+
+class outbound_priority:
+    """Set the priority of sends made by the current thread; usable as a decorator or a with block"""
+    
+    def __init__(self, priority: int):
+        self.priority = priority
+        self._previous = []
+    
+    def __enter__(self):
+        self._previous.append(getattr(_outbound_local, 'priority', PRIORITY_NORMAL))
+        _outbound_local.priority = self.priority
+    
+    def __exit__(self, *exc_info):
+        _outbound_local.priority = self._previous.pop()
+    
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            previous = getattr(_outbound_local, 'priority', PRIORITY_NORMAL)
+            _outbound_local.priority = self.priority
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _outbound_local.priority = previous
+        return wrapper
+
+class TokenBucket:
+    """Budget refilling at `rate` tokens per second up to `burst`"""
+    
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+    
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+    
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+    
+    def take(self):
+        self.tokens -= 1
+
+class OutboundJob:
+    """One pending Bot API call"""
+    
+    __slots__ = ('chat_id', 'priority', 'seq', 'call', 'future', 'enqueued', 'attempts', 'not_before')
+    
+    def __init__(self, chat_id: Any, priority: int, seq: int, call):
+        self.chat_id = chat_id
+        self.priority = priority
+        self.seq = seq
+        self.call = call
+        self.future = Future()
+        self.enqueued = time.monotonic()
+        self.attempts = 0
+        self.not_before = 0.0
+
+class OutboundQueue:
+    """Send Bot API calls in priority order within per-chat and global rate budgets"""
+    
+    MAX_IDLE_BUCKETS = 10000
+    
+    def __init__(self, senders: int = OUTBOUND_SENDERS, global_rate: float = OUTBOUND_GLOBAL_RATE,
+                 chat_rate: float = OUTBOUND_CHAT_RATE, chat_burst: int = OUTBOUND_CHAT_BURST,
+                 max_retries: int = OUTBOUND_MAX_RETRIES):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self._global = TokenBucket(global_rate, max(1.0, global_rate))
+        self._buckets: Dict[Any, TokenBucket] = {}
+        self._cond = threading.Condition()
+        self._seq = 0
+        
+        # Calls for one chat run one at a time and in submission order, so priorities only
+        # decide between chats; each chat with pending calls is in exactly one of _ready
+        # (by its head call), _waiting (throttled until a time) or _in_flight
+        self._chats: Dict[Any, deque] = {}
+        self._ready: List[Tuple[int, int, Any]] = []
+        self._waiting: List[Tuple[float, int, Any]] = []
+        self._in_flight: Set[Any] = set()
+        
+        self._latencies = {priority: deque(maxlen=1000) for priority in PRIORITY_NAMES}
+        self._counters = {'sent': 0, 'failed': 0, 'retried': 0, 'throttled': 0}
+        
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._sender_loop, name=f'outbound-{i}', daemon=True)
+            for i in range(senders)
+        ]
+        for thread in self._threads:
+            thread.start()
+    
+    def submit(self, chat_id: Any, call) -> Any:
+        """Queue a no-argument call for a chat and wait for its result"""
+        priority = getattr(_outbound_local, 'priority', PRIORITY_NORMAL)
+        with self._cond:
+            self._seq += 1
+            job = OutboundJob(chat_id, priority, self._seq, call)
+            pending = self._chats.get(chat_id)
+            if pending is None:
+                if len(self._buckets) > self.MAX_IDLE_BUCKETS:
+                    self._prune_buckets()
+                self._chats[chat_id] = deque([job])
+                heapq.heappush(self._ready, (job.priority, job.seq, chat_id))
+            else:
+                pending.append(job)
+            self._cond.notify()
+        return job.future.result()
+    
+    def _prune_buckets(self):
+        """Forget idle chats whose budget has fully refilled; caller holds the condition"""
+        now = time.monotonic()
+        for chat_id, bucket in list(self._buckets.items()):
+            if chat_id not in self._chats and not bucket.delay(now) and bucket.tokens >= bucket.burst:
+                del self._buckets[chat_id]
+    
+    def _bucket(self, chat_id: Any) -> TokenBucket:
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+    
+    def _next_job(self) -> Optional[OutboundJob]:
+        """Take the next call allowed by the budgets; caller holds the condition"""
+        while not self._closed or self._chats:
+            now = time.monotonic()
+            while self._waiting and self._waiting[0][0] <= now:
+                _, _, chat_id = heapq.heappop(self._waiting)
+                head = self._chats[chat_id][0]
+                heapq.heappush(self._ready, (head.priority, head.seq, chat_id))
+            
+            if self._ready:
+                delay = self._global.delay(now)
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                _, seq, chat_id = heapq.heappop(self._ready)
+                delay = self._bucket(chat_id).delay(now)
+                if delay > 0:
+                    self._counters['throttled'] += 1
+                    heapq.heappush(self._waiting, (now + delay, seq, chat_id))
+                    continue
+                self._global.take()
+                self._bucket(chat_id).take()
+                self._in_flight.add(chat_id)
+                return self._chats[chat_id].popleft()
+            
+            self._cond.wait(self._waiting[0][0] - now if self._waiting else None)
+        return None
+    
+    def _sender_loop(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+            if job is None:
+                return
+            
+            retry = False
+            started = time.monotonic()
+            try:
+                result = job.call()
+            except RetryAfter as e:
+                job.attempts += 1
+                if job.attempts > self.max_retries:
+                    job.future.set_exception(e)
+                else:
+                    # Honour Telegram's retry_after, backing off further on repeated 429s
+                    retry = True
+                    job.not_before = time.monotonic() + e.retry_after * 2 ** (job.attempts - 1)
+                    logger.warning(f"Flood limit for chat {job.chat_id}, retrying in "
+                                   f"{job.not_before - time.monotonic():.1f}s")
+            except Exception as e:
+                job.future.set_exception(e)
+            else:
+                job.future.set_result(result)
+            
+            with self._cond:
+                self._in_flight.discard(job.chat_id)
+                pending = self._chats[job.chat_id]
+                if retry:
+                    self._counters['retried'] += 1
+                    pending.appendleft(job)
+                    heapq.heappush(self._waiting, (job.not_before, job.seq, job.chat_id))
+                else:
+                    self._counters['sent' if job.future.exception() is None else 'failed'] += 1
+                    self._latencies[job.priority].append((started - job.enqueued, time.monotonic() - job.enqueued))
+                    if pending:
+                        head = pending[0]
+                        heapq.heappush(self._ready, (head.priority, head.seq, job.chat_id))
+                    else:
+                        del self._chats[job.chat_id]
+                self._cond.notify_all()
+    
+    def metrics(self) -> Dict:
+        """Queue depth, counters and queue-wait / total latency percentiles in ms per priority"""
+        with self._cond:
+            depth = sum(len(pending) for pending in self._chats.values())
+            metrics = {'queue_depth': depth, **self._counters}
+            for priority, name in PRIORITY_NAMES.items():
+                samples = list(self._latencies[priority])
+                if not samples:
+                    continue
+                waits = sorted(sample[0] for sample in samples)
+                totals = sorted(sample[1] for sample in samples)
+                metrics[name] = {
+                    'count': len(samples),
+                    'wait_p50_ms': round(waits[len(waits) // 2] * 1000, 1),
+                    'wait_p95_ms': round(waits[int(len(waits) * 0.95)] * 1000, 1),
+                    'total_p50_ms': round(totals[len(totals) // 2] * 1000, 1),
+                    'total_p95_ms': round(totals[int(len(totals) * 0.95)] * 1000, 1),
+                }
+        return metrics
+    
+    def close(self):
+        """Send what is queued, then stop the sender threads"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+_api_call_local = threading.local()
+
+class UpdateCalls:
+    """Bot API calls of one update, made on the dispatcher thread and any run_async handlers it started"""
+    
+    __slots__ = ('update_id', 'endpoints', 'pending')
+    
+    def __init__(self, update_id: Optional[int]):
+        self.update_id = update_id
+        self.endpoints: List[str] = []
+        # Threads still handling the update; the calls are counted once the last one finishes
+        self.pending = 1
+
+class ApiCallStats:
+    """Bot API calls made while handling each update"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.updates = 0
+        self.calls = 0
+        self.max_calls = 0
+        self.by_endpoint: Dict[str, int] = {}
+        self.histogram: Dict[int, int] = {}
+    
+    def begin_update(self, update_id: Optional[int] = None):
+        """Start counting calls made by the current thread"""
+        _api_call_local.calls = UpdateCalls(update_id)
+    
+    def defer(self) -> Optional[UpdateCalls]:
+        """The current update's calls, kept open for a handler about to run on another thread"""
+        calls = getattr(_api_call_local, 'calls', None)
+        if calls is not None:
+            with self._lock:
+                calls.pending += 1
+        return calls
+    
+    @staticmethod
+    def resume(calls: UpdateCalls):
+        """Count the current thread's calls towards a deferred update"""
+        _api_call_local.calls = calls
+    
+    def end_update(self):
+        """Stop counting on this thread; the last thread of an update folds its calls into the totals"""
+        calls = getattr(_api_call_local, 'calls', None)
+        _api_call_local.calls = None
+        if calls is None:
+            return
+        with self._lock:
+            calls.pending -= 1
+            if calls.pending:
+                return
+            endpoints = calls.endpoints
+            self.updates += 1
+            self.calls += len(endpoints)
+            self.max_calls = max(self.max_calls, len(endpoints))
+            self.histogram[len(endpoints)] = self.histogram.get(len(endpoints), 0) + 1
+            for endpoint in endpoints:
+                self.by_endpoint[endpoint] = self.by_endpoint.get(endpoint, 0) + 1
+        logger.debug(f"Update {calls.update_id} made {len(endpoints)} API calls: {endpoints}")
+    
+    @staticmethod
+    def record(endpoint: str):
+        calls = getattr(_api_call_local, 'calls', None)
+        if calls is not None:
+            calls.endpoints.append(endpoint)
+    
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                'updates': self.updates,
+                'api_calls': self.calls,
+                'calls_per_update': round(self.calls / self.updates, 2) if self.updates else 0,
+                'max_calls_per_update': self.max_calls,
+                'histogram': dict(sorted(self.histogram.items())),
+                'by_endpoint': dict(self.by_endpoint),
+            }
+
+api_call_stats = ApiCallStats()
+
+class QueuedBot(ExtBot):
+    """ExtBot that counts API calls per update and sends messages through an OutboundQueue, if given"""
+    
+    QUEUED_ENDPOINTS = frozenset({'sendMessage', 'editMessageText', 'deleteMessage'})
+    
+    def __init__(self, *args, outbound: Optional[OutboundQueue] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.outbound = outbound
+    
+    def _post(self, endpoint: str, data: Dict = None, timeout=DEFAULT_NONE, api_kwargs: Dict = None):
+        # Counted here, on the handler's thread, before the call is handed to a sender
+        api_call_stats.record(endpoint)
+        if VALIDATE_MARKDOWN and data and data.get('parse_mode') == 'MarkdownV2':
+            # Templates are checked at startup; this catches markup built in code before Telegram rejects it
+            error = validate_markdown_v2(data.get('text', ''))
+            if error:
+                logger.error(f"Sending invalid MarkdownV2 via {endpoint}: {error}: {data.get('text', '')[:200]!r}")
+        if self.outbound is None or endpoint not in self.QUEUED_ENDPOINTS:
+            return super()._post(endpoint, data, timeout, api_kwargs)
+        # Inline messages have no chat; rate them by their own id
+        chat_id = (data or {}).get('chat_id') or (data or {}).get('inline_message_id')
+        return self.outbound.submit(chat_id, functools.partial(super()._post, endpoint, data, timeout, api_kwargs))
+
+def create_bot(token: str, con_pool_size: int, defaults: Defaults = None) -> QueuedBot:
+    """Bot sending through the outbound queue unless OUTBOUND_SENDERS is 0 or handlers run serially"""
+    if OUTBOUND_SENDERS <= 0 or BOT_WORKERS == 1:
+        if OUTBOUND_SENDERS > 0:
+            logger.info("Outbound queue disabled: it needs BOT_WORKERS > 1")
+        return QueuedBot(token, request=Request(con_pool_size=con_pool_size), defaults=defaults)
+    return QueuedBot(
+        token,
+        request=Request(con_pool_size=con_pool_size + OUTBOUND_SENDERS),
+        defaults=defaults,
+        outbound=OutboundQueue()
+    )
+
+# ============================================
+# DATA RECORDS
+# ============================================
+
+def intern_text(text: Optional[str]) -> Optional[str]:
+    """Shared copy of a repeated string, so every record naming it holds one object"""
+    return sys.intern(text) if type(text) is str else text
+
+# Stored timestamps are naive local time, so they are kept as naive seconds since 1970-01-01:
+# no timezone conversion on the way in or out, and exact round trips across DST changes
+NAIVE_EPOCH = datetime(1970, 1, 1)
+ONE_SECOND = timedelta(seconds=1)
+
+def iso_to_epoch(text: Optional[str]) -> int:
+    """Whole seconds since NAIVE_EPOCH for an ISO timestamp, 0 if missing or malformed"""
+    if not text:
+        return 0
+    try:
+        return (datetime.fromisoformat(text) - NAIVE_EPOCH) // ONE_SECOND
+    except (TypeError, ValueError):
+        return 0
+
+def epoch_to_iso(seconds: int) -> str:
+    """ISO timestamp for seconds since NAIVE_EPOCH, '' for 0"""
+    return (NAIVE_EPOCH + timedelta(seconds=seconds)).isoformat() if seconds else ''
+
+class ScammerRecord:
+    """Aggregated reports about one scammer, stored without per-record dicts"""
+    
+    __slots__ = ('username', 'telegram_link', 'wallet_id', 'report_count', 'reporters',
+                 'total_amount', 'products', 'first_report', 'last_report')
+    
+    def __init__(self, username: Optional[str] = None, telegram_link: Optional[str] = None,
+                 wallet_id: Optional[str] = None, first_report: int = 0, last_report: int = 0):
+        # Not interned: each scammer's identifiers are unique to it, and interned strings
+        # are slower to load from a snapshot
+        self.username = username
+        self.telegram_link = telegram_link
+        self.wallet_id = wallet_id
+        self.report_count = 0
+        # Reporter user IDs, kept sorted for bisect membership tests
+        self.reporters = array('q')
+        self.total_amount = 0
+        # A handful of interned names per scammer, where a tuple is far smaller than a set
+        self.products: Tuple[str, ...] = ()
+        # Epoch seconds
+        self.first_report = first_report
+        self.last_report = last_report
+    
+    @property
+    def reporter_count(self) -> int:
+        return len(self.reporters)
+    
+    def add_reporter(self, user_id: int):
+        """Record a reporter once"""
+        index = bisect.bisect_left(self.reporters, user_id)
+        if index == len(self.reporters) or self.reporters[index] != user_id:
+            self.reporters.insert(index, user_id)
+    
+    def add_product(self, product: str):
+        """Record a product once"""
+        if product not in self.products:
+            self.products += (intern_text(product),)
+    
+    def merge(self, other: 'ScammerRecord'):
+        """Fold another record of the same scammer into this one"""
+        self.report_count += other.report_count
+        self.reporters = array('q', sorted(set(self.reporters) | set(other.reporters)))
+        self.total_amount += other.total_amount
+        for product in other.products:
+            self.add_product(product)
+        self.first_report = min(filter(None, (self.first_report, other.first_report)), default=0)
+        self.last_report = max(self.last_report, other.last_report)
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ScammerRecord':
+        """Record from the data.json layout"""
+        record = cls(data.get('username'), data.get('telegram_link'), data.get('wallet_id'),
+                     iso_to_epoch(data.get('first_report')), iso_to_epoch(data.get('last_report')))
+        record.report_count = data.get('report_count', 0)
+        record.reporters = array('q', sorted({int(user_id) for user_id in data.get('reporters', ())}))
+        record.total_amount = data.get('total_amount', 0)
+        record.products = tuple(intern_text(product) for product in dict.fromkeys(data.get('products', ())))
+        return record
+    
+    def to_dict(self) -> Dict:
+        """The data.json layout of the record, which is also what lookups return"""
+        return {
+            'username': self.username,
+            'telegram_link': self.telegram_link,
+            'wallet_id': self.wallet_id,
+            'report_count': self.report_count,
+            'reporter_count': len(self.reporters),
+            'reporters': [str(user_id) for user_id in self.reporters],
+            'total_amount': self.total_amount,
+            'products': list(self.products),
+            'first_report': epoch_to_iso(self.first_report),
+            'last_report': epoch_to_iso(self.last_report),
+        }
+
+def pack_scammers(scammers: Dict[str, ScammerRecord]) -> Dict:
+    """Scammer records as one column per field, the binary snapshot layout"""
+    records = scammers.values()
+    reporters = array('q')
+    for record in records:
+        reporters.extend(record.reporters)
+    return {
+        'keys': list(scammers),
+        'username': [record.username for record in records],
+        'telegram_link': [record.telegram_link for record in records],
+        'wallet_id': [record.wallet_id for record in records],
+        'report_count': array('q', [record.report_count for record in records]).tobytes(),
+        'total_amount': [record.total_amount for record in records],
+        'products': [record.products for record in records],
+        'first_report': array('q', [record.first_report for record in records]).tobytes(),
+        'last_report': array('q', [record.last_report for record in records]).tobytes(),
+        'reporter_count': array('q', [len(record.reporters) for record in records]).tobytes(),
+        'reporters': reporters.tobytes(),
+    }
+
+def unpack_scammers(columns: Dict) -> Dict[str, ScammerRecord]:
+    """Scammer records back from pack_scammers() columns"""
+    scammers = {}
+    reporters = array('q', columns['reporters'])
+    start = 0
+    new_record = ScammerRecord.__new__
+    for (key, username, telegram_link, wallet_id, report_count, total_amount, products,
+         first_report, last_report, reporter_count) in zip(
+            columns['keys'], columns['username'], columns['telegram_link'], columns['wallet_id'],
+            array('q', columns['report_count']), columns['total_amount'], columns['products'],
+            array('q', columns['first_report']), array('q', columns['last_report']),
+            array('q', columns['reporter_count'])):
+        record = new_record(ScammerRecord)
+        record.username = username
+        record.telegram_link = telegram_link
+        record.wallet_id = wallet_id
+        record.report_count = report_count
+        record.reporters = reporters[start:start + reporter_count]
+        record.total_amount = total_amount
+        record.products = products
+        record.first_report = first_report
+        record.last_report = last_report
+        scammers[key] = record
+        start += reporter_count
+    return scammers
+
+class ReportArchive:
+    """Append-only JSONL file of reports, indexed in memory by report id and scammer key"""
+    
+    def __init__(self, filename: str, saved_index: Optional[Tuple] = None, read_only: bool = False):
+        self.filename = filename
+        # A read-only archive never touches the file; appended reports stay in memory
+        self.read_only = read_only
+        # File offset of each report by id - 1; ids are dense and start at 1
+        self._offsets = array('q')
+        # Reports per scammer as a chain: the latest id per key, and for each report by id - 1
+        # the id of the previous one about the same scammer (0 ends the chain)
+        self._latest: Dict[str, int] = {}
+        self._previous = array('q')
+        # Encoded reports appended since the last flush, by id; served from here until written
+        self._unflushed: Dict[int, bytes] = {}
+        self._end = 0
+        self._lock = threading.Lock()
+        self._scan(saved_index)
+        # Appends always go to the end; reads seek to a report's offset
+        if not read_only:
+            self._file = open(filename, 'a+b')
+        else:
+            self._file = open(filename, 'rb') if os.path.exists(filename) else None
+    
+    def _scan(self, saved_index: Optional[Tuple] = None):
+        """Index an existing archive, dropping a torn last line; a saved index leaves only the tail to read"""
+        if not os.path.exists(self.filename):
+            return
+        
+        offset = 0
+        if saved_index is not None and self._restore(saved_index):
+            offset = self._end
+        with open(self.filename, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError('missing newline')
+                    report = json.loads(line)
+                except ValueError:
+                    logger.warning("Ignoring incomplete record at end of report archive")
+                    break
+                self._index(report, offset)
+                offset += len(line)
+        
+        if offset != os.path.getsize(self.filename) and not self.read_only:
+            os.truncate(self.filename, offset)
+        self._end = offset
+    
+    def _restore(self, saved_index: Tuple) -> bool:
+        """Adopt an index from saved_index() if the file still holds everything it covers"""
+        end, offsets, previous, latest = saved_index
+        with open(self.filename, 'rb') as f:
+            if end:
+                f.seek(end - 1)
+                if f.read(1) != b'\n':
+                    logger.warning("Report archive does not match the saved index; rescanning it")
+                    return False
+        self._offsets.frombytes(offsets)
+        self._previous.frombytes(previous)
+        self._latest = latest
+        self._end = end
+        return True
+    
+    def saved_index(self) -> Optional[Tuple]:
+        """The indexes in marshal-friendly form for a snapshot, or None while appended reports are unwritten"""
+        with self._lock:
+            if self._unflushed:
+                return None
+            return self._end, self._offsets.tobytes(), self._previous.tobytes(), dict(self._latest)
+    
+    def _index(self, report: Dict, offset: int):
+        """Record the offset of the next report and link it into its scammer's chain"""
+        self._offsets.append(offset)
+        scammer_key = make_scammer_key(report.get('username'), report.get('wallet_id'))
+        self._previous.append(self._latest.get(scammer_key, 0))
+        self._latest[scammer_key] = len(self._offsets)
+    
+    def __len__(self) -> int:
+        return len(self._offsets)
+    
+    def append(self, report: Dict):
+        """Add the report with the next id; written on the next flush()"""
+        line = (json.dumps(report, ensure_ascii=False) + '\n').encode('utf-8')
+        with self._lock:
+            self._index(report, self._end)
+            self._unflushed[len(self._offsets)] = line
+            self._end += len(line)
+    
+    def flush(self) -> bool:
+        """Write appended reports to the file"""
+        with self._lock:
+            if not self._unflushed or self.read_only:
+                return True
+            start = self._offsets[next(iter(self._unflushed)) - 1]
+            try:
+                self._file.write(b''.join(self._unflushed.values()))
+                self._file.flush()
+            except OSError as e:
+                logger.error(f"Error writing report archive: {e}")
+                # Drop any partial write so offsets stay valid; the reports are retried next flush
+                try:
+                    self._file.truncate(start)
+                except OSError:
+                    pass
+                return False
+            self._unflushed.clear()
+            return True
+    
+    def get(self, report_id: int) -> Optional[Dict]:
+        """Report by id, read from disk"""
+        with self._lock:
+            if not 0 < report_id <= len(self._offsets):
+                return None
+            line = self._unflushed.get(report_id)
+            if line is None:
+                start = self._offsets[report_id - 1]
+                end = self._offsets[report_id] if report_id < len(self._offsets) else self._end
+                self._file.seek(start)
+                line = self._file.read(end - start)
+        return json.loads(line)
+    
+    def scammer_reports(self, scammer_key: str, limit: Optional[int] = None) -> List[Dict]:
+        """Reports filed under a scammer key, newest first"""
+        with self._lock:
+            report_ids = []
+            report_id = self._latest.get(scammer_key, 0)
+            while report_id and (limit is None or len(report_ids) < limit):
+                report_ids.append(report_id)
+                report_id = self._previous[report_id - 1]
+        return [self.get(report_id) for report_id in report_ids]
+    
+    def __iter__(self):
+        """Every report in id order"""
+        for report_id in range(1, len(self._offsets) + 1):
+            yield self.get(report_id)
+    
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
 # ============================================
 # JSON DATABASE MANAGEMENT
 # ============================================
 
+# Binary snapshot: a header, then the marshal-encoded data. The header stamps the JSON file
+# current when the snapshot was written, so a DB_FILE edited or restored since wins at load,
+# and records whether that JSON file holds the same data, so it can stand in for the snapshot
+SNAPSHOT_MAGIC = b'FSDB'
+# Bump whenever the snapshot layout or the canonical scammer key changes; the header stays as is
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct('<4sIqq?')
+
+JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+class JSONStreamReader:
+    """Incremental JSON reader holding one chunk of the file and one decoded value at a time"""
+    
+    CHUNK_SIZE = 1 << 20
+    
+    def __init__(self, f):
+        self._file = f
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+    
+    def _fill(self) -> bool:
+        """Append the next chunk, dropping text already consumed; False at end of file"""
+        if self._eof:
+            return False
+        chunk = self._file.read(self.CHUNK_SIZE)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+    
+    def _peek(self) -> str:
+        """Skip whitespace and return the next character, '' at end of input"""
+        while True:
+            self._pos = JSON_WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+    
+    def _expect(self, chars: str) -> str:
+        """Consume the next character, which must be one of chars"""
+        char = self._peek()
+        if not char or char not in chars:
+            raise ValueError(f"Expected one of {chars!r} in JSON input, found {char!r}")
+        self._pos += 1
+        return char
+    
+    def value(self) -> Any:
+        """Decode the next complete value"""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                # Most likely the value continues in the next chunk
+                if not self._fill():
+                    raise
+                continue
+            # A value cut off by the end of the chunk can still decode, as "12" from "12.5";
+            # it is only complete once the separator after it is in the buffer
+            follow = JSON_WHITESPACE.match(self._buffer, end).end()
+            if (follow == len(self._buffer) or self._buffer[follow] not in ',:]}') and self._fill():
+                continue
+            self._pos = end
+            return value
+    
+    def keys(self) -> Iterator[str]:
+        """Keys of the object that comes next; the caller consumes each key's value before the next"""
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise ValueError("Expected an object key in JSON input")
+            self._expect(':')
+            yield key
+            if self._expect(',}') == '}':
+                return
+    
+    def items(self) -> Iterator[Any]:
+        """Values of the array that comes next, decoded one at a time"""
+        self._expect('[')
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self.value()
+            if self._expect(',]') == ']':
+                return
+
 class JSONDatabase:
     """Class for managing data storage in JSON file"""
     
-    def __init__(self, filename='data.json'):
+    def __init__(self, filename: str = DB_FILE, journal_mode: str = DB_JOURNAL_MODE,
+                 checkpoint_ops: int = DB_CHECKPOINT_OPS, durability: str = DB_DURABILITY,
+                 flush_interval_ms: int = DB_FLUSH_INTERVAL_MS, flush_max_ops: int = DB_FLUSH_MAX_OPS,
+                 snapshot_format: str = DB_SNAPSHOT_FORMAT, read_only: bool = False):
         self.filename = filename
-        self.data = self._load_data()
+        self.journal_filename = f"{filename}.wal"
+        self.archive_filename = f"{filename}.reports.jsonl"
+        self.snapshot_filename = f"{filename}.snapshot"
+        self.snapshot_format = snapshot_format
+        self.journal_mode = journal_mode
+        self.checkpoint_ops = checkpoint_ops
+        self.durability = durability
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_max_ops = flush_max_ops
+        # Read-only databases load and replay everything but never write a file, for migrations
+        self.read_only = read_only
+        
+        # Records changed since the last save, in mutation order
+        self._pending = {}
+        # Operations appended to the journal since the last checkpoint
+        self._journal_ops = 0
+        
+        # Lookups share self.data; mutations, and snapshots of pending changes, are exclusive
+        self._lock = ReadWriteLock()
+        # Bumped whenever scammer data changes, so cached check results can tell they are stale
+        self.generation = 0
+        # Serializes flushes so journal appends and checkpoints never interleave
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._writer = None
+        
+        snapshot = self._load_snapshot()
+        # Reports live on disk; memory holds only the scammer aggregates
+        self._archive = ReportArchive(self.archive_filename, snapshot[1] if snapshot else None, read_only)
+        # Reports found in a data.json that predates the archive; _load_data moves them over
+        self._legacy_reports = 0
+        self.data = snapshot[0] if snapshot else self._load_data()
+        if self.journal_mode == 'wal':
+            self._replay_journal()
+        if self._legacy_reports:
+            # Drop them from data.json
+            self.checkpoint(export=True)
+        if snapshot is None:
+            # Snapshots are only ever written with canonical keys
+            self._canonicalize_scammer_keys()
+        self._ensure_daily_statistics()
+        self._build_indexes()
+        
+        if self.durability == 'batched':
+            self._writer = threading.Thread(target=self._writer_loop, name='db-writer', daemon=True)
+            self._writer.start()
+        atexit.register(self.close)
     
     def _load_data(self) -> Dict:
         """Load data from JSON file"""
         try:
             if os.path.exists(self.filename):
                 with open(self.filename, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    
-                    # Convert lists to sets
-                    for scammer_key, scammer in data.get('scammers', {}).items():
-                        if 'reporters' in scammer and isinstance(scammer['reporters'], list):
-                            scammer['reporters'] = set(scammer['reporters'])
-                        if 'products' in scammer and isinstance(scammer['products'], list):
-                            scammer['products'] = set(scammer['products'])
+                    data = self._read_sections(JSONStreamReader(f))
                     
                     # Ensure statistics has all required keys
                     if 'statistics' not in data:
@@ -119,12 +1678,14 @@ class JSONDatabase:
                     
                     return data
         except Exception as e:
-            logger.error(f"Error reading JSON file: {e}")
+            # Starting empty would overwrite every report at the next save
+            logger.critical(f"Cannot read {self.filename} ({e}). Restore it from a backup, "
+                            f"or move it away to start with an empty database")
+            raise RuntimeError(f"Unreadable database file {self.filename}: {e}") from e
         
         # Default data structure
         default_data = {
             'users': {},
-            'reports': [],
             'scammers': {},
             'statistics': {
                 'total_reports': 0,
@@ -132,70 +1693,487 @@ class JSONDatabase:
                 'total_checks': 0,
                 'total_scammers': 0,
                 'total_amount_scammed': 0
-            }
+            },
+            'daily_statistics': {}
         }
-        self._save_data(default_data)
+        if not self.read_only:
+            self._save_data(default_data)
         return default_data
     
-    def _save_data(self, data: Dict = None):
-        """Save data to JSON file"""
-        if data is None:
-            data = self.data
+    def _read_sections(self, reader: JSONStreamReader) -> Dict:
+        """Top-level sections of data.json, turning each record into its in-memory form as it is read"""
+        data = {}
+        for section in reader.keys():
+            if section == 'scammers':
+                # Compact records in memory; _json_chunks converts them back
+                scammers = data['scammers'] = {}
+                for scammer_key in reader.keys():
+                    scammers[scammer_key] = ScammerRecord.from_dict(reader.value())
+            elif section == 'users':
+                users = data['users'] = {}
+                for user_id in reader.keys():
+                    users[user_id] = reader.value()
+            elif section == 'reports':
+                self._archive_legacy_reports(reader.items())
+            else:
+                data[section] = reader.value()
+        data.setdefault('scammers', {})
+        return data
+    
+    def _archive_legacy_reports(self, reports: Iterator[Dict]):
+        """Move reports still held in data.json (files that predate the archive) into the archive"""
+        moved = 0
+        for report in reports:
+            self._legacy_reports += 1
+            # Skip reports an interrupted earlier move already archived
+            if report.get('id', 0) > len(self._archive):
+                self._archive.append(report)
+                moved += 1
+                if moved % 10000 == 0:
+                    # Write in batches rather than buffering the whole history
+                    self._archive.flush()
+        self._archive.flush()
+        logger.info(f"Moved {moved} reports from {self.filename} to {self.archive_filename}")
+    
+    def _json_stamp(self) -> Tuple[int, int]:
+        """Modification time and size of the JSON file, (-1, -1) if there is none"""
+        try:
+            stat = os.stat(self.filename)
+        except OSError:
+            return -1, -1
+        return stat.st_mtime_ns, stat.st_size
+    
+    def _load_snapshot(self) -> Optional[Tuple[Dict, Optional[Tuple]]]:
+        """Data and saved archive index from the binary snapshot, None if the JSON file should be loaded"""
+        if not os.path.exists(self.snapshot_filename):
+            return None
+        
+        started = time.perf_counter()
+        header = None
+        try:
+            with open(self.snapshot_filename, 'rb') as f:
+                header = SNAPSHOT_HEADER.unpack(f.read(SNAPSHOT_HEADER.size))
+                magic, version, json_mtime, json_size, json_current = header
+                json_stamp = self._json_stamp()
+                if json_stamp != (-1, -1) and json_stamp != (json_mtime, json_size):
+                    logger.info(f"{self.filename} changed after the last snapshot; loading it instead")
+                    return None
+                if self.snapshot_format != 'binary':
+                    raise ValueError("DB_SNAPSHOT_FORMAT is not binary")
+                if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                    raise ValueError(f"snapshot version {version}, expected {SNAPSHOT_VERSION}")
+                payload = f.read()
+            
+            # Nothing loaded here can form a cycle; collecting while millions of containers
+            # are allocated would only slow the load down
+            gc_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                state = marshal.loads(payload)
+                data, archive_index = state['data'], state['archive']
+                data['scammers'] = unpack_scammers(data['scammers'])
+            finally:
+                if gc_enabled:
+                    gc.enable()
+        except (OSError, EOFError, ValueError, TypeError, KeyError, struct.error) as e:
+            # Checkpoints only write the snapshot, so the JSON file can stand in for it
+            # only if it was exported together with it
+            if header is not None and header[0] == SNAPSHOT_MAGIC and header[4] and os.path.exists(self.filename):
+                logger.warning(f"Not using {self.snapshot_filename} ({e}); loading {self.filename}, "
+                               f"which holds the same data")
+                return None
+            logger.critical(f"Cannot use {self.snapshot_filename} ({e}) and {self.filename} is older than it. "
+                            f"Start a version that reads the snapshot, or delete it to fall back to "
+                            f"{self.filename} and lose the changes made since")
+            raise RuntimeError(f"Unusable database snapshot {self.snapshot_filename}: {e}") from e
         
-        # Create a copy to convert sets to lists
-        save_data = json.loads(json.dumps(data, default=self._json_serializer))
+        logger.info(f"Loaded {len(data['scammers'])} scammers from {self.snapshot_filename} "
+                    f"in {time.perf_counter() - started:.2f}s")
+        return data, archive_index
+    
+    def _canonicalize_scammer_keys(self):
+        """Re-key scammers stored under pre-canonical keys, merging entries that collide"""
+        scammers = {}
+        merged = 0
+        for old_key, scammer in self.data['scammers'].items():
+            scammer_key = make_scammer_key(scammer.username, scammer.wallet_id)
+            existing = scammers.get(scammer_key)
+            if existing is None:
+                scammers[scammer_key] = scammer
+                if scammer_key != old_key:
+                    merged += 1
+                continue
+            
+            existing.merge(scammer)
+            merged += 1
+        
+        if merged:
+            logger.info(f"Re-keyed {merged} scammer entries to canonical identifiers")
+            self.data['scammers'] = scammers
+            self.data['statistics']['total_scammers'] = len(scammers)
+            self.checkpoint()
+    
+    def _ensure_daily_statistics(self):
+        """Backfill per-day counters from report and join history for files that predate them"""
+        if 'daily_statistics' in self.data:
+            return
         
+        daily = self.data['daily_statistics'] = {}
+        for report in self._archive:
+            day = report.get('timestamp', '')[:10]
+            if day:
+                daily.setdefault(day, {'reports': 0, 'checks': 0, 'users': 0})['reports'] += 1
+        for user in self.data['users'].values():
+            day = (user.get('join_date') or '')[:10]
+            if day:
+                daily.setdefault(day, {'reports': 0, 'checks': 0, 'users': 0})['users'] += 1
+        self.checkpoint()
+    
+    def _bump_daily(self, metric: str, amount: int = 1):
+        """Increment today's counter for a metric; caller holds the lock"""
+        day = datetime.now().date().isoformat()
+        bucket = self.data['daily_statistics'].setdefault(day, {'reports': 0, 'checks': 0, 'users': 0})
+        bucket[metric] = bucket.get(metric, 0) + amount
+        self._mark('daily', day)
+    
+    def _build_indexes(self):
+        """Start building in-memory search indexes over the loaded scammers in the background"""
+        self._trigrams = TrigramIndex()
+        self._identifiers = IdentifierIndex()
+        self._lookalikes = LookalikeIndex()
+        # Created on first use per ordering, then kept up to date by add_report
+        self._leaderboards: Dict[str, Leaderboard] = {}
+        # Keys of scammers added while the build runs, or None once the indexes are complete
+        self._unindexed: Optional[List[str]] = []
+        # Searches wait on this; everything else is usable as soon as the data is loaded
+        self._indexes_ready = threading.Event()
+        threading.Thread(target=self._index_loaded_scammers, name='db-indexer', daemon=True).start()
+    
+    def _index_loaded_scammers(self):
+        """Index every scammer present at startup, then the ones added meanwhile"""
+        started = time.perf_counter()
+        try:
+            with self._lock.read:
+                scammers = list(self.data['scammers'].items())
+            # Nothing reads the indexes until they are ready, so they are filled without the lock
+            for scammer_key, scammer in scammers:
+                self._index_scammer(scammer_key, scammer)
+            with self._lock.write:
+                for scammer_key in self._unindexed:
+                    self._index_scammer(scammer_key, self.data['scammers'][scammer_key])
+                self._unindexed = None
+            logger.info(f"Indexed {len(scammers)} scammers in {time.perf_counter() - started:.1f}s")
+        except Exception as e:
+            logger.error(f"Error building search indexes: {e}")
+        finally:
+            self._indexes_ready.set()
+    
+    def _index_scammer(self, scammer_key: str, scammer: ScammerRecord):
+        """Add one scammer's identifiers to the search indexes"""
+        fields = (scammer.username, scammer.telegram_link, scammer.wallet_id)
+        self._trigrams.add(scammer_key, *scammer_search_fields(*fields))
+        self._identifiers.add(scammer_key, identifier_forms(*fields))
+        self._lookalikes.add(scammer_key, lookalike_names(fields[0], fields[1]))
+    
+    @staticmethod
+    def _plain_layout(data: Dict) -> Dict:
+        """Shallow copy of data with records converted back to the data.json layout"""
+        layout = dict(data)
+        layout['scammers'] = {key: scammer.to_dict() for key, scammer in data['scammers'].items()}
+        return layout
+    
+    def _json_chunks(self, data: Dict) -> Iterator[str]:
+        """data.json text in pieces of at most one record, laid out as json.dumps(indent=2) would"""
+        encode = json.JSONEncoder(default=self._json_serializer, ensure_ascii=False, indent=2).encode
+        yield '{'
+        for i, (section, value) in enumerate(data.items()):
+            yield (',' if i else '') + '\n  ' + encode(section) + ': '
+            if section in ('users', 'scammers') and value:
+                # One record at a time, so no converted copy of the section is ever built
+                for j, (key, record) in enumerate(value.items()):
+                    if isinstance(record, ScammerRecord):
+                        record = record.to_dict()
+                    yield (',' if j else '{') + '\n    ' + encode(key) + ': ' + encode(record).replace('\n', '\n    ')
+                yield '\n  }'
+            else:
+                yield encode(value).replace('\n', '\n  ')
+        yield '\n}'
+    
+    def _write_json(self, data: Dict) -> bool:
+        """Atomically replace the JSON file with data, streamed out record by record"""
+        # Write to a temporary file first so a crash never leaves a truncated snapshot
+        tmp_filename = f"{self.filename}.tmp"
         try:
-            with open(self.filename, 'w', encoding='utf-8') as f:
-                json.dump(save_data, f, ensure_ascii=False, indent=2)
+            with open(tmp_filename, 'w', encoding='utf-8') as f:
+                f.writelines(self._json_chunks(data))
+            os.replace(tmp_filename, self.filename)
+            return True
         except Exception as e:
             logger.error(f"Error writing JSON file: {e}")
+            return False
+    
+    def _save_data(self, data: Dict = None) -> bool:
+        """Save data to JSON file"""
+        if data is None:
+            data = self.data
+        return self._write_json(data)
+    
+    def _snapshot_payload(self) -> bytes:
+        """Marshal-encoded data and archive index for the binary snapshot; caller holds the lock"""
+        data = dict(self.data)
+        data['scammers'] = pack_scammers(self.data['scammers'])
+        return marshal.dumps({'data': data, 'archive': self._archive.saved_index()})
+    
+    def _write_binary_snapshot(self, payload: bytes, json_current: bool) -> bool:
+        """Atomically replace the binary snapshot, stamped with the JSON file as it is now"""
+        tmp_filename = f"{self.snapshot_filename}.tmp"
+        try:
+            with open(tmp_filename, 'wb') as f:
+                f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, *self._json_stamp(), json_current))
+                f.write(payload)
+            os.replace(tmp_filename, self.snapshot_filename)
+            return True
+        except Exception as e:
+            logger.error(f"Error writing snapshot file: {e}")
+            return False
+    
+    def _write_state(self, export: bool = False) -> bool:
+        """Write all data to the configured snapshot format, and to the JSON file too when exporting"""
+        binary = self.snapshot_format == 'binary'
+        with self._lock.write:
+            # Reports are appended under this lock, so the saved archive index covers exactly the written ones
+            if not self._archive.flush():
+                return False
+            self._pending.clear()
+            payload = self._snapshot_payload() if binary else None
+        written = exported = False
+        if export or not binary:
+            # Streamed under the read lock so checks carry on meanwhile; a change that slips in
+            # after the pending set was cleared is simply written again by the next flush
+            with self._lock.read:
+                written = exported = self._write_json(self.data)
+        if binary:
+            # Written after the JSON file, so its stamp matches and the snapshot stays preferred
+            written = self._write_binary_snapshot(payload, exported)
+        return written
     
     def _json_serializer(self, obj):
         """Convert non-JSON serializable data types"""
+        if isinstance(obj, ScammerRecord):
+            return obj.to_dict()
         if isinstance(obj, set):
             return list(obj)
         if isinstance(obj, datetime):
             return obj.isoformat()
         raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
     
+    def _mark(self, kind: str, key: Any = None):
+        """Remember that a record changed and must be written on next flush"""
+        self._pending[(kind, key)] = None
+    
     def save(self):
-        """Save current data"""
-        self._save_data(self.data)
+        """Schedule pending changes for writing according to the durability policy"""
+        if not self._pending:
+            return
+        if self.durability == 'sync' or (self.durability == 'batched' and self._writer is None):
+            self.flush()
+        elif self.durability == 'batched' and len(self._pending) >= self.flush_max_ops:
+            self._wakeup.set()
+    
+    def flush(self):
+        """Write all pending changes now"""
+        if self.read_only:
+            return
+        with self._flush_lock:
+            if self.journal_mode == 'wal':
+                self._append_journal()
+            elif self._pending:
+                self._write_state()
+    
+    def _writer_loop(self):
+        """Background writer: group-commit pending changes every flush interval"""
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing database: {e}")
+    
+    def close(self):
+        """Stop the background writer and flush everything to disk"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._writer is not None:
+            self._wakeup.set()
+            self._writer.join()
+        self.flush()
+        if self.snapshot_format == 'binary':
+            # Checkpoints leave the JSON file behind; bring it up to date as the export copy
+            self.checkpoint(export=True)
+        elif self.journal_mode == 'wal' and self._journal_ops:
+            self.checkpoint()
+        self._archive.close()
+    
+    # ========== WRITE-AHEAD JOURNAL ==========
+    
+    def _journal_record(self, kind: str, key: Any) -> Optional[Dict]:
+        """Build the journal record holding the current value of a changed record"""
+        if kind == 'user':
+            return {'op': 'user', 'key': key, 'value': self.data['users'][key]}
+        if kind == 'scammer':
+            return {'op': 'scammer', 'key': key, 'value': self.data['scammers'][key]}
+        if kind == 'stats':
+            return {'op': 'stats', 'value': self.data['statistics']}
+        if kind == 'daily':
+            return {'op': 'daily', 'key': key, 'value': self.data['daily_statistics'][key]}
+        return None
+    
+    def _append_journal(self):
+        """Append pending changes to the journal, checkpointing when it grows too long"""
+        with self._lock.write:
+            if not self._pending:
+                return
+            # Reports first, and under the lock so none can be added between the two: aggregates
+            # on disk never count a report the archive lacks
+            if not self._archive.flush():
+                return
+            lines = []
+            for kind, key in self._pending:
+                record = self._journal_record(kind, key)
+                if record is not None:
+                    lines.append(json.dumps(record, ensure_ascii=False, default=self._json_serializer))
+            self._pending.clear()
+        
+        try:
+            with open(self.journal_filename, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+        except Exception as e:
+            logger.error(f"Error writing journal file: {e}")
+            # Fall back to a full snapshot so the change is not lost
+            self.checkpoint()
+            return
+        
+        self._journal_ops += len(lines)
+        if self._journal_ops >= self.checkpoint_ops:
+            self.checkpoint()
+    
+    def _apply_journal_record(self, record: Dict):
+        """Apply one journal record to the in-memory data"""
+        op = record.get('op')
+        value = record.get('value')
+        if op == 'user':
+            self.data['users'][record['key']] = value
+        elif op == 'scammer':
+            self.data['scammers'][record['key']] = ScammerRecord.from_dict(value)
+        elif op == 'report':
+            # Journals written before the archive carry reports; skip ones already archived
+            if value.get('id', 0) > len(self._archive):
+                self._archive.append(value)
+        elif op == 'stats':
+            self.data['statistics'] = value
+        elif op == 'daily':
+            self.data.setdefault('daily_statistics', {})[record['key']] = value
+    
+    def _replay_journal(self):
+        """Replay journal records written after the last checkpoint"""
+        if not os.path.exists(self.journal_filename):
+            return
+        
+        replayed = 0
+        try:
+            with open(self.journal_filename, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn write at the tail of the journal; everything before it is valid
+                        logger.warning("Ignoring incomplete record at end of journal")
+                        break
+                    self._apply_journal_record(record)
+                    replayed += 1
+        except Exception as e:
+            logger.error(f"Error reading journal file: {e}")
+        
+        if replayed:
+            logger.info(f"Replayed {replayed} journal records")
+            self.checkpoint()
+    
+    def checkpoint(self, export: bool = False):
+        """Write a full snapshot and truncate the journal; export also rewrites the JSON file"""
+        if self.read_only or not self._write_state(export):
+            # Keep the journal; it is still needed to recover the changes
+            return
+        try:
+            with open(self.journal_filename, 'w', encoding='utf-8'):
+                pass
+        except Exception as e:
+            logger.error(f"Error truncating journal file: {e}")
+        self._journal_ops = 0
     
     # ========== USER MANAGEMENT ==========
     
     def get_user(self, user_id: int) -> Dict:
         """Get user information"""
         user_id_str = str(user_id)
-        if user_id_str not in self.data['users']:
-            self.data['users'][user_id_str] = {
-                'language': 'en',
-                'reports_today': 0,
-                'last_report_date': None,
-                'report_count': 0,
-                'check_count': 0,
-                'join_date': datetime.now().isoformat(),
-                'username': None,
-                'first_name': None,
-                'last_name': None
-            }
-            self.data['statistics']['total_users'] += 1
-            self.save()
-        return self.data['users'][user_id_str]
+        with self._lock.read:
+            user = self.data['users'].get(user_id_str)
+        if user is not None:
+            return user
+        
+        with self._lock.write:
+            # Another handler may have created the user while we waited
+            user = self.data['users'].get(user_id_str)
+            if user is None:
+                user = self.data['users'][user_id_str] = {
+                    'language': 'en',
+                    'reports_today': 0,
+                    'last_report_date': None,
+                    'report_count': 0,
+                    'check_count': 0,
+                    'join_date': datetime.now().isoformat(),
+                    'username': None,
+                    'first_name': None,
+                    'last_name': None
+                }
+                self.data['statistics']['total_users'] += 1
+                self._bump_daily('users')
+                self._mark('user', user_id_str)
+                self._mark('stats')
+        self.save()
+        return user
+    
+    def get_user_language(self, user_id: int) -> str:
+        """Get user language without creating the user"""
+        with self._lock.read:
+            user = self.data['users'].get(str(user_id))
+            return user['language'] if user else 'en'
     
     def update_user_info(self, user_id: int, username: str, first_name: str, last_name: str):
         """Update user information"""
         user = self.get_user(user_id)
-        user['username'] = username
-        user['first_name'] = first_name
-        user['last_name'] = last_name
+        with self._lock.write:
+            # Skip the write entirely when nothing changed (the common /start case)
+            if (user['username'], user['first_name'], user['last_name']) == (username, first_name, last_name):
+                return
+            user['username'] = username
+            user['first_name'] = first_name
+            user['last_name'] = last_name
+            self._mark('user', str(user_id))
         self.save()
     
     def update_user_language(self, user_id: int, language: str):
         """Update user language"""
         user = self.get_user(user_id)
-        user['language'] = language
+        with self._lock.write:
+            if user['language'] == language:
+                return
+            user['language'] = language
+            self._mark('user', str(user_id))
         self.save()
     
     def can_report(self, user_id: int) -> Tuple[bool, str]:
@@ -203,10 +2181,12 @@ class JSONDatabase:
         user = self.get_user(user_id)
         today = datetime.now().date().isoformat()
         
-        if user['last_report_date'] != today:
-            user['reports_today'] = 0
-            user['last_report_date'] = today
-            self.save()
+        with self._lock.write:
+            if user['last_report_date'] != today:
+                user['reports_today'] = 0
+                user['last_report_date'] = today
+                self._mark('user', str(user_id))
+        self.save()
         
         if user['reports_today'] >= 3:
             return False, "limit_exceeded"
@@ -216,153 +2196,975 @@ class JSONDatabase:
     def increment_user_report(self, user_id: int):
         """Increment user report count"""
         user = self.get_user(user_id)
-        user['reports_today'] = user.get('reports_today', 0) + 1
-        user['report_count'] = user.get('report_count', 0) + 1
-        user['last_report_date'] = datetime.now().date().isoformat()
+        with self._lock.write:
+            user['reports_today'] = user.get('reports_today', 0) + 1
+            user['report_count'] = user.get('report_count', 0) + 1
+            user['last_report_date'] = datetime.now().date().isoformat()
+            self._mark('user', str(user_id))
         self.save()
     
     def increment_user_check(self, user_id: int):
         """Increment user check count"""
         user = self.get_user(user_id)
-        user['check_count'] = user.get('check_count', 0) + 1
+        with self._lock.write:
+            user['check_count'] = user.get('check_count', 0) + 1
+            self.data['statistics']['total_checks'] += 1
+            self._bump_daily('checks')
+            self._mark('user', str(user_id))
+            self._mark('stats')
         self.save()
-        self.data['statistics']['total_checks'] += 1
     
     # ========== REPORT MANAGEMENT ==========
     
     def add_report(self, report_data: Dict) -> int:
         """Add new report"""
         try:
-            report_id = len(self.data['reports']) + 1
-            report_data['id'] = report_id
-            report_data['timestamp'] = datetime.now().isoformat()
-            report_data['status'] = 'active'
-            
-            self.data['reports'].append(report_data)
-            
-            # Create unique key for scammer
-            scammer_key = f"{report_data.get('username', '').lower()}_{report_data.get('wallet_id', '').lower()}"
-            
-            if scammer_key not in self.data['scammers']:
-                self.data['scammers'][scammer_key] = {
-                    'username': report_data.get('username'),
-                    'telegram_link': report_data.get('telegram_link'),
-                    'wallet_id': report_data.get('wallet_id'),
-                    'report_count': 0,
-                    'reporter_count': 0,
-                    'reporters': set(),
-                    'total_amount': 0,
-                    'products': set(),
-                    'first_report': datetime.now().isoformat(),
-                    'last_report': datetime.now().isoformat()
-                }
-            
-            scammer = self.data['scammers'][scammer_key]
-            scammer['report_count'] += 1
-            scammer['reporters'].add(str(report_data['user_id']))
-            scammer['reporter_count'] = len(scammer['reporters'])
-            
-            amount = float(report_data.get('amount', 0))
-            if amount:
-                scammer['total_amount'] = scammer.get('total_amount', 0) + amount
-                # Ensure key exists
-                if 'total_amount_scammed' not in self.data['statistics']:
-                    self.data['statistics']['total_amount_scammed'] = 0
-                self.data['statistics']['total_amount_scammed'] += amount
-            
-            product = report_data.get('product', '')
-            if product:
-                scammer['products'].add(product)
-            
-            scammer['last_report'] = datetime.now().isoformat()
-            
-            # Update statistics
-            self.data['statistics']['total_reports'] += 1
-            self.data['statistics']['total_scammers'] = len(self.data['scammers'])
-            
+            with self._lock.write:
+                report_id = self._add_report(report_data)
+                self.generation += 1
             self.save()
             return report_id
         except Exception as e:
             logger.error(f"Error adding report: {e}")
             return 0
     
+    def _add_report(self, report_data: Dict) -> int:
+        """Record a report and update scammer aggregates; caller holds the lock"""
+        report_id = len(self._archive) + 1
+        report_data['id'] = report_id
+        report_data['timestamp'] = datetime.now().isoformat()
+        report_data['status'] = 'active'
+        
+        self._archive.append(report_data)
+        
+        # Create unique key for scammer
+        scammer_key = make_scammer_key(report_data.get('username'), report_data.get('wallet_id'))
+        now = iso_to_epoch(report_data['timestamp'])
+        
+        scammer = self.data['scammers'].get(scammer_key)
+        if scammer is None:
+            scammer = self.data['scammers'][scammer_key] = ScammerRecord(
+                report_data.get('username'), report_data.get('telegram_link'), report_data.get('wallet_id'), now, now
+            )
+            if self._unindexed is None:
+                self._index_scammer(scammer_key, scammer)
+            else:
+                self._unindexed.append(scammer_key)
+        
+        scammer.report_count += 1
+        scammer.add_reporter(int(report_data['user_id']))
+        
+        amount = float(report_data.get('amount', 0))
+        if amount:
+            scammer.total_amount += amount
+            # Ensure key exists
+            if 'total_amount_scammed' not in self.data['statistics']:
+                self.data['statistics']['total_amount_scammed'] = 0
+            self.data['statistics']['total_amount_scammed'] += amount
+        
+        product = report_data.get('product', '')
+        if product:
+            scammer.add_product(product)
+        
+        scammer.last_report = now
+        
+        # Update statistics
+        self.data['statistics']['total_reports'] += 1
+        self.data['statistics']['total_scammers'] = len(self.data['scammers'])
+        self._bump_daily('reports')
+        
+        for leaderboard in self._leaderboards.values():
+            leaderboard.update(scammer_key, scammer)
+        
+        self._mark('scammer', scammer_key)
+        self._mark('stats')
+        return report_id
+    
+    def export_data(self) -> Dict:
+        """Everything in the data.json layout, records converted back to dicts and reports included"""
+        with self._lock.read:
+            data = self._plain_layout(self.data)
+            data['reports'] = list(self._archive)
+        return data
+    
+    def get_scammer_reports(self, scammer_key: str, limit: Optional[int] = None) -> List[Dict]:
+        """Individual reports filed under a scammer, newest first, read from the archive"""
+        with self._lock.read:
+            return self._archive.scammer_reports(scammer_key, limit)
+    
     # ========== SCAMMER SEARCH ==========
     
     def find_scammer(self, search_input: str) -> List[Dict]:
         """Search for scammer"""
         results = []
-        search_input = search_input.lower().strip()
-        
-        # Process input
-        if search_input.startswith('@'):
-            search_input = search_input[1:]
-        elif 't.me/' in search_input:
-            search_input = search_input.split('t.me/')[-1].split('/')[0]
         
-        for scammer_key, scammer in self.data['scammers'].items():
-            match = False
+        self._indexes_ready.wait()
+        with self._lock.read:
+            # Exact canonical matches first, then scammers sharing every trigram
+            # of the query whose fields contain it
+            scammer_keys = self._identifiers.lookup(query_identifier_forms(search_input))
+            exact = set(scammer_keys)
+            scammer_keys += [scammer_key for scammer_key in self._trigrams.search(normalize_search_input(search_input))
+                             if scammer_key not in exact]
             
-            # Check username
-            if scammer.get('username'):
-                username_lower = scammer['username'].lower().replace('@', '')
-                if search_input in username_lower:
-                    match = True
+            for scammer_key in scammer_keys:
+                results.append(self.data['scammers'][scammer_key].to_dict())
+        
+        return results
+    
+    def find_lookalikes(self, search_input: str, exclude: Set[str] = frozenset()) -> List[Dict]:
+        """Scammers whose username is a near miss of the queried one, closest first"""
+        if LOOKALIKE_MAX_DISTANCE <= 0:
+            return []
+        
+        results = []
+        self._indexes_ready.wait()
+        with self._lock.read:
+            matches = self._lookalikes.search(
+                canonical_username(search_input), LOOKALIKE_MAX_DISTANCE, LOOKALIKE_LIMIT + len(exclude)
+            )
+            for distance, name, scammer_key in matches:
+                if scammer_key in exclude or any(r['key'] == scammer_key for r in results):
+                    continue
+                scammer = self.data['scammers'][scammer_key]
+                results.append({
+                    'key': scammer_key,
+                    'name': name,
+                    'distance': distance,
+                    'username': scammer.username,
+                    'report_count': scammer.report_count,
+                })
+        
+        return results[:LOOKALIKE_LIMIT]
+    
+    # ========== STATISTICS ==========
+    
+    def get_statistics(self, days: int = 7) -> Dict:
+        """Get overall statistics, with recent_* counters covering the last `days` calendar days"""
+        today = datetime.now().date()
+        recent = {'reports': 0, 'checks': 0, 'users': 0}
+        with self._lock.read:
+            stats = self.data['statistics'].copy()
+            stats['active_users'] = len(self.data['users'])
+            stats['active_scammers'] = len(self.data['scammers'])
             
-            # Check telegram link
-            if not match and scammer.get('telegram_link'):
-                link_lower = scammer['telegram_link'].lower()
-                if search_input in link_lower:
-                    match = True
+            # Sum the per-day buckets of the window instead of scanning every report
+            daily = self.data['daily_statistics']
+            for offset in range(days):
+                bucket = daily.get((today - timedelta(days=offset)).isoformat())
+                if bucket:
+                    for metric in recent:
+                        recent[metric] += bucket.get(metric, 0)
+        stats['recent_reports'] = recent['reports']
+        stats['recent_checks'] = recent['checks']
+        stats['recent_users'] = recent['users']
+        
+        return stats
+    
+    def get_top_scammers(self, limit: int = 10, order_by: str = 'reports') -> List[Dict]:
+        """Get top scammers ranked by 'reports', 'reporters' or 'amount'"""
+        if order_by not in self._leaderboards:
+            # Built on first use; add_report keeps it current afterwards
+            with self._lock.write:
+                if order_by not in self._leaderboards:
+                    leaderboard = Leaderboard(order_by)
+                    leaderboard.build(self.data['scammers'].items())
+                    self._leaderboards[order_by] = leaderboard
+        
+        with self._lock.read:
+            leaderboard = self._leaderboards[order_by]
+            scammers_list = []
+            for scammer_key in leaderboard.top(limit):
+                scammers_list.append(self.data['scammers'][scammer_key].to_dict())
+        
+        return scammers_list
+
+# ============================================
+# SQLITE DATABASE MANAGEMENT
+# ============================================
+
+class SQLiteDatabase:
+    """Class for managing data storage in a SQLite database, same interface as JSONDatabase"""
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id TEXT PRIMARY KEY,
+            language TEXT NOT NULL DEFAULT 'en',
+            reports_today INTEGER NOT NULL DEFAULT 0,
+            last_report_date TEXT,
+            report_count INTEGER NOT NULL DEFAULT 0,
+            check_count INTEGER NOT NULL DEFAULT 0,
+            join_date TEXT,
+            username TEXT,
+            first_name TEXT,
+            last_name TEXT
+        );
+        CREATE TABLE IF NOT EXISTS reports (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            username TEXT,
+            telegram_link TEXT,
+            wallet_id TEXT,
+            amount REAL NOT NULL DEFAULT 0,
+            product TEXT,
+            timestamp TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'active',
+            scammer_key TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_reports_timestamp ON reports(timestamp);
+        CREATE TABLE IF NOT EXISTS scammers (
+            scammer_key TEXT PRIMARY KEY,
+            username TEXT,
+            telegram_link TEXT,
+            wallet_id TEXT,
+            report_count INTEGER NOT NULL DEFAULT 0,
+            reporter_count INTEGER NOT NULL DEFAULT 0,
+            total_amount REAL NOT NULL DEFAULT 0,
+            first_report TEXT,
+            last_report TEXT
+        );
+        DROP INDEX IF EXISTS idx_scammers_username;
+        DROP INDEX IF EXISTS idx_scammers_wallet_id;
+        DROP INDEX IF EXISTS idx_scammers_report_count;
+        CREATE INDEX IF NOT EXISTS idx_scammers_rank_reports
+            ON scammers(report_count DESC, reporter_count DESC, total_amount DESC);
+        CREATE INDEX IF NOT EXISTS idx_scammers_rank_reporters
+            ON scammers(reporter_count DESC, report_count DESC, total_amount DESC);
+        CREATE INDEX IF NOT EXISTS idx_scammers_rank_amount
+            ON scammers(total_amount DESC, report_count DESC, reporter_count DESC);
+        CREATE TABLE IF NOT EXISTS scammer_reporters (
+            scammer_key TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            PRIMARY KEY (scammer_key, user_id)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS scammer_products (
+            scammer_key TEXT NOT NULL,
+            product TEXT NOT NULL,
+            PRIMARY KEY (scammer_key, product)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS scammer_identifiers (
+            identifier TEXT NOT NULL,
+            scammer_key TEXT NOT NULL,
+            PRIMARY KEY (identifier, scammer_key)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_scammer_identifiers_key ON scammer_identifiers(scammer_key);
+        CREATE TABLE IF NOT EXISTS scammer_trigrams (
+            trigram TEXT NOT NULL,
+            scammer_key TEXT NOT NULL,
+            PRIMARY KEY (trigram, scammer_key)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_scammer_trigrams_key ON scammer_trigrams(scammer_key);
+        CREATE TABLE IF NOT EXISTS statistics (
+            name TEXT PRIMARY KEY,
+            value NUMERIC NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS daily_statistics (
+            day TEXT NOT NULL,
+            name TEXT NOT NULL,
+            value INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, name)
+        ) WITHOUT ROWID;
+    """
+    
+    DEFAULT_STATISTICS = ('total_reports', 'total_users', 'total_checks', 'total_scammers', 'total_amount_scammed')
+    # Partial queries intersect their rarest few trigrams in SQL and the substring check covers
+    # the rest; posting lists are counted only up to a bound to find them
+    MAX_QUERY_TRIGRAMS = 3
+    TRIGRAM_COUNT_LIMIT = 1000
+    
+    def __init__(self, filename: str = DB_SQLITE_FILE):
+        self.filename = filename
+        # Writes go through self.conn under the exclusive lock; each handler thread
+        # reads through its own connection, which WAL lets run alongside the writer
+        self._lock = ReadWriteLock()
+        # Bumped whenever scammer data changes, so cached check results can tell they are stale
+        self.generation = 0
+        self._local = threading.local()
+        self._reader_conns = []
+        self.conn = self._connect()
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        with self.conn:
+            self.conn.executescript(self.SCHEMA)
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO statistics (name, value) VALUES (?, 0)',
+                [(name,) for name in self.DEFAULT_STATISTICS]
+            )
+        self._canonicalize_scammer_keys()
+        self._key_reports()
+        self._index_unindexed_scammers()
+        self._build_indexes()
+        atexit.register(self.close)
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection with the row factory and functions queries rely on"""
+        conn = sqlite3.connect(self.filename, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        # Same folding as the JSON backend so non-ASCII identifiers match identically
+        conn.create_function(
+            'py_skeleton', 1, lambda s: confusable_skeleton(s) if s is not None else None, deterministic=True
+        )
+        conn.create_function('py_scammer_key', 2, make_scammer_key, deterministic=True)
+        return conn
+    
+    def _canonicalize_scammer_keys(self):
+        """Re-key scammers stored under outdated keys, merging entries that collide"""
+        rows = self.conn.execute('SELECT scammer_key, username, wallet_id FROM scammers').fetchall()
+        moves = [(row[0], make_scammer_key(row[1], row[2])) for row in rows]
+        moves = [(old_key, scammer_key) for old_key, scammer_key in moves if old_key != scammer_key]
+        if not moves:
+            return
+        
+        with self.conn:
+            for old_key, scammer_key in moves:
+                if self.conn.execute('SELECT 1 FROM scammers WHERE scammer_key = ?', (scammer_key,)).fetchone():
+                    old = self.conn.execute(
+                        'SELECT report_count, total_amount, first_report, last_report FROM scammers '
+                        'WHERE scammer_key = ?', (old_key,)
+                    ).fetchone()
+                    self.conn.execute(
+                        'UPDATE scammers SET report_count = report_count + ?, total_amount = total_amount + ?, '
+                        'first_report = min(first_report, ?), last_report = max(last_report, ?) '
+                        'WHERE scammer_key = ?',
+                        (*old, scammer_key)
+                    )
+                    for table, column in (('scammer_reporters', 'user_id'), ('scammer_products', 'product')):
+                        self.conn.execute(
+                            f'INSERT OR IGNORE INTO {table} (scammer_key, {column}) '
+                            f'SELECT ?, {column} FROM {table} WHERE scammer_key = ?',
+                            (scammer_key, old_key)
+                        )
+                        self.conn.execute(f'DELETE FROM {table} WHERE scammer_key = ?', (old_key,))
+                    self.conn.execute('DELETE FROM scammers WHERE scammer_key = ?', (old_key,))
+                    self._unindex_scammer(old_key)
+                    self.conn.execute(
+                        'UPDATE scammers SET reporter_count = '
+                        '(SELECT COUNT(*) FROM scammer_reporters WHERE scammer_key = ?) WHERE scammer_key = ?',
+                        (scammer_key, scammer_key)
+                    )
+                else:
+                    for table in ('scammers', 'scammer_reporters', 'scammer_products'):
+                        self.conn.execute(
+                            f'UPDATE {table} SET scammer_key = ? WHERE scammer_key = ?', (scammer_key, old_key)
+                        )
+                    # Identifiers are derived with the same canonical forms as the key, so rebuild them
+                    self._unindex_scammer(old_key)
+                    row = self.conn.execute(
+                        'SELECT username, telegram_link, wallet_id FROM scammers WHERE scammer_key = ?', (scammer_key,)
+                    ).fetchone()
+                    self._unindex_scammer(scammer_key)
+                    self._index_scammer(scammer_key, *row)
+            self.conn.execute(
+                "UPDATE statistics SET value = (SELECT COUNT(*) FROM scammers) WHERE name = 'total_scammers'"
+            )
+        logger.info(f"Re-keyed {len(moves)} scammer entries to canonical identifiers")
+    
+    def _key_reports(self):
+        """File every report under its scammer's current key, for get_scammer_reports"""
+        with self.conn:
+            # Databases created before reports carried the key
+            columns = [row[1] for row in self.conn.execute('PRAGMA table_info(reports)')]
+            if 'scammer_key' not in columns:
+                self.conn.execute('ALTER TABLE reports ADD COLUMN scammer_key TEXT')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_reports_scammer_key ON reports(scammer_key, id)')
+            # Also re-keys reports whose key changed with the canonical form
+            updated = self.conn.execute(
+                'UPDATE reports SET scammer_key = py_scammer_key(username, wallet_id) '
+                'WHERE scammer_key IS NOT py_scammer_key(username, wallet_id)'
+            ).rowcount
+        if updated:
+            logger.info(f"Filed {updated} reports under their scammer keys")
+    
+    def _index_scammer(self, scammer_key: str, username: Optional[str], telegram_link: Optional[str],
+                       wallet_id: Optional[str]):
+        """Record the identifiers and search-field trigrams a scammer is found by; caller runs inside a transaction"""
+        self.conn.executemany(
+            'INSERT OR IGNORE INTO scammer_identifiers (identifier, scammer_key) VALUES (?, ?)',
+            [(identifier, scammer_key) for identifier in identifier_forms(username, telegram_link, wallet_id)]
+        )
+        grams = set()
+        for text in scammer_search_fields(username, telegram_link, wallet_id):
+            grams |= TrigramIndex.trigrams(text)
+        self.conn.executemany(
+            'INSERT OR IGNORE INTO scammer_trigrams (trigram, scammer_key) VALUES (?, ?)',
+            [(gram, scammer_key) for gram in grams]
+        )
+    
+    def _unindex_scammer(self, scammer_key: str):
+        """Forget a scammer's identifiers and trigrams; caller runs inside a transaction"""
+        self.conn.execute('DELETE FROM scammer_identifiers WHERE scammer_key = ?', (scammer_key,))
+        self.conn.execute('DELETE FROM scammer_trigrams WHERE scammer_key = ?', (scammer_key,))
+    
+    def _index_unindexed_scammers(self):
+        """Record identifiers and trigrams of scammers stored before their tables existed"""
+        # Identifiers recorded before they carried their field's prefix are indexed again
+        with self.conn:
+            self.conn.execute("DELETE FROM scammer_identifiers WHERE identifier NOT GLOB '[ulw]:*'")
+        rows = self.conn.execute(
+            'SELECT scammer_key, username, telegram_link, wallet_id FROM scammers '
+            'WHERE scammer_key NOT IN (SELECT scammer_key FROM scammer_identifiers) '
+            'OR scammer_key NOT IN (SELECT scammer_key FROM scammer_trigrams)'
+        ).fetchall()
+        if not rows:
+            return
+        with self.conn:
+            for row in rows:
+                self._index_scammer(*row)
+        logger.info(f"Indexed identifiers and trigrams of {len(rows)} scammers")
+    
+    def _build_indexes(self):
+        """Load every scammer's identifiers into the in-memory lookalike index and Bloom filter"""
+        self._lookalikes = LookalikeIndex()
+        rows = self.conn.execute('SELECT scammer_key, username, telegram_link, wallet_id FROM scammers').fetchall()
+        for row in rows:
+            self._lookalikes.add(row[0], lookalike_names(row[1], row[2]))
+        self._bloom = build_scammer_filter(row[1:] for row in rows)
+    
+    def _filter_scammer(self, username: Optional[str], telegram_link: Optional[str], wallet_id: Optional[str]):
+        """Add a scammer to the Bloom filter, resizing it once it holds its capacity"""
+        if self._bloom is None:
+            return
+        for item in scammer_filter_items(username, telegram_link, wallet_id):
+            self._bloom.add(item)
+        if self._bloom.full:
+            self._bloom = build_scammer_filter(
+                self.conn.execute('SELECT username, telegram_link, wallet_id FROM scammers')
+            )
+    
+    def _reader(self) -> sqlite3.Connection:
+        """This thread's read connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            self._reader_conns.append(conn)
+        return conn
+    
+    def save(self):
+        """Every mutation commits its own transaction; nothing to do"""
+    
+    def flush(self):
+        """Every mutation commits its own transaction; nothing to do"""
+    
+    def close(self):
+        """Close the database connections"""
+        with self._lock.write:
+            for conn in self._reader_conns:
+                conn.close()
+            self._reader_conns.clear()
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+    
+    def _bump_statistic(self, name: str, amount: float = 1):
+        """Increment a statistics counter; caller runs inside a transaction"""
+        self.conn.execute('UPDATE statistics SET value = value + ? WHERE name = ?', (amount, name))
+    
+    def _bump_daily(self, metric: str, amount: int = 1):
+        """Increment today's counter for a metric; caller runs inside a transaction"""
+        self.conn.execute(
+            'INSERT INTO daily_statistics (day, name, value) VALUES (?, ?, ?) '
+            'ON CONFLICT (day, name) DO UPDATE SET value = value + excluded.value',
+            (datetime.now().date().isoformat(), metric, amount)
+        )
+    
+    def _scammer_rows_to_dicts(self, conn: sqlite3.Connection, rows: List[sqlite3.Row]) -> List[Dict]:
+        """Convert scammer rows into the dicts returned by JSONDatabase"""
+        if not rows:
+            return []
+        
+        keys = [row['scammer_key'] for row in rows]
+        placeholders = ','.join('?' * len(keys))
+        reporters = {key: [] for key in keys}
+        products = {key: [] for key in keys}
+        for row in conn.execute(
+                f'SELECT scammer_key, user_id FROM scammer_reporters WHERE scammer_key IN ({placeholders})', keys):
+            reporters[row[0]].append(row[1])
+        for row in conn.execute(
+                f'SELECT scammer_key, product FROM scammer_products WHERE scammer_key IN ({placeholders})', keys):
+            products[row[0]].append(row[1])
+        
+        results = []
+        for row in rows:
+            scammer = dict(row)
+            key = scammer.pop('scammer_key')
+            scammer['reporters'] = reporters[key]
+            scammer['products'] = products[key]
+            results.append(scammer)
+        return results
+    
+    # ========== USER MANAGEMENT ==========
+    
+    def get_user(self, user_id: int) -> Dict:
+        """Get user information"""
+        user_id_str = str(user_id)
+        with self._lock.read:
+            row = self._reader().execute('SELECT * FROM users WHERE user_id = ?', (user_id_str,)).fetchone()
+        if row is None:
+            with self._lock.write:
+                row = self.conn.execute('SELECT * FROM users WHERE user_id = ?', (user_id_str,)).fetchone()
+                if row is None:
+                    with self.conn:
+                        self.conn.execute(
+                            'INSERT INTO users (user_id, join_date) VALUES (?, ?)',
+                            (user_id_str, datetime.now().isoformat())
+                        )
+                        self._bump_statistic('total_users')
+                        self._bump_daily('users')
+                    row = self.conn.execute('SELECT * FROM users WHERE user_id = ?', (user_id_str,)).fetchone()
+        user = dict(row)
+        del user['user_id']
+        return user
+    
+    def get_user_language(self, user_id: int) -> str:
+        """Get user language without creating the user"""
+        with self._lock.read:
+            row = self._reader().execute('SELECT language FROM users WHERE user_id = ?', (str(user_id),)).fetchone()
+        return row[0] if row else 'en'
+    
+    def update_user_info(self, user_id: int, username: str, first_name: str, last_name: str):
+        """Update user information"""
+        self.get_user(user_id)
+        with self._lock.write, self.conn:
+            self.conn.execute(
+                'UPDATE users SET username = ?, first_name = ?, last_name = ? WHERE user_id = ?',
+                (username, first_name, last_name, str(user_id))
+            )
+    
+    def update_user_language(self, user_id: int, language: str):
+        """Update user language"""
+        self.get_user(user_id)
+        with self._lock.write, self.conn:
+            self.conn.execute('UPDATE users SET language = ? WHERE user_id = ?', (language, str(user_id)))
+    
+    def can_report(self, user_id: int) -> Tuple[bool, str]:
+        """Check if user can report"""
+        user = self.get_user(user_id)
+        today = datetime.now().date().isoformat()
+        
+        if user['last_report_date'] != today:
+            with self._lock.write, self.conn:
+                self.conn.execute(
+                    'UPDATE users SET reports_today = 0, last_report_date = ? WHERE user_id = ?',
+                    (today, str(user_id))
+                )
+            user['reports_today'] = 0
+        
+        if user['reports_today'] >= 3:
+            return False, "limit_exceeded"
+        
+        return True, ""
+    
+    def increment_user_report(self, user_id: int):
+        """Increment user report count"""
+        self.get_user(user_id)
+        with self._lock.write, self.conn:
+            self.conn.execute(
+                'UPDATE users SET reports_today = reports_today + 1, report_count = report_count + 1, '
+                'last_report_date = ? WHERE user_id = ?',
+                (datetime.now().date().isoformat(), str(user_id))
+            )
+    
+    def increment_user_check(self, user_id: int):
+        """Increment user check count"""
+        self.get_user(user_id)
+        with self._lock.write, self.conn:
+            self.conn.execute('UPDATE users SET check_count = check_count + 1 WHERE user_id = ?', (str(user_id),))
+            self._bump_statistic('total_checks')
+            self._bump_daily('checks')
+    
+    # ========== REPORT MANAGEMENT ==========
+    
+    def add_report(self, report_data: Dict) -> int:
+        """Add new report"""
+        try:
+            with self._lock.write, self.conn:
+                report_id = self._add_report(report_data)
+                self.generation += 1
+                return report_id
+        except Exception as e:
+            logger.error(f"Error adding report: {e}")
+            return 0
+    
+    def _add_report(self, report_data: Dict) -> int:
+        """Record a report and update scammer aggregates; caller runs inside a transaction"""
+        now = datetime.now().isoformat()
+        report_data['timestamp'] = now
+        report_data['status'] = 'active'
+        amount = float(report_data.get('amount', 0))
+        
+        # Create unique key for scammer
+        scammer_key = make_scammer_key(report_data.get('username'), report_data.get('wallet_id'))
+        
+        cursor = self.conn.execute(
+            'INSERT INTO reports (id, user_id, username, telegram_link, wallet_id, amount, product, timestamp, status, '
+            'scammer_key) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (report_data.get('id'), report_data.get('user_id'), report_data.get('username'),
+             report_data.get('telegram_link'), report_data.get('wallet_id'), amount,
+             report_data.get('product'), now, 'active', scammer_key)
+        )
+        report_id = cursor.lastrowid
+        report_data['id'] = report_id
+        
+        inserted = self.conn.execute(
+            'INSERT OR IGNORE INTO scammers (scammer_key, username, telegram_link, wallet_id, first_report) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (scammer_key, report_data.get('username'), report_data.get('telegram_link'),
+             report_data.get('wallet_id'), now)
+        ).rowcount
+        if inserted:
+            # Like the JSON backend, a scammer is found by the identifiers of its first report
+            self._index_scammer(
+                scammer_key, report_data.get('username'), report_data.get('telegram_link'), report_data.get('wallet_id')
+            )
+        self._lookalikes.add(scammer_key, lookalike_names(report_data.get('username'), report_data.get('telegram_link')))
+        self._filter_scammer(report_data.get('username'), report_data.get('telegram_link'), report_data.get('wallet_id'))
+        self.conn.execute(
+            'INSERT OR IGNORE INTO scammer_reporters (scammer_key, user_id) VALUES (?, ?)',
+            (scammer_key, str(report_data['user_id']))
+        )
+        product = report_data.get('product', '')
+        if product:
+            self.conn.execute(
+                'INSERT OR IGNORE INTO scammer_products (scammer_key, product) VALUES (?, ?)',
+                (scammer_key, product)
+            )
+        self.conn.execute(
+            'UPDATE scammers SET report_count = report_count + 1, total_amount = total_amount + ?, '
+            'last_report = ?, reporter_count = '
+            '(SELECT COUNT(*) FROM scammer_reporters WHERE scammer_reporters.scammer_key = scammers.scammer_key) '
+            'WHERE scammer_key = ?',
+            (amount, now, scammer_key)
+        )
+        
+        # Update statistics
+        self._bump_statistic('total_reports')
+        self._bump_daily('reports')
+        if amount:
+            self._bump_statistic('total_amount_scammed', amount)
+        self.conn.execute(
+            "UPDATE statistics SET value = (SELECT COUNT(*) FROM scammers) WHERE name = 'total_scammers'"
+        )
+        return report_id
+    
+    def get_scammer_reports(self, scammer_key: str, limit: Optional[int] = None) -> List[Dict]:
+        """Individual reports filed under a scammer, newest first"""
+        with self._lock.read:
+            rows = self._reader().execute(
+                'SELECT id, user_id, username, telegram_link, wallet_id, amount, product, timestamp, status '
+                'FROM reports WHERE scammer_key = ? ORDER BY id DESC LIMIT ?',
+                (scammer_key, -1 if limit is None else limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+    
+    # ========== SCAMMER SEARCH ==========
+    
+    def find_scammer(self, search_input: str) -> List[Dict]:
+        """Search for scammer"""
+        with self._lock.read:
+            # Most checks are for clean accounts; rule them out before scanning the table
+            if not query_may_match(self._bloom, search_input):
+                return []
             
-            # Check wallet ID
-            if not match and scammer.get('wallet_id'):
-                wallet_lower = scammer['wallet_id'].lower()
-                if search_input in wallet_lower:
-                    match = True
+            # Exact canonical match first, through the identifier table's primary key
+            conn = self._reader()
+            scammer_keys = []
+            for identifier in query_identifier_forms(search_input):
+                for row in conn.execute(
+                        'SELECT scammer_identifiers.scammer_key FROM scammer_identifiers '
+                        'JOIN scammers USING (scammer_key) WHERE identifier = ? ORDER BY scammers.rowid',
+                        (identifier,)):
+                    if row[0] not in scammer_keys:
+                        scammer_keys.append(row[0])
+            exact_rows = []
+            if scammer_keys:
+                placeholders = ','.join('?' * len(scammer_keys))
+                exact_rows = conn.execute(
+                    f'SELECT * FROM scammers WHERE scammer_key IN ({placeholders})', scammer_keys
+                ).fetchall()
+                position = {scammer_key: i for i, scammer_key in enumerate(scammer_keys)}
+                exact_rows.sort(key=lambda row: position[row['scammer_key']])
             
-            if match:
-                # Create safe copy
-                scammer_copy = scammer.copy()
-                scammer_copy['reporters'] = list(scammer_copy.get('reporters', set()))
-                scammer_copy['products'] = list(scammer_copy.get('products', set()))
-                results.append(scammer_copy)
+            search_input = normalize_search_input(search_input)
+            matches = (
+                "(instr(replace(py_skeleton(username), '@', ''), ?) > 0 "
+                "OR instr(py_skeleton(telegram_link), ?) > 0 OR instr(py_skeleton(wallet_id), ?) > 0)"
+            )
+            grams = self._rarest_trigrams(conn, TrigramIndex.trigrams(search_input))
+            if grams:
+                # Then narrow to scammers sharing the query's trigrams and verify the substring
+                candidates = ' INTERSECT '.join(['SELECT scammer_key FROM scammer_trigrams WHERE trigram = ?'] * len(grams))
+                rows = conn.execute(
+                    f"SELECT * FROM scammers WHERE scammer_key IN ({candidates}) AND {matches} ORDER BY rowid",
+                    (*grams, search_input, search_input, search_input)
+                ).fetchall()
+            else:
+                # Too short to narrow
+                rows = conn.execute(
+                    f"SELECT * FROM scammers WHERE {matches} ORDER BY rowid",
+                    (search_input, search_input, search_input)
+                ).fetchall()
+            exact = set(scammer_keys)
+            rows = exact_rows + [row for row in rows if row['scammer_key'] not in exact]
+            return self._scammer_rows_to_dicts(conn, rows)
+    
+    def _rarest_trigrams(self, conn: sqlite3.Connection, grams: Set[str]) -> List[str]:
+        """The query trigrams with the fewest scammers, rarest first"""
+        counts = []
+        for gram in grams:
+            count = conn.execute(
+                'SELECT COUNT(*) FROM (SELECT 1 FROM scammer_trigrams WHERE trigram = ? LIMIT ?)',
+                (gram, self.TRIGRAM_COUNT_LIMIT)
+            ).fetchone()[0]
+            if not count:
+                # No scammer has it, so none can match
+                return [gram]
+            counts.append((count, gram))
+        counts.sort()
+        return [gram for count, gram in counts[:self.MAX_QUERY_TRIGRAMS]]
+    
+    def find_lookalikes(self, search_input: str, exclude: Set[str] = frozenset()) -> List[Dict]:
+        """Scammers whose username is a near miss of the queried one, closest first"""
+        if LOOKALIKE_MAX_DISTANCE <= 0:
+            return []
         
-        return results
+        results = []
+        with self._lock.read:
+            matches = self._lookalikes.search(
+                canonical_username(search_input), LOOKALIKE_MAX_DISTANCE, LOOKALIKE_LIMIT + len(exclude)
+            )
+            conn = self._reader()
+            for distance, name, scammer_key in matches:
+                if scammer_key in exclude or any(r['key'] == scammer_key for r in results):
+                    continue
+                row = conn.execute(
+                    'SELECT username, report_count FROM scammers WHERE scammer_key = ?', (scammer_key,)
+                ).fetchone()
+                if row is None:
+                    continue
+                results.append({
+                    'key': scammer_key,
+                    'name': name,
+                    'distance': distance,
+                    'username': row['username'],
+                    'report_count': row['report_count'],
+                })
+        
+        return results[:LOOKALIKE_LIMIT]
     
     # ========== STATISTICS ==========
     
-    def get_statistics(self) -> Dict:
-        """Get overall statistics"""
-        stats = self.data['statistics'].copy()
-        stats['active_users'] = len(self.data['users'])
-        stats['active_scammers'] = len(self.data['scammers'])
-        
-        # Calculate reports from last 7 days
-        week_ago = (datetime.now() - timedelta(days=7)).isoformat()
-        recent_reports = [r for r in self.data['reports'] if r.get('timestamp', '') > week_ago]
-        stats['recent_reports'] = len(recent_reports)
+    def get_statistics(self, days: int = 7) -> Dict:
+        """Get overall statistics, with recent_* counters covering the last `days` calendar days"""
+        first_day = (datetime.now().date() - timedelta(days=days - 1)).isoformat()
+        with self._lock.read:
+            conn = self._reader()
+            stats = {row['name']: row['value'] for row in conn.execute('SELECT name, value FROM statistics')}
+            stats['active_users'] = conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+            stats['active_scammers'] = conn.execute('SELECT COUNT(*) FROM scammers').fetchone()[0]
+            
+            recent = {'reports': 0, 'checks': 0, 'users': 0}
+            for row in conn.execute(
+                    'SELECT name, SUM(value) FROM daily_statistics WHERE day >= ? GROUP BY name', (first_day,)):
+                recent[row[0]] = row[1]
         
+        stats['recent_reports'] = recent['reports']
+        stats['recent_checks'] = recent['checks']
+        stats['recent_users'] = recent['users']
         return stats
     
-    def get_top_scammers(self, limit: int = 10) -> List[Dict]:
-        """Get top scammers"""
-        scammers_list = []
-        for scammer_key, scammer in self.data['scammers'].items():
-            scammer_copy = scammer.copy()
-            scammer_copy['reporters'] = list(scammer_copy.get('reporters', set()))
-            scammer_copy['products'] = list(scammer_copy.get('products', set()))
-            scammers_list.append(scammer_copy)
-        
-        scammers_list.sort(key=lambda x: x['report_count'], reverse=True)
-        return scammers_list[:limit]
+    def get_top_scammers(self, limit: int = 10, order_by: str = 'reports') -> List[Dict]:
+        """Get top scammers ranked by 'reports', 'reporters' or 'amount'"""
+        order = ', '.join(f'{field} DESC' for field in Leaderboard.ORDERINGS[order_by])
+        with self._lock.read:
+            conn = self._reader()
+            rows = conn.execute(
+                f'SELECT * FROM scammers ORDER BY {order}, rowid LIMIT ?', (limit,)
+            ).fetchall()
+            return self._scammer_rows_to_dicts(conn, rows)
+    
+    # ========== MIGRATION ==========
+    
+    def import_json(self, data: Dict):
+        """Bulk-load the data.json layout into empty tables in one transaction"""
+        with self._lock.write, self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO users (user_id, language, reports_today, last_report_date, report_count, '
+                'check_count, join_date, username, first_name, last_name) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(user_id, user.get('language', 'en'), user.get('reports_today', 0), user.get('last_report_date'),
+                  user.get('report_count', 0), user.get('check_count', 0), user.get('join_date'),
+                  user.get('username'), user.get('first_name'), user.get('last_name'))
+                 for user_id, user in data.get('users', {}).items()]
+            )
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO reports (id, user_id, username, telegram_link, wallet_id, amount, product, '
+                'timestamp, status, scammer_key) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(report.get('id'), report.get('user_id'), report.get('username'), report.get('telegram_link'),
+                  report.get('wallet_id'), float(report.get('amount', 0) or 0), report.get('product'),
+                  report.get('timestamp', ''), report.get('status', 'active'),
+                  make_scammer_key(report.get('username'), report.get('wallet_id')))
+                 for report in data.get('reports', [])]
+            )
+            for scammer_key, scammer in data.get('scammers', {}).items():
+                self.conn.execute(
+                    'INSERT OR REPLACE INTO scammers (scammer_key, username, telegram_link, wallet_id, report_count, '
+                    'reporter_count, total_amount, first_report, last_report) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (scammer_key, scammer.get('username'), scammer.get('telegram_link'), scammer.get('wallet_id'),
+                     scammer.get('report_count', 0), scammer.get('reporter_count', 0),
+                     scammer.get('total_amount', 0), scammer.get('first_report'), scammer.get('last_report'))
+                )
+                self.conn.executemany(
+                    'INSERT OR IGNORE INTO scammer_reporters (scammer_key, user_id) VALUES (?, ?)',
+                    [(scammer_key, str(reporter)) for reporter in scammer.get('reporters', [])]
+                )
+                self.conn.executemany(
+                    'INSERT OR IGNORE INTO scammer_products (scammer_key, product) VALUES (?, ?)',
+                    [(scammer_key, product) for product in scammer.get('products', [])]
+                )
+                self._index_scammer(
+                    scammer_key, scammer.get('username'), scammer.get('telegram_link'), scammer.get('wallet_id')
+                )
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO statistics (name, value) VALUES (?, ?)',
+                list(data.get('statistics', {}).items())
+            )
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO daily_statistics (day, name, value) VALUES (?, ?, ?)',
+                [(day, metric, value)
+                 for day, bucket in data.get('daily_statistics', {}).items()
+                 for metric, value in bucket.items()]
+            )
+            self._build_indexes()
+            self.generation += 1
+
+def migrate_json_to_sqlite(json_file: str = DB_FILE, sqlite_file: str = DB_SQLITE_FILE):
+    """One-shot migration of data.json (plus any pending journal) into a SQLite database"""
+    source = JSONDatabase(json_file, durability='sync', read_only=True)
+    target = SQLiteDatabase(sqlite_file)
+    try:
+        target.import_json(source.export_data())
+        stats = target.get_statistics()
+        print(f"✅ Migrated {json_file} -> {sqlite_file}")
+        print(f"   • Users: {stats['active_users']}")
+        print(f"   • Reports: {stats['total_reports']}")
+        print(f"   • Scammers: {stats['active_scammers']}")
+    finally:
+        target.close()
+        source.close()
+
+def create_database():
+    """Create the storage backend selected by DB_BACKEND"""
+    if DB_BACKEND == 'sqlite':
+        return SQLiteDatabase()
+    return JSONDatabase()
 
 # Initialize database
-db = JSONDatabase()
+db = create_database()
 
 # ============================================
 # MULTI-LANGUAGE SYSTEM - FIXED
 # ============================================
 
+class CachedReplyKeyboardMarkup(ReplyKeyboardMarkup):
+    """Reply keyboard built once and shared between messages; serialized to JSON only once"""
+    
+    __slots__ = ('_json',)
+    
+    def to_json(self) -> str:
+        try:
+            return self._json
+        except AttributeError:
+            self._json = super().to_json()
+            return self._json
+
+class CachedInlineKeyboardMarkup(InlineKeyboardMarkup):
+    """Inline keyboard built once and shared between messages; serialized to JSON only once"""
+    
+    __slots__ = ('_json',)
+    
+    def to_json(self) -> str:
+        try:
+            return self._json
+        except AttributeError:
+            self._json = super().to_json()
+            return self._json
+
+class CompiledTemplate:
+    """Language template pre-parsed into literal text and the named fields it uses"""
+    
+    __slots__ = ('key', 'text', 'fields', 'markdown_error', '_parts')
+    
+    # How a value is escaped depending on where its placeholder sits in the MarkdownV2 template
+    ESCAPERS = {'text': escape_markdown, 'code': escape_markdown_code, 'url': escape_markdown_url}
+    
+    def __init__(self, key: str, text: str):
+        self.key = key
+        self.text = text
+        parts = []
+        fields = set()
+        # Raises ValueError for malformed templates such as an unmatched brace
+        for literal, field, format_spec, conversion in string.Formatter().parse(text):
+            if literal:
+                parts.append(literal)
+            if field is not None:
+                if not field.isidentifier():
+                    raise ValueError(f"Unsupported placeholder {{{field}}} in text '{key}'")
+                parts.append([field, format_spec, conversion, None])
+                fields.add(field)
+        self.fields = frozenset(fields)
+        
+        # Check the markup with placeholders blanked out and note each placeholder's context
+        skeleton = ''.join(part if part.__class__ is str else '\x00' for part in parts)
+        self.markdown_error, contexts = scan_markdown_v2(skeleton)
+        placeholders = [part for part in parts if part.__class__ is not str]
+        for part, context in zip(placeholders, contexts):
+            part[3] = self.ESCAPERS[context]
+        for part in placeholders:
+            part[3] = part[3] or escape_markdown
+        self._parts = [part if part.__class__ is str else tuple(part) for part in parts]
+        
+        if not fields:
+            # Nothing to substitute; keep the text with {{ }} escapes resolved
+            self.text = ''.join(parts)
+    
+    def render(self, values: Dict[str, Any]) -> str:
+        """Substitute already-formatted values for every field"""
+        if not self.fields:
+            return self.text
+        
+        out = []
+        for part in self._parts:
+            if part.__class__ is str:
+                out.append(part)
+                continue
+            field, format_spec, conversion, escape = part
+            value = values[field]
+            if isinstance(value, MarkdownText):
+                out.append(value)
+                continue
+            if conversion == 'r':
+                value = repr(value)
+            elif conversion == 'a':
+                value = ascii(value)
+            # Stored values are shown as reported, minus characters that would make them look like another
+            out.append(escape(strip_invisible(format(value, format_spec) if format_spec else str(value))))
+        return ''.join(out)
+
+def format_template_value(field: str, value: Any) -> Any:
+    """Display formatting for dates, counts and amounts passed to templates"""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d")
+    if isinstance(value, (int, float)):
+        if 'amount' in field:
+            return f"{value:,.0f}$"
+        return f"{value:,.0f}"
+    return value
+
+# Actions reachable from reply keyboard buttons; the key of each is also its label key
+MENU_ACTIONS = (
+    'menu_check', 'menu_report', 'menu_tips', 'menu_donate', 'menu_groups',
+    'menu_admins', 'menu_stats', 'menu_help', 'menu_language', 'cancel'
+)
+
 class LanguageManager:
     """Manage multi-language support for bot"""
     
@@ -389,6 +3191,37 @@ class LanguageManager:
                 'data': self._load_russian()
             }
         }
+        
+        # Compiled templates per language, English fallback already merged in
+        self._validate_languages()
+        english = {key: CompiledTemplate(key, text) for key, text in self.languages['en']['data'].items()}
+        self._templates = {
+            lang_code: {
+                **english,
+                **{key: CompiledTemplate(key, text) for key, text in lang_info['data'].items()}
+            }
+            for lang_code, lang_info in self.languages.items()
+        }
+        
+        # LRU of user_id -> language code, so text helpers don't hit the database per string;
+        # handlers on different worker threads reorder it, so every access holds the lock
+        self._user_languages: OrderedDict = OrderedDict()
+        self._user_languages_lock = threading.Lock()
+        
+        # Keyboards only vary by language, so build every one of them up front
+        self._markups = {
+            lang_code: {
+                'main_menu': self._build_main_menu_keyboard(lang_code),
+                'cancel': self._build_cancel_keyboard(lang_code),
+                'confirm': self._build_confirm_keyboard(lang_code),
+                'language': self._build_language_keyboard(lang_code),
+                'menu_button': self._build_menu_button_keyboard(lang_code),
+            }
+            for lang_code in self.languages
+        }
+        
+        # Button label -> action across every language, so routing doesn't depend on the user's language
+        self._menu_actions = self._build_menu_actions()
     
     def _load_english(self) -> Dict:
         """Load English language - PRIMARY LANGUAGE"""
@@ -507,6 +3340,11 @@ class LanguageManager:
                             '• 🔒 *ACTION REQUIRED*\\: Block and report to platform administrators\n\n'
                             '📞 *For mediation assistance, contact trusted mediators from the menu*\n'
                             '💡 *Remember\\: No legitimate business requires advance payment without verification*',
+            'check_lookalikes': '🔎 *POSSIBLE LOOKALIKES*\n\n'
+                               'Reported accounts with usernames very close to your query\\:\n'
+                               '{lookalikes}\n'
+                               '⚠️ *Impersonators often change a single character \\- compare the username exactly\\.*',
+            'lookalike_item': '• `{username}` \\- {distance} character\\(s\\) different, {reports} reports',
             
             # Safe trading tips
             'safe_tips': '⚠️ *SECURITY PROTOCOLS & BEST PRACTICES*\n\n'
@@ -743,6 +3581,11 @@ class LanguageManager:
                             '• 🔒 *HÀNH ĐỘNG CẦN THIẾT*\\: Chặn và báo cáo với quản trị viên nền tảng\n\n'
                             '📞 *Để được hỗ trợ trung gian, liên hệ với trung gian đáng tin từ menu*\n'
                             '💡 *Nhớ rằng\\: Không có doanh nghiệp hợp pháp nào yêu cầu thanh toán trước mà không xác minh*',
+            'check_lookalikes': '🔎 *CÓ THỂ LÀ TÀI KHOẢN GIẢ MẠO*\n\n'
+                               'Các tài khoản bị báo cáo có tên người dùng rất giống truy vấn của bạn\\:\n'
+                               '{lookalikes}\n'
+                               '⚠️ *Kẻ mạo danh thường chỉ đổi một ký tự \\- hãy so sánh chính xác tên người dùng\\.*',
+            'lookalike_item': '• `{username}` \\- khác {distance} ký tự, {reports} báo cáo',
             
             'language_changed': '🌐 *ĐÃ CẬP NHẬT CẤU HÌNH NGÔN NGỮ*\n\n'
                                '✅ *Thông báo hệ thống*\n'
@@ -819,50 +3662,127 @@ class LanguageManager:
             'menu_help': 'ℹ️ Центр поддержки',
         }
     
-    def get_text(self, user_id: int, key: str, **kwargs) -> str:
-        """Get text in user's language"""
-        user = db.get_user(user_id)
-        lang_code = user['language']
+    def get_user_language(self, user_id: int) -> str:
+        """Get user's language code, cached after the first lookup"""
+        with self._user_languages_lock:
+            lang_code = self._user_languages.get(user_id)
+            if lang_code is not None:
+                self._user_languages.move_to_end(user_id)
+                return lang_code
         
-        # Fallback to English if language not found
-        if lang_code not in self.languages:
-            lang_code = 'en'
+        # Read outside the lock, so a slow lookup doesn't hold up other users
+        lang_code = db.get_user_language(user_id)
+        with self._user_languages_lock:
+            # A language set meanwhile is newer than what was just read
+            lang_code = self._user_languages.setdefault(user_id, lang_code)
+            if len(self._user_languages) > LANGUAGE_CACHE_SIZE:
+                self._user_languages.popitem(last=False)
+        return lang_code
+    
+    def set_user_language(self, user_id: int, lang_code: str):
+        """Persist user's language and refresh the cached entry"""
+        db.update_user_language(user_id, lang_code)
+        with self._user_languages_lock:
+            self._user_languages[user_id] = lang_code
+            self._user_languages.move_to_end(user_id)
+            if len(self._user_languages) > LANGUAGE_CACHE_SIZE:
+                self._user_languages.popitem(last=False)
+    
+    def _validate_languages(self):
+        """Fail fast on malformed MarkdownV2 or translations that don't line up with the English templates"""
+        english = self.languages['en']['data']
+        english_fields = {key: CompiledTemplate(key, text).fields for key, text in english.items()}
         
-        lang_data = self.languages[lang_code]['data']
+        errors = []
+        for lang_code, lang_info in self.languages.items():
+            for key, text in lang_info['data'].items():
+                try:
+                    template = CompiledTemplate(key, text)
+                except ValueError as e:
+                    errors.append(f"{lang_code}.{key}: {e}")
+                    continue
+                fields = template.fields
+                if template.markdown_error:
+                    errors.append(f"{lang_code}.{key}: invalid MarkdownV2, {template.markdown_error}")
+                if key not in english_fields:
+                    errors.append(f"{lang_code}.{key}: key does not exist in English")
+                elif fields != english_fields[key]:
+                    missing = ', '.join(sorted(english_fields[key] - fields)) or '-'
+                    extra = ', '.join(sorted(fields - english_fields[key])) or '-'
+                    errors.append(f"{lang_code}.{key}: placeholders differ from English "
+                                  f"(missing: {missing}; unknown: {extra})")
         
-        # Get text with English fallback
-        text = lang_data.get(key, self.languages['en']['data'].get(key, key))
+        if errors:
+            raise ValueError("Invalid language packs:\n" + "\n".join(errors))
+    
+    def get_text(self, user_id: int, key: str, **kwargs) -> str:
+        """Get text in user's language"""
+        lang_code = self.get_user_language(user_id)
+        templates = self._templates.get(lang_code, self._templates['en'])
         
-        # Add timestamp if needed
-        if 'timestamp' not in kwargs:
-            kwargs['timestamp'] = datetime.now().strftime("%Y-%m-%d %H:%M")
+        template = templates.get(key)
+        if template is None:
+            logger.warning(f"Unknown text key: {key}")
+            return key
+        if not template.fields:
+            return template.text
         
-        # Replace parameters
-        if kwargs:
-            try:
-                # Handle special formatting
-                for k, v in kwargs.items():
-                    if isinstance(v, datetime):
-                        kwargs[k] = v.strftime("%Y-%m-%d")
-                    elif isinstance(v, (int, float)):
-                        if 'amount' in k or 'total_amount' in k:
-                            kwargs[k] = f"{v:,.0f}$"
-                        else:
-                            kwargs[k] = f"{v:,.0f}"
-                
-                text = text.format(**kwargs)
-            except KeyError as e:
-                logger.warning(f"Missing key in text template: {e}")
-            except Exception as e:
-                logger.error(f"Error formatting text: {e}")
+        # Only compute the values this template actually uses
+        values = {}
+        for field in template.fields:
+            if field in kwargs:
+                values[field] = format_template_value(field, kwargs[field])
+            elif field == 'timestamp':
+                values[field] = datetime.now().strftime("%Y-%m-%d %H:%M")
+            else:
+                raise KeyError(f"Missing value for {{{field}}} in text '{key}'")
         
-        return text
+        return template.render(values)
+    
+    def _label(self, lang_code: str, key: str) -> str:
+        """Raw text of a key in a language, with English fallback"""
+        return self.languages[lang_code]['data'].get(key, self.languages['en']['data'].get(key, key))
+    
+    def _build_main_menu_keyboard(self, lang_code: str) -> ReplyKeyboardMarkup:
+        """Create main menu keyboard"""
+        keyboard = [
+            [self._label(lang_code, 'menu_check'), self._label(lang_code, 'menu_report')],
+            [self._label(lang_code, 'menu_tips'), self._label(lang_code, 'menu_donate')],
+            [self._label(lang_code, 'menu_groups'), self._label(lang_code, 'menu_admins')],
+            [self._label(lang_code, 'menu_stats'), self._label(lang_code, 'menu_help')],
+            [self._label(lang_code, 'menu_language')]
+        ]
+        return CachedReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=False)
+    
+    def _build_cancel_keyboard(self, lang_code: str) -> ReplyKeyboardMarkup:
+        """Create cancel keyboard"""
+        keyboard = [[self._label(lang_code, 'cancel')]]
+        return CachedReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
+    
+    def _build_confirm_keyboard(self, lang_code: str) -> InlineKeyboardMarkup:
+        """Create confirmation keyboard"""
+        keyboard = [
+            [
+                InlineKeyboardButton(
+                    self._label(lang_code, 'yes'), 
+                    callback_data='report_confirm_yes'
+                ),
+                InlineKeyboardButton(
+                    self._label(lang_code, 'no'), 
+                    callback_data='report_confirm_no'
+                )
+            ]
+        ]
+        return CachedInlineKeyboardMarkup(keyboard)
     
-    def get_language_keyboard(self, user_id: int):
+    def _build_menu_button_keyboard(self, lang_code: str) -> InlineKeyboardMarkup:
+        """Create the button that brings back the main menu under an edited message"""
+        keyboard = [[InlineKeyboardButton(self._label(lang_code, 'back'), callback_data='show_menu')]]
+        return CachedInlineKeyboardMarkup(keyboard)
+    
+    def _build_language_keyboard(self, current_lang: str) -> InlineKeyboardMarkup:
         """Create language selection keyboard"""
         keyboard = []
-        user = db.get_user(user_id)
-        current_lang = user['language']
         
         for lang_code, lang_info in self.languages.items():
             prefix = "✅ " if lang_code == current_lang else ""
@@ -873,77 +3793,69 @@ class LanguageManager:
         
         # Add cancel button
         keyboard.append([InlineKeyboardButton(
-            self.get_text(user_id, 'back'),
+            self._label(current_lang, 'back'),
             callback_data='cancel_language'
         )])
         
-        return InlineKeyboardMarkup(keyboard)
-    
-    def get_menu_action(self, text: str, user_id: int) -> Optional[str]:
-        """Determine action from menu text"""
-        user = db.get_user(user_id)
-        lang_code = user['language']
-        
-        # Map text to action based on current language
-        lang_data = self.languages[lang_code]['data']
-        
-        menu_mapping = {
-            lang_data.get('menu_language', 'Language Settings'): 'menu_language',
-            lang_data.get('menu_check', 'Verify User/Transaction'): 'menu_check',
-            lang_data.get('menu_report', 'Report Scammer'): 'menu_report',
-            lang_data.get('menu_tips', 'Security Guidelines'): 'menu_tips',
-            lang_data.get('menu_donate', 'Support Development'): 'menu_donate',
-            lang_data.get('menu_groups', 'Verified Communities'): 'menu_groups',
-            lang_data.get('menu_admins', 'Trusted Mediators'): 'menu_admins',
-            lang_data.get('menu_stats', 'Analytics Dashboard'): 'menu_stats',
-            lang_data.get('menu_help', 'Support Center'): 'menu_help',
-        }
-        
-        return menu_mapping.get(text)
+        return CachedInlineKeyboardMarkup(keyboard)
+    
+    def get_markup(self, user_id: int, name: str):
+        """Prebuilt keyboard in user's language: 'main_menu', 'cancel', 'confirm', 'language' or 'menu_button'"""
+        lang_code = self.get_user_language(user_id)
+        markups = self._markups.get(lang_code, self._markups['en'])
+        return markups[name]
+    
+    def get_language_keyboard(self, user_id: int):
+        """Create language selection keyboard"""
+        return self.get_markup(user_id, 'language')
+    
+    def _build_menu_actions(self) -> Dict[str, str]:
+        """Reverse index of every language's menu and cancel labels"""
+        menu_actions = {}
+        for lang_code in self.languages:
+            for action in MENU_ACTIONS:
+                label = self._label(lang_code, action)
+                if menu_actions.setdefault(label, action) != action:
+                    raise ValueError(f"Label {label!r} is used for both {menu_actions[label]} and {action}")
+        return menu_actions
+    
+    def get_menu_action(self, text: str, user_id: Optional[int] = None) -> Optional[str]:
+        """Determine action from menu text in any language"""
+        return self._menu_actions.get(text)
 
 # Initialize language manager
 lang = LanguageManager()
 
+class MenuActionFilter(MessageFilter):
+    """Match messages whose text is a menu button label for one of the given actions"""
+    
+    def __init__(self, *actions: str):
+        self.actions = frozenset(actions)
+        self.name = f"MenuActionFilter({', '.join(actions)})"
+    
+    def filter(self, message) -> bool:
+        return lang.get_menu_action(message.text) in self.actions if message.text else False
+
 # ============================================
 # SUPPORT UTILITIES
 # ============================================
 
 def create_main_menu_keyboard(user_id: int) -> ReplyKeyboardMarkup:
-    """Create main menu keyboard"""
-    keyboard = [
-        [lang.get_text(user_id, 'menu_check'), lang.get_text(user_id, 'menu_report')],
-        [lang.get_text(user_id, 'menu_tips'), lang.get_text(user_id, 'menu_donate')],
-        [lang.get_text(user_id, 'menu_groups'), lang.get_text(user_id, 'menu_admins')],
-        [lang.get_text(user_id, 'menu_stats'), lang.get_text(user_id, 'menu_help')],
-        [lang.get_text(user_id, 'menu_language')]
-    ]
-    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=False)
+    """Get main menu keyboard"""
+    return lang.get_markup(user_id, 'main_menu')
 
 def create_cancel_keyboard(user_id: int) -> ReplyKeyboardMarkup:
-    """Create cancel keyboard"""
-    keyboard = [[lang.get_text(user_id, 'cancel')]]
-    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
+    """Get cancel keyboard"""
+    return lang.get_markup(user_id, 'cancel')
 
 def create_confirm_keyboard(user_id: int) -> InlineKeyboardMarkup:
-    """Create confirmation keyboard"""
-    keyboard = [
-        [
-            InlineKeyboardButton(
-                lang.get_text(user_id, 'yes'), 
-                callback_data='report_confirm_yes'
-            ),
-            InlineKeyboardButton(
-                lang.get_text(user_id, 'no'), 
-                callback_data='report_confirm_no'
-            )
-        ]
-    ]
-    return InlineKeyboardMarkup(keyboard)
+    """Get confirmation keyboard"""
+    return lang.get_markup(user_id, 'confirm')
 
 def format_scammer_list(scammers: List[Dict], user_id: int) -> str:
     """Format scammer list"""
     if not scammers:
-        return ""
+        return MarkdownText("")
     
     result = ""
     for i, scammer in enumerate(scammers[:10], 1):
@@ -961,7 +3873,21 @@ def format_scammer_list(scammers: List[Dict], user_id: int) -> str:
             total_amount=f"{total_amount:,.0f}$"
         ) + "\n"
     
-    return result
+    return MarkdownText(result)
+
+def format_lookalike_list(lookalikes: List[Dict], user_id: int) -> str:
+    """Format possible lookalikes of a checked username"""
+    result = ""
+    for lookalike in lookalikes:
+        result += lang.get_text(
+            user_id,
+            'lookalike_item',
+            username='@' + lookalike['name'],
+            distance=lookalike['distance'],
+            reports=lookalike['report_count']
+        ) + "\n"
+    
+    return MarkdownText(result)
 
 # ============================================
 # MAIN HANDLERS
@@ -971,11 +3897,8 @@ def check_private_chat(update: Update) -> bool:
     """Check if chat is private"""
     if update.message and update.message.chat.type != 'private':
         user_id = update.effective_user.id
-        try:
-            text = lang.get_text(user_id, 'private_chat_only')
-            update.message.reply_text(text, parse_mode='MarkdownV2')
-        except:
-            update.message.reply_text("⚠️ Please use the bot in private chat.")
+        text = lang.get_text(user_id, 'private_chat_only')
+        update.message.reply_text(text, parse_mode='MarkdownV2')
         return False
     return True
 
@@ -993,20 +3916,12 @@ def start_command(update: Update, context: CallbackContext) -> None:
     # Send welcome message
     welcome_text = lang.get_text(user_id, 'main_menu')
     
-    try:
-        update.message.reply_text(
-            welcome_text,
-            parse_mode='MarkdownV2',
-            reply_markup=create_main_menu_keyboard(user_id),
-            disable_web_page_preview=True
-        )
-    except Exception as e:
-        logger.error(f"Error sending message: {e}")
-        # Try without formatting
-        update.message.reply_text(
-            "🛡️ FIGHT_SCAMS BOT - Community Scam Prevention System\n\nWelcome!",
-            reply_markup=create_main_menu_keyboard(user_id)
-        )
+    update.message.reply_text(
+        welcome_text,
+        parse_mode='MarkdownV2',
+        reply_markup=create_main_menu_keyboard(user_id),
+        disable_web_page_preview=True
+    )
     
     logger.info(f"User {user_id} started bot")
 
@@ -1018,19 +3933,12 @@ def help_command(update: Update, context: CallbackContext) -> None:
     user_id = update.effective_user.id
     help_text = lang.get_text(user_id, 'help')
     
-    try:
-        update.message.reply_text(
-            help_text,
-            parse_mode='MarkdownV2',
-            reply_markup=create_main_menu_keyboard(user_id),
-            disable_web_page_preview=True
-        )
-    except Exception as e:
-        logger.error(f"Error sending help: {e}")
-        update.message.reply_text(
-            "ℹ️ Help: Use the menus below to interact with the bot.",
-            reply_markup=create_main_menu_keyboard(user_id)
-        )
+    update.message.reply_text(
+        help_text,
+        parse_mode='MarkdownV2',
+        reply_markup=create_main_menu_keyboard(user_id),
+        disable_web_page_preview=True
+    )
 
 def handle_message(update: Update, context: CallbackContext) -> None:
     """Handle regular messages"""
@@ -1043,32 +3951,9 @@ def handle_message(update: Update, context: CallbackContext) -> None:
     # Debug log
     logger.info(f"User {user_id} sent: {text}")
     
-    # Determine action from menu text
-    menu_action = lang.get_menu_action(text, user_id)
-    
-    if menu_action == 'menu_check':
-        start_check(update, context)
-    elif menu_action == 'menu_report':
-        start_report(update, context)
-    elif menu_action == 'menu_tips':
-        show_safe_tips(update, context)
-    elif menu_action == 'menu_donate':
-        show_donate(update, context)
-    elif menu_action == 'menu_groups':
-        show_trusted_groups(update, context)
-    elif menu_action == 'menu_admins':
-        show_trusted_admins(update, context)
-    elif menu_action == 'menu_stats':
-        show_top_scammers(update, context)
-    elif menu_action == 'menu_help':
-        help_command(update, context)
-    elif menu_action == 'menu_language':
-        show_language_menu(update, context)
-    elif text == lang.get_text(user_id, 'cancel'):
-        cancel_operation(update, context)
-    else:
-        # Default to main menu
-        start_command(update, context)
+    # Determine action from menu text, defaulting to the main menu
+    menu_action = lang.get_menu_action(text)
+    MENU_HANDLERS.get(menu_action, start_command)(update, context)
 
 # ============================================
 # LANGUAGE HANDLING
@@ -1100,6 +3985,7 @@ def set_language(update: Update, context: CallbackContext) -> None:
         context.bot.send_message(
             chat_id=user_id,
             text=lang.get_text(user_id, 'select_option'),
+            parse_mode='MarkdownV2',
             reply_markup=create_main_menu_keyboard(user_id)
         )
         return
@@ -1107,7 +3993,7 @@ def set_language(update: Update, context: CallbackContext) -> None:
     lang_code = query.data.split('_')[1]
     
     # Update language
-    db.update_user_language(user_id, lang_code)
+    lang.set_user_language(user_id, lang_code)
     
     # Success notification
     language_name = {
@@ -1123,30 +4009,20 @@ def set_language(update: Update, context: CallbackContext) -> None:
         language=language_name
     )
     
-    try:
-        query.edit_message_text(
-            text=success_text,
-            parse_mode='MarkdownV2'
-        )
-    except:
-        query.edit_message_text("✅ Language changed successfully!")
+    query.edit_message_text(
+        text=success_text,
+        parse_mode='MarkdownV2'
+    )
     
     # Show main menu with new language
     welcome_text = lang.get_text(user_id, 'main_menu')
-    try:
-        context.bot.send_message(
-            chat_id=user_id,
-            text=welcome_text,
-            parse_mode='MarkdownV2',
-            reply_markup=create_main_menu_keyboard(user_id),
-            disable_web_page_preview=True
-        )
-    except:
-        context.bot.send_message(
-            chat_id=user_id,
-            text="🛡️ FIGHT_SCAMS BOT\n\nWelcome!",
-            reply_markup=create_main_menu_keyboard(user_id)
-        )
+    context.bot.send_message(
+        chat_id=user_id,
+        text=welcome_text,
+        parse_mode='MarkdownV2',
+        reply_markup=create_main_menu_keyboard(user_id),
+        disable_web_page_preview=True
+    )
     
     logger.info(f"User {user_id} changed language to {lang_code}")
 
@@ -1353,13 +4229,10 @@ def report_confirm(update: Update, context: CallbackContext) -> int:
                 protected_count=protected_count
             )
             
-            try:
-                query.edit_message_text(
-                    text=success_text,
-                    parse_mode='MarkdownV2'
-                )
-            except:
-                query.edit_message_text("✅ Report submitted successfully! Thank you for protecting the community!")
+            query.edit_message_text(
+                text=success_text,
+                parse_mode='MarkdownV2'
+            )
             
             logger.info(f"Report #{report_id} submitted by user {user_id}")
         else:
@@ -1372,22 +4245,21 @@ def report_confirm(update: Update, context: CallbackContext) -> int:
         context.bot.send_message(
             chat_id=user_id,
             text=lang.get_text(user_id, 'select_option'),
+            parse_mode='MarkdownV2',
             reply_markup=create_main_menu_keyboard(user_id)
         )
     else:
         # Cancel report - WARNING
-        try:
-            query.edit_message_text(
-                text=lang.get_text(user_id, 'report_cancel_warning'),
-                parse_mode='MarkdownV2'
-            )
-        except:
-            query.edit_message_text("❌ Report cancelled. Warning: False reports waste community resources.")
+        query.edit_message_text(
+            text=lang.get_text(user_id, 'report_cancel_warning'),
+            parse_mode='MarkdownV2'
+        )
         
         # Show main menu
         context.bot.send_message(
             chat_id=user_id,
             text=lang.get_text(user_id, 'report_cancel'),
+            parse_mode='MarkdownV2',
             reply_markup=create_main_menu_keyboard(user_id)
         )
     
@@ -1416,6 +4288,115 @@ def start_check(update: Update, context: CallbackContext) -> int:
     
     return CHECK_INPUT
 
+class VersionedLRUCache:
+    """LRU cache whose entries are stamped with a data generation and ignored once it moves on"""
+    
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+    
+    def get(self, key, generation: int):
+        """Cached value for key if stored at this generation, otherwise None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] != generation:
+                # Left in place; the caller's put() replaces it
+                self.stale += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, key, generation: int, value):
+        """Store value for key, evicting the least recently used entry when full"""
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            current = self._entries.get(key)
+            if current is not None and current[0] > generation:
+                # A slower lookup finishing after a newer one must not overwrite it
+                return
+            self._entries[key] = (generation, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'capacity': self.capacity,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0,
+            }
+
+# Rendered parts of check results, keyed by what the search reads from the query plus the language
+check_cache = VersionedLRUCache(CHECK_CACHE_SIZE)
+
+def check_cache_key(search_input: str, user_id: int) -> Tuple:
+    """Cache key under which two queries always produce the same check result"""
+    return (normalize_search_input(search_input), *query_identifier_forms(search_input),
+            lang.get_user_language(user_id))
+
+def format_check_result(user_id: int, scammer: Dict) -> str:
+    """Render one scammer of a check result"""
+    # Format dates
+    first_report = scammer.get('first_report', datetime.now().isoformat())
+    last_report = scammer.get('last_report', datetime.now().isoformat())
+    
+    try:
+        first_date = datetime.fromisoformat(first_report).strftime("%Y-%m-%d")
+        last_date = datetime.fromisoformat(last_report).strftime("%Y-%m-%d")
+    except:
+        first_date = first_report[:10]
+        last_date = last_report[:10]
+    
+    # Get product list
+    products = scammer.get('products', [])
+    products_text = ', '.join(products) if products else 'Various products/services'
+    
+    # Format amount
+    total_amount_display = f"{scammer.get('total_amount', 0):,.0f}$"
+    
+    return lang.get_text(
+        user_id,
+        'check_results',
+        username=scammer.get('username', 'Unknown'),
+        link=scammer.get('telegram_link', 'N/A'),
+        wallet=scammer.get('wallet_id', 'N/A'),
+        report_count=scammer.get('report_count', 0),
+        reporter_count=scammer.get('reporter_count', 0),
+        total_amount=total_amount_display,
+        first_report=first_date,
+        last_report=last_date,
+        products=products_text
+    )
+
+def split_message(parts: List[str], limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """Join message parts with blank lines into as few messages as fit Telegram's length limit"""
+    messages = []
+    for part in parts:
+        if messages and len(messages[-1]) + 2 + len(part) <= limit:
+            messages[-1] += '\n\n' + part
+        else:
+            messages.append(part)
+    return messages
+
+@outbound_priority(PRIORITY_INTERACTIVE)
 def process_check(update: Update, context: CallbackContext) -> int:
     """Process scammer search"""
     user_id = update.effective_user.id
@@ -1429,117 +4410,90 @@ def process_check(update: Update, context: CallbackContext) -> int:
         )
         return ConversationHandler.END
     
-    # Show processing message
-    try:
-        processing_msg = update.message.reply_text(
+    # Sent without the menu keyboard: Telegram refuses to edit messages carrying a reply keyboard,
+    # so the result edited into it offers an inline button back to the menu instead
+    placeholder = None
+    if CHECK_RESPONSE_MODE == 'edit':
+        placeholder = update.message.reply_text(
             lang.get_text(user_id, 'processing'),
             parse_mode='MarkdownV2'
         )
-    except:
-        processing_msg = update.message.reply_text("⏳ Processing...")
     
-    # Search
-    results = db.find_scammer(search_input)
+    # Served from the cache until the next report; read the generation before searching
+    # so a report landing mid-search leaves the entry already stale
+    cache_key = check_cache_key(search_input, user_id)
+    generation = db.generation
+    cached = check_cache.get(cache_key, generation)
+    if cached is None:
+        results = db.find_scammer(search_input)
+        
+        # Near-miss usernames of reported scammers, excluding the ones found directly
+        lookalikes = db.find_lookalikes(
+            search_input,
+            exclude={make_scammer_key(scammer.get('username'), scammer.get('wallet_id')) for scammer in results}
+        )
+        
+        # Up to 3 results, then any lookalikes
+        result_parts = [format_check_result(user_id, scammer) for scammer in results[:3]]
+        if lookalikes:
+            result_parts.append(lang.get_text(
+                user_id, 'check_lookalikes', lookalikes=format_lookalike_list(lookalikes, user_id)
+            ))
+        cached = (bool(results), result_parts)
+        check_cache.put(cache_key, generation, cached)
+    found, result_parts = cached
     
     # Update check count
     db.increment_user_check(user_id)
     
-    # Remove processing message
-    try:
-        context.bot.delete_message(
-            chat_id=user_id,
-            message_id=processing_msg.message_id
-        )
-    except:
-        pass
-    
-    if not results:
-        no_results_text = lang.get_text(
+    if not found:
+        # Rendered per check: it echoes the query as typed and the current time
+        result_parts = [lang.get_text(
             user_id,
             'check_no_results',
             query=search_input[:50],
             timestamp=datetime.now().strftime("%Y-%m-%d %H:%M")
-        )
-        
-        try:
-            update.message.reply_text(
-                no_results_text,
-                parse_mode='MarkdownV2',
-                reply_markup=create_main_menu_keyboard(user_id)
-            )
-        except:
-            update.message.reply_text(
-                f"✅ No scam reports found for: {search_input[:50]}",
-                reply_markup=create_main_menu_keyboard(user_id)
-            )
-        
-        return ConversationHandler.END
+        )] + result_parts
+    # Then the menu prompt, in as few messages as possible
+    messages = split_message(result_parts + [lang.get_text(user_id, 'select_option')])
     
-    # Show detailed results
-    for scammer in results[:3]:  # Limit to 3 results
-        # Format dates
-        first_report = scammer.get('first_report', datetime.now().isoformat())
-        last_report = scammer.get('last_report', datetime.now().isoformat())
-        
-        try:
-            first_date = datetime.fromisoformat(first_report).strftime("%Y-%m-%d")
-            last_date = datetime.fromisoformat(last_report).strftime("%Y-%m-%d")
-        except:
-            first_date = first_report[:10]
-            last_date = last_report[:10]
-        
-        # Get product list
-        products = scammer.get('products', [])
-        products_text = ', '.join(products) if products else 'Various products/services'
-        
-        # Format amount
-        total_amount_display = f"{scammer.get('total_amount', 0):,.0f}$"
-        
-        check_text = lang.get_text(
-            user_id,
-            'check_results',
-            username=scammer.get('username', 'Unknown'),
-            link=scammer.get('telegram_link', 'N/A'),
-            wallet=scammer.get('wallet_id', 'N/A'),
-            report_count=scammer.get('report_count', 0),
-            reporter_count=scammer.get('reporter_count', 0),
-            total_amount=total_amount_display,
-            first_report=first_date,
-            last_report=last_date,
-            products=products_text
-        )
-        
+    if placeholder is not None:
         try:
-            update.message.reply_text(
-                check_text,
-                parse_mode='MarkdownV2',
-                disable_web_page_preview=True
-            )
-        except Exception as e:
-            logger.error(f"Error sending results: {e}")
-            # Send simplified version
-            simple_text = f"🚨 SCAM ALERT: {scammer.get('username', 'Unknown')}\n"
-            simple_text += f"📊 Total Reports: {scammer.get('report_count', 0)}\n"
-            simple_text += f"👥 Unique Reporters: {scammer.get('reporter_count', 0)}\n"
-            simple_text += f"💰 Total Amount: {scammer.get('total_amount', 0):,.0f}$\n"
-            simple_text += f"📅 First Report: {first_date}\n"
-            simple_text += f"📅 Last Report: {last_date}\n"
-            simple_text += f"📦 Products: {products_text}\n"
-            simple_text += f"⚠️ RECOMMENDATION: Avoid ALL transactions with this user"
-            
-            update.message.reply_text(
-                simple_text,
-                disable_web_page_preview=True
-            )
+            if len(messages) == 1:
+                # The placeholder can only take an inline keyboard; its button brings back the menu
+                placeholder.edit_text(
+                    messages[0],
+                    parse_mode='MarkdownV2',
+                    disable_web_page_preview=True,
+                    reply_markup=lang.get_markup(user_id, 'menu_button')
+                )
+                return ConversationHandler.END
+            placeholder.edit_text(messages[0], parse_mode='MarkdownV2', disable_web_page_preview=True)
+            messages = messages[1:]
+        except BadRequest as e:
+            logger.warning(f"Could not edit check placeholder: {e}")
     
-    # Return to main menu
-    update.message.reply_text(
-        lang.get_text(user_id, 'select_option'),
-        reply_markup=create_main_menu_keyboard(user_id)
-    )
+    for i, text in enumerate(messages):
+        update.message.reply_text(
+            text,
+            parse_mode='MarkdownV2',
+            disable_web_page_preview=True,
+            # Keep the keyboard on the last message so it stays attached below the results
+            reply_markup=create_main_menu_keyboard(user_id) if i == len(messages) - 1 else None
+        )
     
     return ConversationHandler.END
 
+def show_menu(update: Update, context: CallbackContext) -> None:
+    """Bring back the main menu from the button under an edited check result"""
+    query = update.callback_query
+    query.answer()
+    query.message.reply_text(
+        lang.get_text(query.from_user.id, 'select_option'),
+        parse_mode='MarkdownV2',
+        reply_markup=create_main_menu_keyboard(query.from_user.id)
+    )
+
 # ============================================
 # OTHER MENUS
 # ============================================
@@ -1552,18 +4506,12 @@ def show_safe_tips(update: Update, context: CallbackContext) -> None:
     user_id = update.effective_user.id
     tips_text = lang.get_text(user_id, 'safe_tips')
     
-    try:
-        update.message.reply_text(
-            tips_text,
-            parse_mode='MarkdownV2',
-            reply_markup=create_main_menu_keyboard(user_id),
-            disable_web_page_preview=True
-        )
-    except:
-        update.message.reply_text(
-            "⚠️ SECURITY TIPS:\n\n1. Always verify users before transactions\n2. Use trusted mediators\n3. Never send payment in advance\n4. Keep transaction evidence\n5. Use escrow for large amounts",
-            reply_markup=create_main_menu_keyboard(user_id)
-        )
+    update.message.reply_text(
+        tips_text,
+        parse_mode='MarkdownV2',
+        reply_markup=create_main_menu_keyboard(user_id),
+        disable_web_page_preview=True
+    )
 
 def show_donate(update: Update, context: CallbackContext) -> None:
     """Show donation information"""
@@ -1572,23 +4520,14 @@ def show_donate(update: Update, context: CallbackContext) -> None:
     
     user_id = update.effective_user.id
     
-    try:
-        donate_text = lang.get_text(user_id, 'donate')
-        
-        update.message.reply_text(
-            donate_text,
-            parse_mode='MarkdownV2',
-            disable_web_page_preview=True,
-            reply_markup=create_main_menu_keyboard(user_id)
-        )
-    except Exception as e:
-        logger.error(f"Error in show_donate: {e}")
-        update.message.reply_text(
-            "💝 SUPPORT DEVELOPMENT\n\n"
-            "Binance ID: 154265504\n\n"
-            "Thank you for supporting the system!",
-            reply_markup=create_main_menu_keyboard(user_id)
-        )
+    donate_text = lang.get_text(user_id, 'donate')
+    
+    update.message.reply_text(
+        donate_text,
+        parse_mode='MarkdownV2',
+        disable_web_page_preview=True,
+        reply_markup=create_main_menu_keyboard(user_id)
+    )
 
 def show_trusted_groups(update: Update, context: CallbackContext) -> None:
     """Show trusted trading groups"""
@@ -1598,22 +4537,12 @@ def show_trusted_groups(update: Update, context: CallbackContext) -> None:
     user_id = update.effective_user.id
     groups_text = lang.get_text(user_id, 'trusted_groups')
     
-    try:
-        update.message.reply_text(
-            groups_text,
-            parse_mode='MarkdownV2',
-            disable_web_page_preview=False,
-            reply_markup=create_main_menu_keyboard(user_id)
-        )
-    except:
-        update.message.reply_text(
-            "👥 TRUSTED TRADING GROUPS:\n\n"
-            "• Community Trading Hub: https://t.me/j5FS6B_V9DM5ZmVl\n"
-            "• Crypto Trading Network\n"
-            "• Game Account Marketplace",
-            disable_web_page_preview=False,
-            reply_markup=create_main_menu_keyboard(user_id)
-        )
+    update.message.reply_text(
+        groups_text,
+        parse_mode='MarkdownV2',
+        disable_web_page_preview=False,
+        reply_markup=create_main_menu_keyboard(user_id)
+    )
 
 def show_trusted_admins(update: Update, context: CallbackContext) -> None:
     """Show trusted mediators"""
@@ -1623,23 +4552,14 @@ def show_trusted_admins(update: Update, context: CallbackContext) -> None:
     user_id = update.effective_user.id
     admins_text = lang.get_text(user_id, 'trusted_admins')
     
-    try:
-        update.message.reply_text(
-            admins_text,
-            parse_mode='MarkdownV2',
-            disable_web_page_preview=False,
-            reply_markup=create_main_menu_keyboard(user_id)
-        )
-    except:
-        update.message.reply_text(
-            "🛡️ TRUSTED MEDIATORS:\n\n"
-            "• Siculator98: https://t.me/siculator98\n"
-            "• Admin2\n"
-            "• Admin3",
-            disable_web_page_preview=False,
-            reply_markup=create_main_menu_keyboard(user_id)
-        )
+    update.message.reply_text(
+        admins_text,
+        parse_mode='MarkdownV2',
+        disable_web_page_preview=False,
+        reply_markup=create_main_menu_keyboard(user_id)
+    )
 
+@outbound_priority(PRIORITY_BULK)
 def show_top_scammers(update: Update, context: CallbackContext) -> None:
     """Show scammer statistics"""
     if not check_private_chat(update):
@@ -1648,7 +4568,7 @@ def show_top_scammers(update: Update, context: CallbackContext) -> None:
     user_id = update.effective_user.id
     
     # Get top scammers
-    top_scammers = db.get_top_scammers(10)
+    top_scammers = db.get_top_scammers(10, TOP_SCAMMERS_ORDER)
     stats = db.get_statistics()
     
     # Create scammer list
@@ -1670,26 +4590,12 @@ def show_top_scammers(update: Update, context: CallbackContext) -> None:
         timestamp=datetime.now().strftime("%Y-%m-%d %H:%M")
     )
     
-    try:
-        update.message.reply_text(
-            stats_text,
-            parse_mode='MarkdownV2',
-            reply_markup=create_main_menu_keyboard(user_id),
-            disable_web_page_preview=True
-        )
-    except:
-        # Send simplified version
-        simple_text = f"📊 SCAMMER STATISTICS\n\n"
-        simple_text += f"Total Reports: {stats.get('total_reports', 0)}\n"
-        simple_text += f"Total Scammers: {stats.get('total_scammers', 0)}\n"
-        simple_text += f"Users: {stats.get('active_users', 0)}\n"
-        simple_text += f"Checks: {stats.get('total_checks', 0)}\n"
-        simple_text += f"Total Loss: {stats.get('total_amount_scammed', 0):,.0f}$"
-        
-        update.message.reply_text(
-            simple_text,
-            reply_markup=create_main_menu_keyboard(user_id)
-        )
+    update.message.reply_text(
+        stats_text,
+        parse_mode='MarkdownV2',
+        reply_markup=create_main_menu_keyboard(user_id),
+        disable_web_page_preview=True
+    )
 
 # ============================================
 # SUPPORT UTILITIES
@@ -1701,6 +4607,7 @@ def cancel_operation(update: Update, context: CallbackContext) -> int:
     
     update.message.reply_text(
         lang.get_text(user_id, 'report_cancel'),
+        parse_mode='MarkdownV2',
         reply_markup=create_main_menu_keyboard(user_id)
     )
     
@@ -1710,21 +4617,319 @@ def cancel_operation(update: Update, context: CallbackContext) -> int:
     
     return ConversationHandler.END
 
+@outbound_priority(PRIORITY_BULK)
 def error_handler(update: Update, context: CallbackContext) -> None:
     """Handle errors"""
     logger.error(f"Update {update} caused error {context.error}", exc_info=True)
     
+    # Still flood-limited after the outbound queue's retries; another message would only add to it
+    if isinstance(context.error, RetryAfter):
+        return
+    
     if update and update.effective_user:
         user_id = update.effective_user.id
         try:
             context.bot.send_message(
                 chat_id=user_id,
                 text=lang.get_text(user_id, 'error'),
+                parse_mode='MarkdownV2',
                 reply_markup=create_main_menu_keyboard(user_id)
             )
         except:
             pass
 
+# ============================================
+# MENU ROUTING
+# ============================================
+
+# Dispatch table for menu buttons, shared by handle_message and the conversation entry points
+MENU_HANDLERS = {
+    'menu_check': start_check,
+    'menu_report': start_report,
+    'menu_tips': show_safe_tips,
+    'menu_donate': show_donate,
+    'menu_groups': show_trusted_groups,
+    'menu_admins': show_trusted_admins,
+    'menu_stats': show_top_scammers,
+    'menu_help': help_command,
+    'menu_language': show_language_menu,
+    'cancel': cancel_operation,
+}
+
+def menu_handler(action: str) -> MessageHandler:
+    """MessageHandler for a menu button in any language"""
+    return MessageHandler(MenuActionFilter(action), MENU_HANDLERS[action])
+
+# ============================================
+# UPDATE SCHEDULING
+# ============================================
+
+class CountingDispatcher(Dispatcher):
+    """Dispatcher that records the Bot API calls each update's handlers make, including run_async ones"""
+    
+    def process_update(self, update: object) -> None:
+        if not isinstance(update, Update):
+            super().process_update(update)
+            return
+        api_call_stats.begin_update(update.update_id)
+        try:
+            super().process_update(update)
+        finally:
+            api_call_stats.end_update()
+    
+    def run_async(self, func: Callable, *args: object, update: object = None, **kwargs: object):
+        calls = api_call_stats.defer()
+        if calls is None:
+            return super().run_async(func, *args, update=update, **kwargs)
+        
+        def counted(*func_args, **func_kwargs):
+            api_call_stats.resume(calls)
+            try:
+                return func(*func_args, **func_kwargs)
+            finally:
+                api_call_stats.end_update()
+        
+        return super().run_async(counted, *args, update=update, **kwargs)
+
+class UserOrderedDispatcher(CountingDispatcher):
+    """Dispatcher that runs each user's updates one at a time, in order, on a shared worker pool"""
+    
+    def __init__(self, *args, ordered_workers: int = BOT_WORKERS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._executor = ThreadPoolExecutor(max_workers=ordered_workers, thread_name_prefix='user-worker')
+        # user -> updates waiting behind the one currently running for that user
+        self._user_queues: Dict[int, deque] = {}
+        self._user_queues_lock = threading.Lock()
+        self._drained = threading.Condition(self._user_queues_lock)
+    
+    @staticmethod
+    def _shard_key(update: object) -> Optional[int]:
+        """User an update belongs to, or None for updates that need no ordering"""
+        if not isinstance(update, Update):
+            return None
+        if update.effective_user is not None:
+            return update.effective_user.id
+        if update.effective_chat is not None:
+            return update.effective_chat.id
+        return None
+    
+    def process_update(self, update: object) -> None:
+        key = self._shard_key(update)
+        if key is None:
+            super().process_update(update)
+            return
+        
+        with self._user_queues_lock:
+            pending = self._user_queues.get(key)
+            if pending is not None:
+                # This user already has an update in flight; run after it
+                pending.append(update)
+                return
+            self._user_queues[key] = deque()
+        self._executor.submit(self._run_user_update, key, update)
+    
+    def _run_user_update(self, key: int, update: Update) -> None:
+        """Process one update, then hand the user's next update back to the pool"""
+        try:
+            super().process_update(update)
+        except Exception as e:
+            logger.error(f"Error processing update for {key}: {e}")
+        
+        with self._user_queues_lock:
+            pending = self._user_queues[key]
+            if not pending:
+                del self._user_queues[key]
+                if not self._user_queues:
+                    self._drained.notify_all()
+                return
+            update = pending.popleft()
+        # Resubmit rather than loop so a busy user can't hold a worker while others wait
+        self._executor.submit(self._run_user_update, key, update)
+    
+    def pending_updates(self) -> int:
+        """Updates queued behind another update from the same user"""
+        with self._user_queues_lock:
+            return sum(len(pending) for pending in self._user_queues.values())
+    
+    def stop(self) -> None:
+        super().stop()
+        # Finish what was already handed to the pool, including queued follow-ups
+        with self._drained:
+            while self._user_queues:
+                self._drained.wait()
+        self._executor.shutdown(wait=True)
+
+def create_updater(token: str) -> Updater:
+    """Build the Updater for the configured worker pool and update ordering"""
+    if BOT_WORKERS == 1 or BOT_UPDATE_ORDERING != 'user':
+        # A single worker dispatches serially; otherwise every handler runs on the pool.
+        # The database's read/write lock keeps concurrent checks and reports consistent
+        dispatcher_class = CountingDispatcher
+        bot = create_bot(token, BOT_WORKERS + 4, Defaults(run_async=BOT_WORKERS > 1))
+    else:
+        # Connections for both pools, the dispatcher, polling, the job queue and the main thread
+        dispatcher_class = UserOrderedDispatcher
+        bot = create_bot(token, 2 * BOT_WORKERS + 4)
+    
+    job_queue = JobQueue()
+    dispatcher = dispatcher_class(
+        bot, Queue(), workers=BOT_WORKERS, job_queue=job_queue, use_context=True
+    )
+    job_queue.set_dispatcher(dispatcher)
+    return Updater(dispatcher=dispatcher, workers=None)
+
+# ============================================
+# WEBHOOK SERVER
+# ============================================
+
+class WebhookRequestHandler(BaseHTTPRequestHandler):
+    """Accept Telegram update POSTs and answer health checks"""
+    
+    MAX_BODY_SIZE = 1024 * 1024
+    
+    def do_POST(self) -> None:
+        server = self.server.webhook
+        if self.path != server.path:
+            self._reply(404, {'ok': False, 'error': 'not found'})
+            return
+        
+        if not self._authorized():
+            return
+        
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = 0
+        if length <= 0 or length > self.MAX_BODY_SIZE:
+            server.rejected += 1
+            self._reply(413 if length > 0 else 400, {'ok': False, 'error': 'invalid body size'})
+            return
+        
+        try:
+            update = Update.de_json(json.loads(self.rfile.read(length)), server.dispatcher.bot)
+        except Exception as e:
+            server.rejected += 1
+            logger.warning(f"Rejected malformed webhook update: {e}")
+            self._reply(400, {'ok': False, 'error': 'malformed update'})
+            return
+        
+        server.enqueue(update)
+        self._reply(200, {'ok': True})
+    
+    def do_GET(self) -> None:
+        server = self.server.webhook
+        if self.path != server.health_path:
+            self._reply(404, {'ok': False, 'error': 'not found'})
+        elif self._authorized():
+            # Same secret as updates, since the listener is usually public
+            self._reply(200, server.health())
+    
+    def _authorized(self) -> bool:
+        """Check the secret token header, answering 403 if it is wrong"""
+        server = self.server.webhook
+        if not server.secret_token:
+            return True
+        header = self.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
+        if hmac.compare_digest(header.encode(), server.secret_token.encode()):
+            return True
+        server.rejected += 1
+        self._reply(403, {'ok': False, 'error': 'invalid secret token'})
+        return False
+    
+    def _reply(self, status: int, payload: Dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format: str, *args) -> None:
+        logger.debug(f"Webhook {self.address_string()} - {format % args}")
+
+class WebhookServer:
+    """Threaded HTTP listener feeding Telegram updates into the dispatcher queue"""
+    
+    def __init__(self, dispatcher, listen: str = WEBHOOK_LISTEN, port: int = WEBHOOK_PORT,
+                 path: str = WEBHOOK_PATH, secret_token: str = WEBHOOK_SECRET_TOKEN):
+        self.dispatcher = dispatcher
+        self.path = path
+        self.health_path = path.rstrip('/') + '/health'
+        self.secret_token = secret_token
+        self.received = 0
+        self.rejected = 0
+        self._httpd = ThreadingHTTPServer((listen, port), WebhookRequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.webhook = self
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def port(self) -> int:
+        return self._httpd.server_address[1]
+    
+    def enqueue(self, update: Update) -> None:
+        """Hand an update to the dispatcher"""
+        self.received += 1
+        self.dispatcher.update_queue.put(update)
+    
+    def health(self) -> Dict:
+        """Listener counters, dispatcher queue depth and outbound queue metrics"""
+        queue_depth = self.dispatcher.update_queue.qsize()
+        if isinstance(self.dispatcher, UserOrderedDispatcher):
+            # Updates waiting behind an earlier one from the same user have left the queue
+            queue_depth += self.dispatcher.pending_updates()
+        health = {
+            'ok': True,
+            'queue_depth': queue_depth,
+            'received': self.received,
+            'rejected': self.rejected,
+        }
+        outbound = getattr(self.dispatcher.bot, 'outbound', None)
+        if outbound is not None:
+            health['outbound'] = outbound.metrics()
+        health['api_calls'] = api_call_stats.snapshot()
+        health['check_cache'] = check_cache.stats()
+        return health
+    
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='webhook', daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+def run_webhook(updater: Updater) -> None:
+    """Serve updates through the webhook listener until SIGINT/SIGTERM"""
+    if not WEBHOOK_URL:
+        raise ValueError("WEBHOOK_URL must be set when BOT_MODE=webhook")
+    
+    dispatcher = updater.dispatcher
+    dispatcher_thread = threading.Thread(target=dispatcher.start, name='dispatcher', daemon=True)
+    dispatcher_thread.start()
+    
+    server = WebhookServer(dispatcher)
+    server.start()
+    updater.bot.set_webhook(
+        url=WEBHOOK_URL.rstrip('/') + WEBHOOK_PATH,
+        max_connections=WEBHOOK_MAX_CONNECTIONS,
+        secret_token=WEBHOOK_SECRET_TOKEN or None
+    )
+    logger.info(f"Webhook listening on {WEBHOOK_LISTEN}:{server.port}{WEBHOOK_PATH}")
+    
+    stop_event = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda signum, frame: stop_event.set())
+    while not stop_event.wait(1):
+        pass
+    
+    # Stop accepting updates before stopping the dispatcher
+    server.stop()
+    dispatcher.stop()
+    dispatcher_thread.join()
+
 # ============================================
 # MAIN FUNCTION
 # ============================================
@@ -1740,17 +4945,14 @@ def main() -> None:
         return
     
     # Initialize updater
-    updater = Updater(TOKEN, use_context=True)
+    updater = create_updater(TOKEN)
     dispatcher = updater.dispatcher
     
     # ========== CONVERSATION HANDLERS ==========
     
     # Handler for scam report
     report_conv_handler = ConversationHandler(
-        entry_points=[MessageHandler(
-            Filters.regex(r'^(🚨 Report Scammer|🚨 Báo cáo lừa đảo)$'), 
-            start_report
-        )],
+        entry_points=[menu_handler('menu_report')],
         states={
             REPORT_USERNAME: [MessageHandler(Filters.text & ~Filters.command, report_username)],
             REPORT_LINK: [MessageHandler(Filters.text & ~Filters.command, report_link)],
@@ -1761,23 +4963,20 @@ def main() -> None:
         },
         fallbacks=[
             CommandHandler('cancel', cancel_operation),
-            MessageHandler(Filters.regex(r'^(❌ Cancel)$'), cancel_operation)
+            menu_handler('cancel')
         ],
         allow_reentry=True
     )
     
     # Handler for scammer check
     check_conv_handler = ConversationHandler(
-        entry_points=[MessageHandler(
-            Filters.regex(r'^(🔍 Verify User/Transaction|🔍 Kiểm tra đối tượng)$'), 
-            start_check
-        )],
+        entry_points=[menu_handler('menu_check')],
         states={
             CHECK_INPUT: [MessageHandler(Filters.text & ~Filters.command, process_check)],
         },
         fallbacks=[
             CommandHandler('cancel', cancel_operation),
-            MessageHandler(Filters.regex(r'^(❌ Cancel)$'), cancel_operation)
+            menu_handler('cancel')
         ],
         allow_reentry=True
     )
@@ -1796,6 +4995,7 @@ def main() -> None:
     
     # Callback query handlers
     dispatcher.add_handler(CallbackQueryHandler(set_language, pattern='^(setlang_|cancel_language)'))
+    dispatcher.add_handler(CallbackQueryHandler(show_menu, pattern='^show_menu$'))
     
     # Message handler
     dispatcher.add_handler(MessageHandler(Filters.text & ~Filters.command, handle_message))
@@ -1817,21 +5017,34 @@ def main() -> None:
     print(f"   • Total Loss: {stats.get('total_amount_scammed', 0):,.0f}$")
     print("=" * 60)
     
-    # Start polling
-    updater.start_polling()
     print("✅ Bot started successfully!")
     print("📱 Use /start on Telegram to begin")
     print("⚡ Version: 3.2.0 - Professional Edition")
     print("🌐 Primary Language: ENGLISH (Default & System Operations)")
     print("⚠️  Note: Bot operates only in private chat")
+    print(f"📡 Mode: {BOT_MODE}, {BOT_WORKERS} worker(s), ordering: {BOT_UPDATE_ORDERING if BOT_WORKERS > 1 else 'serial'}")
     print("=" * 60)
     
-    # Run until Ctrl+C
-    updater.idle()
+    if BOT_MODE == 'webhook':
+        run_webhook(updater)
+    else:
+        # Start polling and run until Ctrl+C
+        updater.start_polling()
+        updater.idle()
+    
+    # Flush pending database writes before exiting
+    if updater.bot.outbound is not None:
+        updater.bot.outbound.close()
+    logger.info(f"Check cache: {check_cache.stats()}")
+    db.close()
 
 # ============================================
 # MAIN ENTRY POINT
 # ============================================
 
 if __name__ == '__main__':
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] == 'migrate-sqlite':
+        # Usage: python main.py migrate-sqlite [data.json] [data.db]
+        migrate_json_to_sqlite(*sys.argv[2:4])
+    else:
+        main()
@@ -0,0 +1,16 @@
+"""Point the bot's storage at a scratch directory before main is imported"""
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+DATA_DIR = tempfile.mkdtemp(prefix='scam-bot-tests-')
+# Registered before main is imported, so it runs after main closes its database
+atexit.register(shutil.rmtree, DATA_DIR, ignore_errors=True)
+
+os.environ['DB_FILE'] = os.path.join(DATA_DIR, 'data.json')
+os.environ['DB_SQLITE_FILE'] = os.path.join(DATA_DIR, 'data.db')
+os.environ['DB_BACKEND'] = 'json'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
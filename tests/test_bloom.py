@@ -0,0 +1,79 @@
+"""Bloom filter fast path: it may only rule out checks that would find nothing"""
+import random
+import string
+
+import pytest
+
+import main
+
+# A Cyrillic homoglyph and a zero-width space among them
+USERNAMES = ['@ScamKing', '@\u0440aypal_help', '@ab', '@x_y_z', '@trader\u200bjoe']
+WALLETS = ['Binance 72728229', 'USDT 0xABCdef123', 'W1', 'okx:5566-7788', '']
+
+def test_no_false_negatives_for_added_items():
+    bloom = main.BloomFilter(1000, 0.01)
+    added = {f'item{i}' for i in range(500)}
+    bloom.update(added)
+    more = {f'more{i}' for i in range(500)}
+    for item in more:
+        bloom.add(item)
+    assert all(item in bloom for item in added | more)
+    assert not bloom.full
+
+def queries() -> list:
+    """Every substring of every stored identifier, short ones included, plus typed variants"""
+    texts = [u.lstrip('@') for u in USERNAMES] + [f't.me/{u.lstrip("@")}' for u in USERNAMES] + WALLETS
+    result = set()
+    for text in texts:
+        for start in range(len(text)):
+            for end in range(start + 1, len(text) + 1):
+                result.add(text[start:end])
+    result |= {'@SCAMKING', 'https://t.me/ScamKing', 'tg://resolve?domain=scamking', 'binance-72728229',
+               '72728229', 'usdt:0xabcdef123', 'okx 55667788', 'paypal_help', 'traderjoe'}
+    rnd = random.Random(0)
+    result |= {''.join(rnd.choice(string.ascii_lowercase) for _ in range(rnd.randrange(1, 8))) for _ in range(200)}
+    return sorted(result)
+
+@pytest.fixture(scope='module')
+def database(tmp_path_factory):
+    db = main.SQLiteDatabase(str(tmp_path_factory.mktemp('bloom') / 'bloom.db'))
+    for n, (username, wallet) in enumerate(zip(USERNAMES, WALLETS)):
+        db.add_report({'user_id': n, 'username': username, 'telegram_link': f't.me/{username.lstrip("@")}',
+                       'wallet_id': wallet, 'amount': 1, 'product': 'p'})
+    yield db
+    db.close()
+
+def test_filter_never_hides_results(database):
+    assert database._bloom is not None
+    bloom = database._bloom
+    for query in queries():
+        with_filter = database.find_scammer(query)
+        database._bloom = None
+        try:
+            without_filter = database.find_scammer(query)
+        finally:
+            database._bloom = bloom
+        assert with_filter == without_filter, query
+        if without_filter:
+            assert main.query_may_match(bloom, query), query
+
+def test_short_queries_are_never_ruled_out(database):
+    # Shorter than BLOOM_GRAM_LENGTH, so no gram of the query was added
+    for length in range(1, main.BLOOM_GRAM_LENGTH):
+        assert main.query_may_match(database._bloom, 'q' * length)
+
+def test_resized_filter_keeps_every_scammer(monkeypatch, tmp_path):
+    monkeypatch.setattr(main, 'BLOOM_MIN_CAPACITY', 16)
+    db = main.SQLiteDatabase(str(tmp_path / 'resize.db'))
+    try:
+        capacities = set()
+        for n in range(60):
+            db.add_report({'user_id': n, 'username': f'@resize_scammer{n}', 'telegram_link': '',
+                           'wallet_id': f'Binance 9{n:07d}', 'amount': 1, 'product': 'p'})
+            capacities.add(db._bloom.capacity)
+        assert len(capacities) > 1
+        for n in range(60):
+            assert db.find_scammer(f'resize_scammer{n}')
+            assert db.find_scammer(f'9{n:07d}')
+    finally:
+        db.close()
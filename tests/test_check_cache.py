@@ -0,0 +1,68 @@
+"""Versioned LRU cache of check results and its invalidation by new reports"""
+import pytest
+
+import main
+
+def test_lru_eviction_and_counters():
+    cache = main.VersionedLRUCache(2)
+    cache.put('a', 0, 'A')
+    cache.put('b', 0, 'B')
+    assert cache.get('a', 0) == 'A'
+    # 'b' is now the least recently used
+    cache.put('c', 0, 'C')
+    assert cache.get('b', 0) is None
+    assert cache.get('a', 0) == 'A' and cache.get('c', 0) == 'C'
+    stats = cache.stats()
+    assert (stats['size'], stats['hits'], stats['misses'], stats['evictions']) == (2, 3, 1, 1)
+
+def test_entries_expire_with_the_generation():
+    cache = main.VersionedLRUCache(4)
+    cache.put('q', 1, 'old')
+    assert cache.get('q', 2) is None
+    assert cache.stats()['stale'] == 1
+    cache.put('q', 2, 'new')
+    assert cache.get('q', 2) == 'new'
+    # A slower lookup that started at an older generation doesn't overwrite the newer result
+    cache.put('q', 1, 'late')
+    assert cache.get('q', 2) == 'new'
+
+def test_zero_capacity_disables():
+    cache = main.VersionedLRUCache(0)
+    cache.put('q', 0, 'value')
+    assert cache.get('q', 0) is None
+
+def test_equivalent_queries_share_a_key():
+    keys = {main.check_cache_key(query, 1) for query in ['@ScamKing', 'scamking', 't.me/ScamKing', ' SCAMKING ']}
+    assert len(keys) == 1
+    # Same normalized text, but only the bare number is read as a wallet, so they may find different scammers
+    assert main.normalize_search_input('@12345678') == main.normalize_search_input('12345678')
+    assert main.check_cache_key('@12345678', 1) != main.check_cache_key('12345678', 1)
+
+@pytest.mark.parametrize('backend', ['json', 'sqlite'])
+def test_new_report_invalidates_cached_results(backend, tmp_path):
+    if backend == 'sqlite':
+        db = main.SQLiteDatabase(str(tmp_path / 'cache.db'))
+    else:
+        db = main.JSONDatabase(str(tmp_path / 'cache.json'), durability='sync')
+    cache = main.VersionedLRUCache(8)
+    try:
+        key = main.check_cache_key('cache_scam', 1)
+        generation = db.generation
+        cache.put(key, generation, db.find_scammer('cache_scam'))
+        assert cache.get(key, db.generation) == []
+
+        db.get_user(1)
+        db.add_report({'user_id': 1, 'username': '@cache_scam', 'telegram_link': '', 'wallet_id': 'W1',
+                       'amount': 1, 'product': 'p'})
+        assert db.generation > generation
+        assert cache.get(key, db.generation) is None
+        cache.put(key, db.generation, db.find_scammer('cache_scam'))
+        assert [scammer['username'] for scammer in cache.get(key, db.generation)] == ['@cache_scam']
+
+        # Checks and language changes don't touch scammer data, so cached results stay valid
+        generation = db.generation
+        db.increment_user_check(1)
+        db.update_user_language(1, 'vi')
+        assert db.generation == generation
+    finally:
+        db.close()
@@ -0,0 +1,110 @@
+"""Bot API calls a check costs in each response mode, counted per update"""
+import json
+import threading
+import time
+from queue import Queue
+
+import pytest
+from telegram import Update, User
+from telegram.ext import ConversationHandler, Defaults, Filters, MessageHandler
+
+import main
+
+class FakeRequest:
+    """Answers Bot API calls locally, remembering which messages carry a reply keyboard"""
+
+    con_pool_size = 8
+
+    def __init__(self):
+        self.posts = []
+        self.reply_keyboards = set()
+        self.message_id = 100
+
+    def post(self, url, data, timeout=None):
+        endpoint = url.rsplit('/', 1)[1]
+        if isinstance(data.get('reply_markup'), str):
+            data = dict(data, reply_markup=json.loads(data['reply_markup']))
+        self.posts.append((endpoint, data))
+        if endpoint == 'answerCallbackQuery':
+            return True
+        if endpoint == 'editMessageText':
+            assert int(data['message_id']) not in self.reply_keyboards, 'edited a message with a reply keyboard'
+        self.message_id += 1
+        if endpoint == 'sendMessage' and 'keyboard' in data.get('reply_markup', {}):
+            self.reply_keyboards.add(self.message_id)
+        return {'message_id': self.message_id, 'date': 0, 'chat': {'id': data.get('chat_id', 5), 'type': 'private'},
+                'text': data.get('text', '')}
+
+def make_update(bot, update_id: int, text: str) -> Update:
+    return Update.de_json({'update_id': update_id, 'message': {
+        'message_id': update_id, 'date': 0, 'chat': {'id': 5, 'type': 'private'},
+        'from': {'id': 5, 'is_bot': False, 'first_name': 'user'}, 'text': text
+    }}, bot)
+
+def make_dispatcher(run_async: bool = False):
+    request = FakeRequest()
+    bot = main.QueuedBot('123:abc', request=request, defaults=Defaults(run_async=run_async))
+    bot._bot = User(123, 'bot', True, username='bot')
+    dispatcher = main.CountingDispatcher(bot, Queue(), workers=2)
+    dispatcher.add_handler(ConversationHandler(
+        entry_points=[main.menu_handler('menu_check')],
+        states={main.CHECK_INPUT: [MessageHandler(Filters.text & ~Filters.command, main.process_check)]},
+        fallbacks=[]
+    ))
+    return dispatcher, request
+
+def run_check(dispatcher, request, update_id: int, query: str) -> list:
+    """Endpoints called for the check itself, after the check menu button"""
+    bot = dispatcher.bot
+    dispatcher.process_update(make_update(bot, update_id, main.lang.get_text(5, 'menu_check')))
+    request.posts.clear()
+    dispatcher.process_update(make_update(bot, update_id + 1, query))
+    return [endpoint for endpoint, _ in request.posts]
+
+@pytest.fixture(autouse=True, scope='module')
+def reported_scammer():
+    main.db.add_report({'user_id': 1, 'username': '@calls_scam', 'telegram_link': 't.me/calls_scam',
+                        'wallet_id': 'W1', 'amount': 5, 'product': 'x'})
+
+@pytest.mark.parametrize('query', ['calls_scam', 'nobody_here'])
+def test_merged_check_is_one_call(monkeypatch, query):
+    monkeypatch.setattr(main, 'CHECK_RESPONSE_MODE', 'merged')
+    dispatcher, request = make_dispatcher()
+    assert run_check(dispatcher, request, 1, query) == ['sendMessage']
+    data = request.posts[0][1]
+    # The prompt is there with or without results, above the menu keyboard
+    assert data['text'].endswith(main.lang.get_text(5, 'select_option'))
+    assert 'keyboard' in data['reply_markup']
+
+@pytest.mark.parametrize('query', ['calls_scam', 'nobody_here'])
+def test_edit_check_is_two_calls(monkeypatch, query):
+    monkeypatch.setattr(main, 'CHECK_RESPONSE_MODE', 'edit')
+    dispatcher, request = make_dispatcher()
+    assert run_check(dispatcher, request, 1, query) == ['sendMessage', 'editMessageText']
+    data = request.posts[1][1]
+    assert data['text'].endswith(main.lang.get_text(5, 'select_option'))
+    assert data['reply_markup']['inline_keyboard'][0][0]['callback_data'] == 'show_menu'
+
+def wait_for_updates(count: int):
+    """Wait until count updates, with every async handler they started, have been counted"""
+    deadline = time.monotonic() + 5
+    while main.api_call_stats.snapshot()['updates'] < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+def test_async_handlers_are_counted(monkeypatch):
+    monkeypatch.setattr(main, 'CHECK_RESPONSE_MODE', 'merged')
+    monkeypatch.setattr(main, 'api_call_stats', main.ApiCallStats())
+    dispatcher, request = make_dispatcher(run_async=True)
+    # Starting the dispatcher starts the worker threads run_async handlers go to
+    threading.Thread(target=dispatcher.start, daemon=True).start()
+    try:
+        # Each update is sent once the previous one's handler finished on its worker thread
+        for update_id, text in enumerate([main.lang.get_text(5, 'menu_check'), 'calls_scam'] * 2, 1):
+            dispatcher.update_queue.put(make_update(dispatcher.bot, update_id, text))
+            wait_for_updates(update_id)
+        stats = main.api_call_stats.snapshot()
+    finally:
+        dispatcher.stop()
+    assert stats['updates'] == 4
+    assert stats['by_endpoint'] == {'sendMessage': 4}
+    assert stats['histogram'] == {1: 4}
@@ -0,0 +1,100 @@
+"""Write-ahead journal: replay after a crash, torn records and checkpoints"""
+import atexit
+import os
+
+import pytest
+
+import main
+
+def open_database(path, **kwargs):
+    kwargs.setdefault('durability', 'sync')
+    return main.JSONDatabase(str(path / 'journal.json'), journal_mode='wal', **kwargs)
+
+def crash(db):
+    """Drop the database as a killed process would: no final flush or checkpoint"""
+    atexit.unregister(db.close)
+    db._closed = True
+    db._archive._file.close()
+
+def report(db, n: int):
+    db.get_user(n)
+    return db.add_report({'user_id': n, 'username': f'@journal{n}', 'telegram_link': '',
+                          'wallet_id': f'W{n}', 'amount': 10, 'product': 'p'})
+
+def journal_lines(db) -> list:
+    with open(db.journal_filename, encoding='utf-8') as f:
+        return f.read().splitlines()
+
+def test_replay_after_crash(tmp_path):
+    db = open_database(tmp_path)
+    for n in range(3):
+        report(db, n)
+    assert journal_lines(db)
+    crash(db)
+
+    db = open_database(tmp_path)
+    try:
+        assert db.get_statistics()['total_reports'] == 3
+        assert [scammer['username'] for scammer in db.find_scammer('journal')] == ['@journal0', '@journal1',
+                                                                                 '@journal2']
+        assert len(db.get_scammer_reports(main.make_scammer_key('@journal1', 'W1'))) == 1
+        # Replayed records are checkpointed right away
+        assert journal_lines(db) == []
+    finally:
+        db.close()
+
+def test_torn_last_record_is_ignored(tmp_path):
+    db = open_database(tmp_path)
+    for n in range(2):
+        report(db, n)
+    crash(db)
+    with open(db.journal_filename, 'a', encoding='utf-8') as f:
+        f.write('{"op": "scammer", "key": "journal9_w9", "val')
+
+    db = open_database(tmp_path)
+    try:
+        assert db.get_statistics()['total_reports'] == 2
+        assert db.find_scammer('journal9') == []
+    finally:
+        db.close()
+
+def test_checkpoint_truncates_journal(tmp_path):
+    db = open_database(tmp_path, checkpoint_ops=10)
+    for n in range(20):
+        report(db, n)
+        # Every append past checkpoint_ops writes a checkpoint and starts the journal over
+        assert len(journal_lines(db)) < 10
+        assert db._journal_ops == len(journal_lines(db))
+    assert os.path.exists(db.snapshot_filename)
+    crash(db)
+
+    db = open_database(tmp_path)
+    try:
+        assert db.get_statistics()['total_reports'] == 20
+        assert len(db.find_scammer('journal')) == 20
+    finally:
+        db.close()
+
+def test_batched_writes_survive_crash_after_flush(tmp_path):
+    db = open_database(tmp_path, durability='batched', flush_interval_ms=10_000)
+    for n in range(5):
+        report(db, n)
+    db.flush()
+    report(db, 5)
+    # The last report was still waiting for the writer thread
+    crash(db)
+
+    db = open_database(tmp_path)
+    try:
+        assert db.get_statistics()['total_reports'] == 5
+        assert len(db.find_scammer('journal')) == 5
+    finally:
+        db.close()
+
+def test_unreadable_file_refuses_to_start(tmp_path):
+    filename = tmp_path / 'journal.json'
+    filename.write_text('{"users": {"1": ', encoding='utf-8')
+    with pytest.raises(RuntimeError):
+        open_database(tmp_path, snapshot_format='json')
+    # Left as found, for the operator to restore
+    assert filename.read_text(encoding='utf-8') == '{"users": {"1": '
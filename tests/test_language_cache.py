@@ -0,0 +1,32 @@
+"""LanguageManager's user language LRU shared by handler threads"""
+import threading
+
+import main
+
+def test_concurrent_lookups_and_changes(monkeypatch):
+    monkeypatch.setattr(main, 'LANGUAGE_CACHE_SIZE', 16)
+    manager = main.lang
+    errors = []
+
+    def worker(offset: int):
+        try:
+            for i in range(400):
+                user_id = 900000 + (offset * 7 + i) % 40
+                if i % 10 == 0:
+                    manager.set_user_language(user_id, 'vi' if user_id % 2 else 'ru')
+                else:
+                    manager.get_user_language(user_id)
+        except Exception as e:
+            errors.append(repr(e))
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(manager._user_languages) <= 16
+    # Cached or not, every user reads back the language last set
+    for user_id in range(900000, 900040):
+        assert manager.get_user_language(user_id) == main.db.get_user_language(user_id)
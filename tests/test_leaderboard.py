@@ -0,0 +1,49 @@
+"""Leaderboard ranking against a full sort, across block splits and removals"""
+import random
+from types import SimpleNamespace
+
+import pytest
+
+import main
+
+def expected_top(leaderboard, records: dict, limit: int) -> list:
+    """Keys by descending ranking fields, ties by first appearance"""
+    order = list(records)
+    return sorted(order, key=lambda key: (
+        *(-getattr(records[key], field) for field in leaderboard.fields), order.index(key)
+    ))[:limit]
+
+@pytest.mark.parametrize('order_by', list(main.Leaderboard.ORDERINGS))
+@pytest.mark.parametrize('block_size', [1, 2, 512])
+def test_matches_full_sort(monkeypatch, order_by, block_size):
+    monkeypatch.setattr(main.Leaderboard, 'BLOCK_SIZE', block_size)
+    rnd = random.Random(order_by)
+    records = {}
+    leaderboard = main.Leaderboard(order_by)
+    initial = [(f'k{i}', SimpleNamespace(report_count=rnd.randrange(3), reporter_count=rnd.randrange(3),
+                                         total_amount=rnd.randrange(2))) for i in range(10)]
+    records.update(initial)
+    leaderboard.build(initial)
+    for _ in range(300):
+        key = f'k{rnd.randrange(30)}'
+        record = records.setdefault(key, SimpleNamespace(report_count=0, reporter_count=0, total_amount=0))
+        # Small values, so most entries tie on some or all fields
+        record.report_count += 1
+        record.reporter_count += rnd.randrange(2)
+        record.total_amount += rnd.choice([0, 0, 5])
+        leaderboard.update(key, record)
+        limit = rnd.choice([1, 5, 50])
+        assert leaderboard.top(limit) == expected_top(leaderboard, records, limit)
+
+def test_ties_keep_first_appearance():
+    leaderboard = main.Leaderboard('reports')
+    same = SimpleNamespace(report_count=1, reporter_count=1, total_amount=0)
+    for key in ['b', 'a', 'c']:
+        leaderboard.update(key, same)
+    assert leaderboard.top(3) == ['b', 'a', 'c']
+    better = SimpleNamespace(report_count=1, reporter_count=1, total_amount=1)
+    leaderboard.update('c', better)
+    assert leaderboard.top(3) == ['c', 'b', 'a']
+    # Falling back into the tie returns a key to its original place
+    leaderboard.update('c', same)
+    assert leaderboard.top(2) == ['b', 'a']
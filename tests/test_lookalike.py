@@ -0,0 +1,51 @@
+"""Lookalike username search against a brute-force scan"""
+import random
+import string
+
+import pytest
+
+import main
+
+def brute_force(names: list, name: str, max_distance: int) -> list:
+    max_distance = min(max_distance, max(1, len(name) // 4))
+    matches = sorted((main.edit_distance(name, other), other) for other in names)
+    return [(distance, other) for distance, other in matches if 0 < distance <= max_distance]
+
+def make_index(names: list, max_distance: int = 2):
+    index = main.LookalikeIndex(max_distance)
+    for name in names:
+        index.add(f'key_{name}', {name})
+    return index
+
+@pytest.mark.parametrize('query, expected', [
+    # Two substitutions, an insertion plus a substitution, a transposition, one substitution
+    ('scammerjoe', [(2, 'scamnerjoo')]),
+    ('scamerjoe', [(2, 'scamnerjoo')]),
+    ('trsutedseller', [(2, 'trustedseller')]),
+    ('trustedseller', [(1, 'trustedsel1er')]),
+])
+def test_finds_names_within_two_edits(query, expected):
+    index = make_index(['scamnerjoo', 'trustedseller', 'trustedsel1er', 'unrelated'])
+    assert [(distance, name) for distance, name, _ in index.search(query, 2, 10)] == expected
+
+def test_short_names_only_reach_one_edit():
+    index = make_index(['alice', 'alxce', 'axxce'])
+    assert [name for _, name, _ in index.search('alice', 2, 10)] == ['alxce']
+
+def test_distance_limited_by_index():
+    index = make_index(['scamnerjoo'], max_distance=1)
+    assert index.search('scammerjoe', 2, 10) == []
+
+@pytest.mark.parametrize('max_distance', [1, 2])
+def test_matches_brute_force(max_distance):
+    rnd = random.Random(max_distance)
+    alphabet = string.ascii_lowercase[:4]
+    names = sorted({''.join(rnd.choice(alphabet) for _ in range(rnd.randrange(4, 11))) for _ in range(300)})
+    index = make_index(names, max_distance)
+    for name in names[:100]:
+        query = list(name)
+        for _ in range(rnd.randrange(3)):
+            query[rnd.randrange(len(query))] = rnd.choice(alphabet)
+        query = ''.join(query)
+        found = [(distance, other) for distance, other, _ in index.search(query, max_distance, 1000)]
+        assert found == brute_force(names, query, max_distance)
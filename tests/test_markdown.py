@@ -0,0 +1,49 @@
+"""MarkdownV2 grammar checks and escaping"""
+import pytest
+
+import main
+
+@pytest.mark.parametrize('text', [
+    'plain text',
+    '*bold* _italic_ __underline__ ~strike~ ||spoiler||',
+    '*bold _italic_ bold*',
+    'escaped \\*star\\* and \\\\ backslash',
+    '`code with * and _ inside`',
+    '```\npre block with [brackets]\n```',
+    '[link](https://example.com/a_b)',
+    '[link](https://example.com/\\)paren)',
+    '> quoted line\nnext line',
+])
+def test_valid_markdown(text):
+    assert main.validate_markdown_v2(text) is None
+
+@pytest.mark.parametrize('text, error', [
+    ('a.b', "unescaped '.' at position 1"),
+    ('trailing \\', 'trailing backslash'),
+    ('*bold', "unclosed '*' entity"),
+    ('*bold _mixed* text_', "overlapping '*' entity at position 13"),
+    ('`open code', 'unterminated code entity'),
+    ('stray ] bracket', 'unescaped ] at position 6'),
+    ('[text] no url', 'link without url at position 5'),
+    ('[text](https://example.com', 'unterminated link url'),
+    ('a > b', "unescaped '>' at position 2"),
+])
+def test_invalid_markdown(text, error):
+    assert main.validate_markdown_v2(text) == error
+
+def test_marker_contexts():
+    error, contexts = main.scan_markdown_v2('*\x00* `\x00` [x](\x00) \\\x00', marker='\x00')
+    assert error is None
+    # An escaped marker is consumed by its backslash and not reported
+    assert contexts == ['text', 'code', 'url']
+
+@pytest.mark.parametrize('text', [
+    'C:\\Users\\scam\\wallet_1',
+    '\\' * 5,
+    'Scammer @bad_guy (Binance 123-45) reported 2024-01-01! amount=100.5$',
+    '_*[]()~`>#+-=|{}.!',
+])
+def test_escaped_text_is_valid(text):
+    assert main.validate_markdown_v2(main.escape_markdown(text)) is None
+    assert main.validate_markdown_v2(f'`{main.escape_markdown_code(text)}`') is None
+    assert main.validate_markdown_v2(f'[link]({main.escape_markdown_url(text)})') is None
@@ -0,0 +1,39 @@
+"""Migrating data.json to SQLite reads the JSON files without changing them"""
+import atexit
+import os
+
+import main
+
+def report(db, n: int):
+    db.get_user(n)
+    db.add_report({'user_id': n, 'username': f'@migrate{n}', 'telegram_link': '',
+                   'wallet_id': f'W{n}', 'amount': 10, 'product': 'p'})
+
+def json_files(path) -> dict:
+    return {name: (path / name).read_bytes() for name in sorted(os.listdir(path)) if not name.startswith('data.db')}
+
+def test_migration_leaves_source_untouched(tmp_path, capsys):
+    json_file = str(tmp_path / 'data.json')
+    db = main.JSONDatabase(json_file, journal_mode='wal', durability='sync')
+    for n in range(3):
+        report(db, n)
+    db.close()
+    db = main.JSONDatabase(json_file, journal_mode='wal', durability='sync')
+    report(db, 3)
+    # Left in the journal only, as after a crash
+    atexit.unregister(db.close)
+    db._closed = True
+    db._archive.close()
+    before = json_files(tmp_path)
+    assert os.path.getsize(db.journal_filename)
+
+    main.migrate_json_to_sqlite(json_file, str(tmp_path / 'data.db'))
+
+    assert json_files(tmp_path) == before
+    target = main.SQLiteDatabase(str(tmp_path / 'data.db'))
+    try:
+        assert target.get_statistics()['total_reports'] == 4
+        assert [scammer['username'] for scammer in target.find_scammer('migrate3')] == ['@migrate3']
+    finally:
+        target.close()
+    assert 'Migrated' in capsys.readouterr().out
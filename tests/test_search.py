@@ -0,0 +1,60 @@
+"""Check queries find the same scammers, in the same order, on each backend"""
+import pytest
+
+import main
+
+REPORTS = [
+    ('@AN15', '', 'W1'),
+    ('@paypal', 't.me/paypal', 'Binance 72728229'),
+    ('@paypal2', 't.me/paypal2', 'W2'),
+    ('@Mallory', 'https://telegram.me/mallory', 'binance:1122 3344'),
+    ('@xyz', '', 'USDT 0xABC123'),
+    ('@рaypal', '', 'W9'),
+    ('@user72728229', '', ''),
+    ('@other', '', 'an15'),
+]
+
+def open_database(backend: str, path):
+    if backend == 'sqlite':
+        return main.SQLiteDatabase(str(path / 'search.db'))
+    return main.JSONDatabase(str(path / 'search.json'), durability='sync')
+
+@pytest.fixture(scope='module')
+def databases(tmp_path_factory):
+    path = tmp_path_factory.mktemp('search')
+    dbs = {backend: open_database(backend, path) for backend in ('json', 'sqlite')}
+    for user_id, (username, link, wallet) in enumerate(REPORTS):
+        for db in dbs.values():
+            db.add_report({'user_id': user_id, 'username': username, 'telegram_link': link,
+                           'wallet_id': wallet, 'amount': 1, 'product': 'p'})
+    yield dbs
+    for db in dbs.values():
+        db.close()
+
+def usernames(db, query: str) -> list:
+    return [scammer['username'] for scammer in db.find_scammer(query)]
+
+@pytest.mark.parametrize('query, expected', [
+    # An underscore-prefixed username isn't a wallet, and usernames don't match wallets
+    ('_an15', []),
+    ('an15', ['@AN15', '@other']),
+    ('@AN15', ['@AN15', '@other']),
+    ('tg://resolve?domain=paypal', ['@paypal', '@рaypal']),
+    ('https://telegram.me/mallory', ['@Mallory']),
+    ('Binance-72728229', ['@paypal']),
+    # The exact wallet hit comes first without hiding usernames containing the number
+    ('72728229', ['@paypal', '@user72728229']),
+    ('binance 11223344', ['@Mallory']),
+    ('usdt:0xabc123', ['@xyz']),
+    ('pal', ['@paypal', '@paypal2', '@рaypal']),
+    ('nothing', []),
+])
+def test_backends_agree(databases, query, expected):
+    assert usernames(databases['json'], query) == expected
+    assert usernames(databases['sqlite'], query) == expected
+
+def test_query_forms_keep_fields_apart():
+    assert main.query_identifier_forms('_an15') == ['u:_an15', 'l:_an15']
+    assert 'w:binance:72728229' in main.query_identifier_forms('Binance 72728229')
+    assert 'w:72728229' in main.identifier_forms('@paypal', '', 'binance:72728229')
+    assert 'u:an15' not in main.identifier_forms('', '', 'an15')
@@ -0,0 +1,95 @@
+"""Binary snapshot at startup: when it is preferred, when data.json replaces it, when neither will do"""
+import atexit
+import json
+
+import pytest
+
+import main
+
+def open_database(path):
+    return main.JSONDatabase(str(path / 'snapshot.json'), journal_mode='wal', durability='sync',
+                             snapshot_format='binary')
+
+def crash(db):
+    """Drop the database as a killed process would: no final flush or export"""
+    atexit.unregister(db.close)
+    db._closed = True
+    db._archive._file.close()
+
+def report(db, n: int):
+    db.get_user(n)
+    db.add_report({'user_id': n, 'username': f'@snap{n}', 'telegram_link': '',
+                   'wallet_id': f'W{n}', 'amount': 10, 'product': 'p'})
+
+def corrupt_payload(db):
+    """Keep the snapshot's header but cut its data short"""
+    with open(db.snapshot_filename, 'r+b') as f:
+        f.truncate(main.SNAPSHOT_HEADER.size + 10)
+
+def test_snapshot_preferred_over_older_json(tmp_path):
+    db = open_database(tmp_path)
+    report(db, 1)
+    db.close()
+    db = open_database(tmp_path)
+    report(db, 2)
+    # Only the snapshot has the second report
+    db.checkpoint()
+    crash(db)
+
+    db = open_database(tmp_path)
+    try:
+        assert db.get_statistics()['total_reports'] == 2
+    finally:
+        db.close()
+
+def test_edited_json_replaces_snapshot(tmp_path):
+    db = open_database(tmp_path)
+    report(db, 1)
+    db.close()
+    with open(db.filename, encoding='utf-8') as f:
+        data = json.load(f)
+    data['statistics']['total_checks'] = 12345
+    with open(db.filename, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+    db = open_database(tmp_path)
+    try:
+        assert db.get_statistics()['total_checks'] == 12345
+        assert db.get_statistics()['total_reports'] == 1
+    finally:
+        db.close()
+
+def test_unusable_snapshot_falls_back_to_exported_json(tmp_path):
+    db = open_database(tmp_path)
+    report(db, 1)
+    # Closing exports data.json along with the snapshot
+    db.close()
+    corrupt_payload(db)
+
+    db = open_database(tmp_path)
+    try:
+        assert db.get_statistics()['total_reports'] == 1
+    finally:
+        db.close()
+
+@pytest.mark.parametrize('damage', ['payload', 'version'])
+def test_unusable_snapshot_with_older_json_refuses_to_start(tmp_path, damage):
+    db = open_database(tmp_path)
+    report(db, 1)
+    db.close()
+    db = open_database(tmp_path)
+    report(db, 2)
+    db.checkpoint()
+    crash(db)
+    if damage == 'payload':
+        corrupt_payload(db)
+    else:
+        with open(db.snapshot_filename, 'r+b') as f:
+            f.seek(4)
+            f.write((main.SNAPSHOT_VERSION + 1).to_bytes(4, 'little'))
+    json_before = open(db.filename, 'rb').read()
+
+    with pytest.raises(RuntimeError):
+        open_database(tmp_path)
+    # Neither file is touched, so nothing recoverable is lost
+    assert open(db.filename, 'rb').read() == json_before
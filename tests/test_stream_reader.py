@@ -0,0 +1,50 @@
+"""JSONStreamReader against json.loads, with chunks small enough to split every token"""
+import io
+import json
+
+import pytest
+
+import main
+
+DOCUMENT = {
+    'users': {'1': {'language': 'vi', 'username': 'Nguyễn Văn A', 'check_count': 12345}},
+    'scammers': {
+        'a_b': {'username': '@quote"back\\slash', 'amount': -12.5e-3, 'products': ['tab\there', 'new\nline']},
+        'emoji': {'username': '😀 é 中文 \u0000', 'flags': [True, False, None], 'nested': {}},
+    },
+    'reports': [{'id': 1, 'amount': 1234567890123}, [], {}, 'plain', 0],
+    'statistics': {'total_reports': 2},
+}
+
+def read_object(reader) -> dict:
+    """Rebuild an object through keys(), with arrays of the reports section through items()"""
+    result = {}
+    for key in reader.keys():
+        result[key] = list(reader.items()) if key == 'reports' else reader.value()
+    return result
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 8, 1 << 20])
+@pytest.mark.parametrize('ensure_ascii', [False, True])
+def test_matches_json_loads(monkeypatch, chunk_size, ensure_ascii):
+    monkeypatch.setattr(main.JSONStreamReader, 'CHUNK_SIZE', chunk_size)
+    text = json.dumps(DOCUMENT, ensure_ascii=ensure_ascii, indent=1)
+    assert read_object(main.JSONStreamReader(io.StringIO(text))) == json.loads(text)
+
+@pytest.mark.parametrize('chunk_size', [1, 4])
+def test_numbers_and_literals_split_across_chunks(monkeypatch, chunk_size):
+    monkeypatch.setattr(main.JSONStreamReader, 'CHUNK_SIZE', chunk_size)
+    # A prefix such as "12" or "1e" could decode on its own; the reader must wait for the rest
+    text = '{"a": 12.5, "b": 1e10, "c": -0, "d": true, "e": null, "f": "\\ud83d\\ude00", "g": 7}'
+    assert read_object(main.JSONStreamReader(io.StringIO(text))) == json.loads(text)
+
+def test_empty_containers():
+    reader = main.JSONStreamReader(io.StringIO(' { } '))
+    assert list(reader.keys()) == []
+    reader = main.JSONStreamReader(io.StringIO('[ ]'))
+    assert list(reader.items()) == []
+
+@pytest.mark.parametrize('text', ['{"a": 1', '{"a" 1}', '{"reports": [1, 2', '{"a": tru}'])
+def test_malformed_input_raises(monkeypatch, text):
+    monkeypatch.setattr(main.JSONStreamReader, 'CHUNK_SIZE', 2)
+    with pytest.raises(ValueError):
+        read_object(main.JSONStreamReader(io.StringIO(text)))
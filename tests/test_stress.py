@@ -0,0 +1,98 @@
+"""Concurrent reports and checks against each backend, then a reload"""
+import random
+import threading
+
+import pytest
+
+import main
+
+REPORTERS, CHECKERS = 4, 4
+REPORTS_EACH, CHECKS_EACH = 150, 300
+SCAMMERS = 40
+AMOUNT = 10
+
+def open_database(backend: str, path):
+    if backend == 'sqlite':
+        return main.SQLiteDatabase(str(path / 'stress.db'))
+    return main.JSONDatabase(str(path / 'stress.json'), durability=backend.split('-')[1])
+
+def reporter(db, user_id: int, report_ids: list, errors: list):
+    rnd = random.Random(user_id)
+    try:
+        for _ in range(REPORTS_EACH):
+            n = rnd.randrange(SCAMMERS)
+            db.get_user(user_id)
+            report_ids.append(db.add_report({
+                'user_id': user_id, 'username': f'@scam{n}', 'telegram_link': f't.me/scam{n}',
+                'wallet_id': f'Binance {n}', 'amount': AMOUNT, 'product': f'product{n % 3}'
+            }))
+    except Exception as e:
+        errors.append(repr(e))
+
+def checker(db, user_id: int, errors: list):
+    rnd = random.Random(user_id)
+    try:
+        for _ in range(CHECKS_EACH):
+            db.find_scammer(f'scam{rnd.randrange(SCAMMERS)}')
+            db.find_scammer('sca')
+            db.increment_user_check(user_id)
+            db.get_statistics()
+            db.get_top_scammers(10, rnd.choice(list(main.Leaderboard.ORDERINGS)))
+            db.get_user_language(user_id)
+    except Exception as e:
+        errors.append(repr(e))
+
+def snapshot(db) -> tuple:
+    """Statistics and every scammer with its filed reports"""
+    stats = db.get_statistics()
+    stats = {name: stats[name] for name in main.SQLiteDatabase.DEFAULT_STATISTICS}
+    scammers = db.get_top_scammers(SCAMMERS + 1)
+    reports = {
+        scammer['username']: db.get_scammer_reports(main.make_scammer_key(scammer['username'], scammer['wallet_id']))
+        for scammer in scammers
+    }
+    return stats, scammers, reports
+
+@pytest.mark.parametrize('backend', ['json-sync', 'json-batched', 'sqlite'])
+def test_concurrent_reports_and_checks(backend, tmp_path):
+    db = open_database(backend, tmp_path)
+    report_ids, errors = [], []
+    threads = [threading.Thread(target=reporter, args=(db, 1000 + i, report_ids, errors)) for i in range(REPORTERS)]
+    threads += [threading.Thread(target=checker, args=(db, 2000 + i, errors)) for i in range(CHECKERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors, errors[:3]
+    
+    total = REPORTERS * REPORTS_EACH
+    # Counts
+    stats = db.get_statistics()
+    assert stats['total_reports'] == total
+    assert stats['total_checks'] == CHECKERS * CHECKS_EACH
+    assert stats['active_users'] == REPORTERS + CHECKERS
+    assert stats['total_amount_scammed'] == pytest.approx(total * AMOUNT)
+    
+    # Dense ids: every report got its own id, with no gaps
+    assert sorted(report_ids) == list(range(1, total + 1))
+    
+    # Per-scammer sums agree with the reports filed under each scammer
+    before = snapshot(db)
+    stats, scammers, reports = before
+    assert len(scammers) == stats['total_scammers'] <= SCAMMERS
+    assert sum(scammer['report_count'] for scammer in scammers) == total
+    for scammer in scammers:
+        filed = reports[scammer['username']]
+        assert scammer['report_count'] == len(filed)
+        assert scammer['total_amount'] == pytest.approx(sum(report['amount'] for report in filed))
+        assert scammer['reporter_count'] == len({int(report['user_id']) for report in filed})
+        assert [report['id'] for report in filed] == sorted((report['id'] for report in filed), reverse=True)
+    assert sorted(report['id'] for filed in reports.values() for report in filed) == list(range(1, total + 1))
+    
+    # Reload: everything written survives a restart
+    db.close()
+    db = open_database(backend, tmp_path)
+    try:
+        assert snapshot(db) == before
+    finally:
+        db.close()
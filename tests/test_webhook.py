@@ -0,0 +1,95 @@
+"""Webhook listener exercised through a local HTTP client"""
+import http.client
+import json
+import threading
+from queue import Queue
+
+import pytest
+from telegram import Update
+from telegram.ext import TypeHandler
+
+import main
+
+SECRET = 'test-secret'
+
+def make_update(update_id: int, user_id: int = 1) -> dict:
+    return {'update_id': update_id, 'message': {
+        'message_id': update_id, 'date': 0, 'chat': {'id': user_id, 'type': 'private'},
+        'from': {'id': user_id, 'is_bot': False, 'first_name': 'user'}, 'text': 'hello'
+    }}
+
+@pytest.fixture
+def webhook():
+    bot = main.QueuedBot('123:abc')
+    dispatcher = main.UserOrderedDispatcher(bot, Queue(), workers=1, ordered_workers=2, use_context=True)
+    server = main.WebhookServer(dispatcher, listen='127.0.0.1', port=0, path='/telegram', secret_token=SECRET)
+    server.start()
+    yield server
+    server.stop()
+    dispatcher._executor.shutdown(wait=True)
+
+def request(server, method: str, path: str, body: bytes = None, headers: dict = None):
+    conn = http.client.HTTPConnection('127.0.0.1', server.port, timeout=5)
+    try:
+        conn.request(method, path, body=body, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+def post_update(server, update: dict, secret: str = SECRET):
+    return request(server, 'POST', '/telegram', json.dumps(update).encode(),
+                   {'X-Telegram-Bot-Api-Secret-Token': secret, 'Content-Type': 'application/json'})
+
+def test_update_is_queued(webhook):
+    assert post_update(webhook, make_update(1)) == (200, {'ok': True})
+    update = webhook.dispatcher.update_queue.get_nowait()
+    assert isinstance(update, Update) and update.update_id == 1
+    assert webhook.received == 1
+
+def test_wrong_secret_is_rejected(webhook):
+    status, _ = post_update(webhook, make_update(1), secret='wrong')
+    assert status == 403
+    assert webhook.dispatcher.update_queue.empty()
+
+def test_bad_content_length_is_rejected(webhook):
+    headers = {'X-Telegram-Bot-Api-Secret-Token': SECRET}
+    conn = http.client.HTTPConnection('127.0.0.1', webhook.port, timeout=5)
+    try:
+        conn.putrequest('POST', '/telegram')
+        conn.putheader('X-Telegram-Bot-Api-Secret-Token', SECRET)
+        conn.putheader('Content-Length', 'abc')
+        conn.endheaders()
+        response = conn.getresponse()
+        assert response.status == 400
+    finally:
+        conn.close()
+    assert request(webhook, 'POST', '/telegram', b'not json', headers)[0] == 400
+    assert request(webhook, 'POST', '/telegram', b'', headers)[0] == 400
+    assert webhook.rejected == 3
+
+def test_unknown_path(webhook):
+    assert request(webhook, 'POST', '/other', b'{}')[0] == 404
+    assert request(webhook, 'GET', '/telegram')[0] == 404
+
+def test_health_requires_secret(webhook):
+    assert request(webhook, 'GET', '/telegram/health')[0] == 403
+    status, health = request(webhook, 'GET', '/telegram/health', headers={'X-Telegram-Bot-Api-Secret-Token': SECRET})
+    assert status == 200 and health['ok']
+
+def test_queue_depth_counts_updates_waiting_per_user(webhook):
+    dispatcher = webhook.dispatcher
+    release = threading.Event()
+    dispatcher.add_handler(TypeHandler(Update, lambda update, context: release.wait(5)))
+    try:
+        # One update running for the user, two more waiting behind it
+        for update_id in range(1, 4):
+            dispatcher.process_update(Update.de_json(make_update(update_id), dispatcher.bot))
+        post_update(webhook, make_update(4, user_id=2))
+        
+        status, health = request(webhook, 'GET', '/telegram/health',
+                                 headers={'X-Telegram-Bot-Api-Secret-Token': SECRET})
+        assert status == 200
+        assert health['queue_depth'] == 3
+    finally:
+        release.set()